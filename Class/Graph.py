@@ -1,15 +1,19 @@
-import requests
 from Utils.tools import Tools, CustomException
 from Utils.querys import Querys
-from Models.IntranetGraphTokenModel import IntranetGraphTokenModel as TokenModel
-from datetime import datetime, timedelta
+from Utils.graph_token import graph_token_provider
+from Utils.graph_client import graph_session
+from Utils.graph_conversacion import obtener_hilo, invalidar_hilos, obtener_conversation_id_graph
+from Utils.sync_worker import sync_worker
+from Utils.mapa_conversaciones import mapa_conversaciones
+from Utils.subjects import limpiar_subject, normalizar_subject
+from Utils.graph_async import canalizar_paginas, obtener_attachments_lote
+from requests.exceptions import RequestException
+from datetime import datetime
 import hashlib
 import traceback
 
 from Utils.constants import (
-    MICROSOFT_CLIENT_ID, MICROSOFT_CLIENT_SECRET, MICROSOFT_TENANT_ID,
-    MICROSOFT_API_SCOPE, MICROSOFT_URL, MICROSOFT_URL_GRAPH, PARENT_FOLDER,
-    TARGET_FOLDER, EMAIL_USER
+    MICROSOFT_URL_GRAPH, TARGET_FOLDER, EMAIL_USER, GRAPH_MAX_ATTACHMENTS_LOTE
 )
 
 class Graph:
@@ -19,6 +23,9 @@ class Graph:
         self.tools = Tools()
         self.querys = Querys(self.db)
         self.token = None
+        self.delta_link = None
+        # True si la última extracción delta fue una ronda completa (sin deltaLink o con uno expirado)
+        self.delta_completo = False
 
     def _build_graph_url(self, endpoint):
         """
@@ -30,22 +37,75 @@ class Graph:
             base_url = base_url.replace('/users', '')  # Quitar /users para endpoints /me
         return f"{base_url}/{endpoint.lstrip('/')}"
 
-    # Función para obtener correos con sincronización inteligente
+    # Función para obtener los correos desde BD junto al estado de la sincronización
     def obtener_correos(self, forzar_sync=False):
         """
-        Obtiene correos implementando sincronización inteligente:
-        1. Si no hay correos en BD o forzar_sync=True -> Sync completo
-        2. Si hay correos en BD -> Solo sincronizar nuevos
-        3. Retorna correos desde BD
+        Retorna de inmediato los correos desde BD; la sincronización con Graph
+        la ejecuta el worker en segundo plano (Utils/sync_worker.py).
+        - forzar_sync=True dispara una sincronización completa sin esperarla
+        - Incluye la metadata del último sync finalizado
         """
         
-        # Obtenemos el token desde la base de datos
-        result = self.querys.get_token()
-        self.token = self.validar_existencia_token(result)
+        # Obtener el token compartido (en memoria, renovado en segundo plano)
+        self.token = graph_token_provider.obtener_token()
+
+        sync_disparado = sync_worker.disparar(forzar_sync=True) if forzar_sync else False
+
+        correos_bd = self.querys.obtener_correos_bd(limite=100)
+        
+        result = {
+            'token': self.token,
+            'emails': correos_bd,
+            'ultimo_sync': self.querys.obtener_ultimo_sync_exitoso(),
+            'sync_en_curso': sync_worker.en_ejecucion(),
+            'sync_disparado': sync_disparado
+        }
+
+        return self.tools.output(200, "Correos obtenidos desde BD.", result)
+
+    # Función para disparar una sincronización en segundo plano
+    def disparar_sincronizacion(self, forzar_sync=False):
+        """Lanza la sincronización en el worker y retorna sin esperar su resultado"""
+        disparado = sync_worker.disparar(forzar_sync)
+        result = {
+            'sync_disparado': disparado,
+            'ultimo_sync': self.querys.obtener_ultimo_sync_exitoso()
+        }
+        if not disparado:
+            return self.tools.output(200, "Ya hay una sincronización en curso.", result)
+        return self.tools.output(200, "Sincronización iniciada en segundo plano.", result)
+
+    # Función para ejecutar una sincronización completa esperando su resultado
+    def sincronizar_correos_ahora(self):
+        """Ejecuta una sincronización completa a través del worker (sin solaparse con otra)"""
+        stats = sync_worker.ejecutar(forzar_sync=True)
+        if stats is None:
+            return self.tools.output(409, "Ya hay una sincronización en curso.", {})
+        if not stats.get('estado'):
+            return self.tools.output(500, "Error en la sincronización.", stats)
+
+        result = {
+            'emails': self.querys.obtener_correos_bd(limite=100),
+            'sync_stats': stats.get('sync_stats'),
+            'tipo_sync': stats.get('tipo_sync')
+        }
+        return self.tools.output(200, f"Sincronización {stats.get('tipo_sync')} completada.", result)
+
+    # Función para ejecutar una sincronización con Graph y registrarla en intranet_sync_log
+    def ejecutar_sincronizacion(self, forzar_sync=False):
+        """
+        Ejecuta una sincronización inteligente y la registra en intranet_sync_log:
+        1. Si no hay correos en BD o forzar_sync=True -> Sync completo
+        2. Si hay correos en BD -> Sync incremental (deltaLink)
+        Retorna las estadísticas de la ejecución.
+        """
+        self.token = graph_token_provider.obtener_token()
 
         if not self.token:
-            return self.tools.output(400, "No se pudo obtener token de acceso.", {'emails': []})
+            print("No se pudo obtener token de acceso para sincronizar.")
+            return {'estado': 0, 'error': 'Sin token de acceso'}
 
+        log_id = None
         try:
             # Determinar tipo de sincronización
             correos_existentes = self.querys.obtener_correos_bd(limite=1)
@@ -56,70 +116,93 @@ class Graph:
             
             # Ejecutar sincronización
             stats_sync = self.sincronizar_correos_inteligente(tipo_sync)
+            # Un incremental sin deltaLink vigente terminó recorriendo toda la carpeta
+            if self.delta_completo:
+                tipo_sync = 'completo'
             
-            # Finalizar log
+            # Finalizar log (guardando el deltaLink para la próxima sincronización incremental)
             if log_id:
                 self.querys.finalizar_log_sync(
                     log_id, 
                     correos_nuevos=stats_sync.get('nuevos', 0),
                     correos_actualizados=stats_sync.get('actualizados', 0),
-                    estado=1
+                    correos_eliminados=stats_sync.get('eliminados', 0),
+                    estado=1,
+                    delta_link=self.delta_link,
+                    tipo_sync=tipo_sync
                 )
-            
-            # Obtener correos desde BD para retornar
-            correos_bd = self.querys.obtener_correos_bd(limite=100)
-            
-            # Preparar respuesta
-            result = {
-                'token': self.token, 
-                'emails': correos_bd,
-                'sync_stats': stats_sync,
-                'tipo_sync': tipo_sync
-            }
 
-            return self.tools.output(200, f"Sincronización {tipo_sync} completada.", result)
+            return {'estado': 1, 'log_id': log_id, 'tipo_sync': tipo_sync, 'sync_stats': stats_sync}
             
         except Exception as e:
             # Log de error
-            if 'log_id' in locals() and log_id:
+            if log_id:
                 self.querys.finalizar_log_sync(log_id, estado=0, mensaje_error=str(e))
             
             print(f"Error en sincronización: {e}")
-            
-            # Fallback: retornar correos existentes en BD
-            correos_bd = self.querys.obtener_correos_bd(limite=100)
-            return self.tools.output(200, "Error en sync, mostrando correos locales.", {'emails': correos_bd})
+            return {'estado': 0, 'log_id': log_id, 'error': str(e)}
 
     # Función para sincronización inteligente de correos
     def sincronizar_correos_inteligente(self, tipo_sync='incremental'):
         """
         Sincronización inteligente de correos:
-        - Obtiene correos desde Graph API
+        - Obtiene los cambios desde Graph API usando messages/delta
+        - En modo incremental parte del deltaLink del último sync (solo cambios)
+        - En modo completo recorre toda la carpeta y obtiene un deltaLink nuevo
         - Compara con BD usando message_id
         - Inserta solo correos nuevos
         - Actualiza correos modificados
         """
-        stats = {'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0, 'respuestas_procesadas': 0}
+        stats = {'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0, 'respuestas_procesadas': 0, 'eliminados': 0}
         
-        # Obtener correos desde Microsoft Graph
-        folder_id = self.get_folder_id(TARGET_FOLDER)
-        if not folder_id:
-            return stats
-            
-        emails_graph = self.extraer_correos(folder_id)
-        if not emails_graph:
-            return stats
+        delta_link = self.querys.obtener_ultimo_delta_link() if tipo_sync == 'incremental' else None
+        
+        # Mapa conversation_id -> ticket para detectar respuestas sin consultar por correo
+        mapa_conversaciones.calentar(self.querys)
+        
+        # Con deltaLink no hace falta resolver la carpeta: la URL ya la identifica
+        folder_id = None
+        if not delta_link:
+            folder_id = self.get_folder_id(TARGET_FOLDER)
+            if not folder_id:
+                return stats
         
-        # Filtrar correos spam
-        emails_filtrados = [
-            email for email in emails_graph
-            if not email['from']['emailAddress']['address'].lower().startswith(('postmaster', 'noreply'))
-            and not email['subject'].startswith(('[!!Spam]', '[!!Massmail]'))
-        ]
+        def procesar_pagina(emails_graph):
+            # Los mensajes eliminados o movidos llegan marcados con @removed
+            eliminados = [email for email in emails_graph if '@removed' in email]
+            stats['eliminados'] += len(eliminados)
+            
+            # Filtrar correos eliminados y spam
+            emails_filtrados = [
+                email for email in emails_graph
+                if '@removed' not in email
+                and not email.get('from', {}).get('emailAddress', {}).get('address', '').lower().startswith(('postmaster', 'noreply'))
+                and not (email.get('subject') or '').startswith(('[!!Spam]', '[!!Massmail]'))
+            ]
+            
+            self._procesar_pagina_correos(emails_filtrados, stats)
         
-        # Obtener message_ids existentes en BD para comparación rápida
-        message_ids_existentes = self.querys.obtener_message_ids_existentes()
+        # La descarga de la página siguiente se solapa con el guardado en BD de la actual
+        canalizar_paginas(self.extraer_correos_delta(folder_id, delta_link), procesar_pagina)
         
+        return stats
+    
+    # Helper para procesar una página de correos obtenida desde Graph
+    def _procesar_pagina_correos(self, emails_filtrados, stats):
+        """
+        Clasifica los correos de la página (nuevos, modificados, respuestas a hilos)
+        y los guarda en lote con una sola transacción
+        """
+        nuevos = []
+        actualizados = []
+        respuestas = []
+        correos_nuevos = []
+
+        # Existencia y hash solo de los IDs de esta página (una consulta por página)
+        hashes_existentes = self.querys.obtener_hashes_por_message_ids(
+            [email.get('id') for email in emails_filtrados]
+        )
+
         for email_graph in emails_filtrados:
             try:
                 message_id = email_graph.get('id')
@@ -128,45 +211,45 @@ class Graph:
                 
                 # Preparar datos del correo para BD
                 correo_data = self._preparar_datos_correo(email_graph)
+                correo_data['hash_contenido'] = self.querys.generar_hash_contenido(
+                    correo_data.get('subject', ''),
+                    correo_data.get('body_preview', ''),
+                    correo_data.get('from_email', '')
+                )
                 
-                if message_id in message_ids_existentes:
-                    # Correo existe, verificar si hay cambios
-                    correo_existente = self.querys.obtener_correo_por_message_id(message_id)
-                    if correo_existente:
-                        # Comparar hash para detectar cambios
-                        hash_nuevo = self.querys.generar_hash_contenido(
-                            correo_data.get('subject', ''),
-                            correo_data.get('body_preview', ''),
-                            correo_data.get('from_email', '')
-                        )
-                        
-                        if hash_nuevo != correo_existente.get('hash_contenido'):
-                            # Hay cambios, actualizar
-                            self.querys.actualizar_correo(message_id, correo_data)
-                            stats['actualizados'] += 1
-                        else:
-                            stats['sin_cambios'] += 1
+                if message_id in hashes_existentes:
+                    # Correo existe, comparar hash para detectar cambios
+                    if correo_data['hash_contenido'] != hashes_existentes[message_id]:
+                        actualizados.append(correo_data)
+                        hashes_existentes[message_id] = correo_data['hash_contenido']
+                    else:
+                        stats['sin_cambios'] += 1
                 else:
-                    # Correo nuevo - verificar si es respuesta a un hilo existente
-                    conversation_id = correo_data.get('conversation_id')
+                    # Correo nuevo - se clasifica al final junto con el resto de la página
+                    correos_nuevos.append(correo_data)
                     
-                    # Verificar si es respuesta usando múltiples criterios
-                    ticket_existente = self._es_respuesta_a_hilo_existente(conversation_id, correo_data)
-                    
-                    if ticket_existente:
-                        # Es una respuesta a un hilo existente
-                        if self._procesar_respuesta_hilo(correo_data, ticket_existente):
-                            stats['respuestas_procesadas'] += 1
-                    else:
-                        # Es un correo completamente nuevo, crear nuevo ticket
-                        self.querys.insertar_correo(correo_data)
-                        stats['nuevos'] += 1
+                    # Un mismo mensaje puede repetirse dentro de la página del delta
+                    hashes_existentes[message_id] = correo_data['hash_contenido']
                     
             except Exception as e:
                 print(f"Error procesando correo {message_id}: {e}")
                 continue
-        
-        return stats
+
+        # Verificar en lote si los correos nuevos son respuestas a hilos existentes
+        for correo_data, ticket_existente in zip(correos_nuevos, self._clasificar_respuestas_hilo(correos_nuevos)):
+            if ticket_existente:
+                # Es una respuesta a un hilo existente
+                respuestas.append(self._preparar_respuesta_hilo(correo_data, ticket_existente))
+            else:
+                # Es un correo completamente nuevo, crear nuevo ticket
+                nuevos.append(correo_data)
+
+        resultado = self.querys.guardar_correos_lote(nuevos, actualizados, respuestas)
+        # Los hilos que recibieron mensajes se vuelven a consultar a Graph
+        invalidar_hilos(correo.get('conversation_id') for correo in nuevos + actualizados + respuestas)
+        stats['nuevos'] += resultado['nuevos']
+        stats['actualizados'] += resultado['actualizados']
+        stats['respuestas_procesadas'] += resultado['respuestas']
     
     # Helper para preparar datos del correo
     def _preparar_datos_correo(self, email_graph):
@@ -196,7 +279,7 @@ class Graph:
         }
 
     # Helper para determinar si un correo es respuesta a un hilo existente
-    def _es_respuesta_a_hilo_existente(self, conversation_id, correo_data):
+    def _es_respuesta_a_hilo_existente(self, correo_data, tickets_conversacion, tickets_remitentes):
         """
         Verifica si un correo entrante es respuesta a una conversación existente
         Usa múltiples criterios para detectar hilos:
@@ -204,14 +287,21 @@ class Graph:
         2. Subject patterns (RE:, FW:, etc.)
         3. Análisis de remitente vs tickets existentes
         
+        Se evalúa en memoria con los datos que _clasificar_respuestas_hilo consulta para la página:
+        - tickets_conversacion: {conversation_id: ticket}
+        - tickets_remitentes: {from_email en minúsculas: [tickets de los últimos 7 días, más reciente primero]}
+        Ambos incluyen los correos nuevos de la misma página ya clasificados como raíz
+        (sin id todavía: se enlazan por raiz_message_id al guardar el lote).
         Returns: dict con info del ticket existente o None si es correo nuevo
         """
         
         # Criterio 1: Buscar por conversation_id (más confiable)
-        if conversation_id:
-            ticket_existente = self.querys.obtener_ticket_por_conversation_id(conversation_id)
-            if ticket_existente:
-                return ticket_existente
+        conversation_id = correo_data.get('conversation_id')
+        if conversation_id in tickets_conversacion:
+            return tickets_conversacion[conversation_id]
+        
+        from_email = correo_data.get('from_email')
+        tickets_recientes = tickets_remitentes.get((from_email or '').lower(), [])
         
         # Criterio 2: Analizar subject para patrones de respuesta
         subject = correo_data.get('subject', '').strip()
@@ -219,58 +309,90 @@ class Graph:
             # Limpiar subject de prefijos RE:, FW:, etc.
             subject_limpio = self._limpiar_subject_respuesta(subject)
             
-            if subject_limpio != subject:  # Tenía prefijos de respuesta
-                # Buscar tickets con subject similar
-                ticket_por_subject = self.querys.buscar_ticket_por_subject_similar(subject_limpio, 
-                                                                                 correo_data.get('from_email'))
-                if ticket_por_subject:
-                    return ticket_por_subject
+            subject_buscado = normalizar_subject(subject_limpio)
+            if subject_limpio != subject and subject_buscado:  # Tenía prefijos de respuesta
+                # Buscar tickets del remitente cuyo subject normalizado empiece igual
+                for ticket in tickets_recientes:
+                    if ticket.get('subject_normalizado', '').startswith(subject_buscado):
+                        return ticket
         
         # Criterio 3: Buscar por email del remitente en tickets recientes (últimos 7 días)
-        from_email = correo_data.get('from_email')
-        if from_email:
-            ticket_reciente = self.querys.buscar_ticket_reciente_por_email(from_email, days=7)
-            if ticket_reciente and subject:
-                # Verificar si el subject actual contiene palabras clave del ticket original
-                if self._subjects_relacionados(subject, ticket_reciente.get('subject', '')):
-                    return ticket_reciente
+        if from_email and tickets_recientes and subject:
+            # Verificar si el subject actual contiene palabras clave del ticket original
+            if self._subjects_relacionados(subject, tickets_recientes[0].get('subject', '')):
+                return tickets_recientes[0]
             
         return None
 
-    # Helper para procesar la respuesta de un hilo existente
-    def _procesar_respuesta_hilo(self, correo_data, ticket_existente):
+    # Helper para clasificar en lote los correos nuevos de una página
+    def _clasificar_respuestas_hilo(self, correos_nuevos):
+        """
+        Retorna, alineado con correos_nuevos, el ticket al que responde cada correo (o None).
+        A lo sumo dos consultas por página: conversaciones fuera del mapa en memoria y
+        tickets recientes de todos los remitentes que no se resolvieron por conversación.
+        Los correos se recorren por fecha de recepción: si la raíz y su respuesta llegan en
+        la misma página, la raíz queda indexada (conversation_id y remitente) antes de la respuesta.
         """
-        Procesa un correo que es respuesta a un hilo existente
-        - Actualiza el ticket con la nueva respuesta
-        - Registra la respuesta en el historial
+        if not correos_nuevos:
+            return []
+
+        tickets_conversacion = {
+            conversation_id: {'id': ticket_id, 'conversation_id': conversation_id}
+            for conversation_id, ticket_id in mapa_conversaciones.resolver(
+                self.querys, [correo.get('conversation_id') for correo in correos_nuevos]
+            ).items()
+        }
+        tickets_remitentes = self.querys.obtener_tickets_recientes_por_emails([
+            correo.get('from_email') for correo in correos_nuevos
+            if correo.get('conversation_id') not in tickets_conversacion
+        ], days=7)
+
+        clasificacion = [None] * len(correos_nuevos)
+        orden = sorted(range(len(correos_nuevos)), key=lambda i: (correos_nuevos[i].get('received_date') or datetime.min).replace(tzinfo=None))
+        for i in orden:
+            correo = correos_nuevos[i]
+            clasificacion[i] = self._es_respuesta_a_hilo_existente(correo, tickets_conversacion, tickets_remitentes)
+            if clasificacion[i] is None:
+                self._indexar_raiz_pagina(correo, tickets_conversacion, tickets_remitentes)
+        return clasificacion
+
+    # Helper para indexar un correo nuevo de la página como raíz de su conversación
+    def _indexar_raiz_pagina(self, correo, tickets_conversacion, tickets_remitentes):
+        raiz = {
+            'id': None,
+            'raiz_message_id': correo.get('message_id'),
+            'subject': correo.get('subject', ''),
+            'subject_normalizado': normalizar_subject(correo.get('subject', '')),
+            'from_email': correo.get('from_email'),
+            'conversation_id': correo.get('conversation_id')
+        }
+        if raiz['conversation_id']:
+            tickets_conversacion.setdefault(raiz['conversation_id'], raiz)
+        # La raíz de la página es el ticket más reciente del remitente
+        tickets_remitentes.setdefault((raiz['from_email'] or '').lower(), []).insert(0, raiz)
+
+    # Helper para preparar la respuesta de un hilo existente
+    def _preparar_respuesta_hilo(self, correo_data, ticket_existente):
+        """
+        Prepara un correo que es respuesta a un hilo existente para guardarlo en lote
+        - Se registra como respuesta en el historial del ticket
+        - Se actualiza la última actividad del ticket
         - NO crea un nuevo ticket
         """
-        try:
-            ticket_id = ticket_existente.get('id')
-            
-            # Registrar la respuesta en el historial del ticket
-            respuesta_data = {
-                'ticket_id': ticket_id,
-                'message_id': correo_data.get('message_id'),
-                'from_email': correo_data.get('from_email'),
-                'from_name': correo_data.get('from_name'),
-                'subject': correo_data.get('subject'),
-                'body_content': correo_data.get('body_content'),
-                'received_date': correo_data.get('received_date'),
-                'tipo': 'respuesta_entrante'
-            }
-            
-            # Registrar en el historial del ticket
-            self.querys.registrar_respuesta_entrante_ticket(respuesta_data)
-            
-            # Actualizar la fecha de última actividad del ticket
-            self.querys.actualizar_ultima_actividad_ticket(ticket_id)
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error procesando respuesta del hilo: {e}")
-            return False
+        return {
+            'ticket_id': ticket_existente.get('id'),
+            # Raíz guardada en la misma página: su id se resuelve al guardar el lote
+            'raiz_message_id': ticket_existente.get('raiz_message_id'),
+            'message_id': correo_data.get('message_id'),
+            'conversation_id': correo_data.get('conversation_id'),
+            'from_email': correo_data.get('from_email'),
+            'from_name': correo_data.get('from_name'),
+            'subject': correo_data.get('subject'),
+            'body_content': correo_data.get('body_content'),
+            'received_date': correo_data.get('received_date'),
+            'hash_contenido': correo_data.get('hash_contenido'),
+            'tipo': 'respuesta_entrante'
+        }
 
     # Helper para limpiar el subject de un correo
     def _limpiar_subject_respuesta(self, subject):
@@ -278,25 +400,8 @@ class Graph:
         Limpia prefijos de respuesta del subject (RE:, FW:, etc.)
         Returns: subject limpio sin prefijos
         """
-        import re
-        
-        # Patrones comunes de respuesta en diferentes idiomas
-        patrones_respuesta = [
-            r'^RE:\s*',     # Respuesta en inglés/español
-            r'^RES:\s*',    # Respuesta en español
-            r'^FW:\s*',     # Reenvío en inglés
-            r'^RV:\s*',     # Reenvío en español
-            r'^FWD:\s*',    # Reenvío alternativo
-            r'^AW:\s*',     # Respuesta en alemán
-            r'^SV:\s*',     # Respuesta en sueco/noruego
-            r'^\[SPAM\]\s*' # Filtros de spam
-        ]
-        
-        subject_limpio = subject
-        for patron in patrones_respuesta:
-            subject_limpio = re.sub(patron, '', subject_limpio, flags=re.IGNORECASE)
-        
-        return subject_limpio.strip()
+        # Una sola regex precompilada que quita prefijos encadenados (RE: RE: FW: ...)
+        return limpiar_subject(subject)
 
     # Helper para verificar si dos subjects están relacionados
     def _subjects_relacionados(self, subject1, subject2):
@@ -324,41 +429,6 @@ class Graph:
         similitud = len(palabras1.intersection(palabras2)) / len(palabras1.union(palabras2))
         return similitud >= 0.7
 
-    # Función para validar si el token existe y si está vigente
-    def validar_existencia_token(self, result: dict):
-        
-        # Si hay un token en BD, validar si aún está vigente
-        if result:
-            fecha_vencimiento_str = result.get('fecha_vencimiento')
-            if fecha_vencimiento_str:
-                # Convertir string a datetime si es necesario
-                if isinstance(fecha_vencimiento_str, str):
-                    fecha_vencimiento = datetime.fromisoformat(fecha_vencimiento_str.replace('Z', '+00:00'))
-                else:
-                    fecha_vencimiento = fecha_vencimiento_str
-                
-                # Comparar con tiempo actual
-                ahora = datetime.now()
-                print(f"Fecha vencimiento: {fecha_vencimiento}")
-                print(f"Fecha actual: {ahora}")
-                
-                if ahora < fecha_vencimiento:
-                    # Token aún vigente
-                    print("Token vigente, retornando desde BD")
-                    return result['token']
-                else:
-                    # Token expirado, desactivar
-                    print("Token expirado, desactivando...")
-                    token_id = result.get('id')
-                    if token_id:
-                        # Crear nueva instancia de Querys para desactivar token
-                        self.querys.desactivar_token(token_id)
-                        print(f"Token {token_id} desactivado")
-
-        # Si no hay token válido, obtener uno nuevo desde Microsoft Graph
-        print("Obteniendo nuevo token desde Microsoft Graph API...")
-        return self._crear_nuevo_token()
-
     # Función para obtener el ID de una carpeta específica
     def get_folder_id(self, target_folder: str):
 
@@ -370,79 +440,72 @@ class Graph:
             result = data['id']
         return result
 
-    # Función para extraer correos de una carpeta específica
-    def extraer_correos(self, folder_id: str):
-        """Recupera correos electrónicos de una carpeta específica."""
-        emails = []
+    # Función para extraer los cambios de una carpeta usando la consulta delta de Graph
+    def extraer_correos_delta(self, folder_id: str, delta_link: str = None):
+        """
+        Recupera por páginas los mensajes cambiados en la carpeta usando messages/delta.
+        - Sin delta_link: ronda inicial, devuelve todos los mensajes de la carpeta.
+        - Con delta_link: devuelve solo lo creado, modificado o eliminado desde ese punto.
+        Al terminar deja en self.delta_link el enlace para la siguiente ejecución.
+        """
+        self.delta_link = None
+        self.delta_completo = not delta_link
         max_iterations = 100
         iteration = 0
+        headers = {'Prefer': 'odata.maxpagesize=100'}
+        url = delta_link or self._url_delta_inicial(folder_id)
 
-        if folder_id:
-            url = f"{MICROSOFT_URL_GRAPH}{EMAIL_USER}/mailFolders/{folder_id}/messages?$top=100&$select=from,subject,receivedDateTime,bodyPreview,body,conversationId,id,hasAttachments"
-
-            while url and iteration < max_iterations:
-                data = self._make_request(url)
-                if not data:
-                    break
+        while url and iteration < max_iterations:
+            data = self._make_request(url, headers=headers)
+            if not data:
+                if delta_link and iteration == 0:
+                    # El deltaLink expiró o ya no es válido: se reinicia con una ronda completa
+                    print("deltaLink inválido o expirado, reiniciando sincronización delta completa.")
+                    delta_link = None
+                    self.delta_completo = True
+                    url = self._url_delta_inicial(folder_id or self.get_folder_id(TARGET_FOLDER))
+                    continue
+                break
 
-                new_emails = data.get('value', [])
-                if not new_emails:
-                    print("No se recuperaron nuevos correos. Deteniendo.")
-                    break
+            yield data.get('value', [])
 
-                emails.extend(new_emails)
-                url = data.get('@odata.nextLink')  # Paginación
-                iteration += 1
+            # Se guarda el último enlace de estado: deltaLink al terminar o nextLink si se
+            # alcanzó el límite de páginas, para retomar desde ahí en la siguiente ejecución
+            url = data.get('@odata.nextLink')
+            self.delta_link = data.get('@odata.deltaLink') or url
+            iteration += 1
 
-        return emails
+    # Helper para construir la URL de la ronda inicial de la consulta delta
+    def _url_delta_inicial(self, folder_id: str):
+        """Construye la URL de messages/delta para una carpeta"""
+        if not folder_id:
+            return None
+        return f"{MICROSOFT_URL_GRAPH}{EMAIL_USER}/mailFolders/{folder_id}/messages/delta?$select=from,subject,receivedDateTime,bodyPreview,body,conversationId,id,hasAttachments"
 
     # Función para realizar peticiones a la API de Microsoft Graph
-    def _make_request(self, endpoint):
+    def _make_request(self, endpoint, headers=None):
         """Realiza una petición GET a Microsoft Graph API."""
         if not self.token:
             print("No se pudo obtener el token de acceso.")
             return None
 
-        headers = {'Authorization': f'Bearer {self.token}'}
-        response = requests.get(endpoint, headers=headers)
+        headers = {**(headers or {}), 'Authorization': f'Bearer {self.token}'}
+        try:
+            response = graph_session.get(endpoint, headers=headers)
+        except RequestException as e:
+            print(f"Error de conexión con Microsoft Graph: {e}")
+            return None
 
         if response.status_code == 200:
             return response.json()
         print(f"Error en la solicitud: {response.status_code} - {response.text}")
         return None
 
-    # Función para crear un nuevo token desde Microsoft Graph API
-    def _crear_nuevo_token(self):
-        """Crea un nuevo token desde Microsoft Graph API."""
-        url = f"{MICROSOFT_URL}{MICROSOFT_TENANT_ID}/oauth2/v2.0/token"
-        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        data = {
-            'client_id': MICROSOFT_CLIENT_ID,
-            'scope': ' '.join(MICROSOFT_API_SCOPE),
-            'client_secret': MICROSOFT_CLIENT_SECRET,
-            'grant_type': 'client_credentials'
-        }
-        response = requests.post(url, headers=headers, data=data)
-        if response.status_code == 200:
-            token = response.json().get('access_token')
-            expires_in = response.json().get('expires_in')
-            
-            data_insert = {
-                "token": token,
-                "fecha_vencimiento": datetime.now() + timedelta(seconds=expires_in)
-            }
-            # Crear nueva instancia de Querys para insertar token
-            self.querys.insertar_datos(TokenModel, data_insert)
-            return token
-        
-        print(f"Error obteniendo el token: {response.status_code} - {response.text}")
-        return None
-
     # Función para obtener los attachments de un correo específico
     def obtener_attachments(self, data: dict):
         
         messageId = data['messageId']
-        self.token = data['token']
+        self.token = graph_token_provider.obtener_token()
         attachments = list()
 
         if messageId:
@@ -453,24 +516,48 @@ class Graph:
 
         return self.tools.output(200, "Datos encontrados.", attachments)
     
+    # Función para obtener la metadata de los attachments de varios correos en una llamada
+    def obtener_attachments_lote(self, data: dict):
+        """
+        Recibe messageIds (lista) y retorna {messageId: [attachments]} con id, nombre, tipo y tamaño
+        (sin contenido). Usa $batch de Graph (20 mensajes por llamada) con lotes en paralelo.
+        """
+        message_ids = data.get('messageIds') or []
+        if not isinstance(message_ids, list) or not message_ids:
+            return self.tools.output(400, "Se requiere la lista messageIds.", {})
+
+        if len(message_ids) > GRAPH_MAX_ATTACHMENTS_LOTE:
+            return self.tools.output(400, f"Se pueden consultar máximo {GRAPH_MAX_ATTACHMENTS_LOTE} messageIds.", {})
+
+        self.token = graph_token_provider.obtener_token()
+        if not self.token:
+            return self.tools.output(500, "No se pudo obtener el token de acceso.", {})
+
+        attachments = obtener_attachments_lote(message_ids, self.token)
+        return self.tools.output(200, "Datos encontrados.", attachments)
+
     # Función para obtener correos solo desde BD (sin sincronizar)
-    def obtener_correos_bd_solo(self, limite=100, offset=0, estado=None):
+    def obtener_correos_bd_solo(self, limite=100, offset=0, estado=None, cursor=None, fields=None):
         """
         Obtiene correos únicamente desde la base de datos sin sincronizar
-        Útil para cargas rápidas y paginación
+        Útil para cargas rápidas y paginación (cursor keyset; offset por compatibilidad)
+        fields limita los campos de cada correo (p. ej. "id,subject,receivedAt")
         """
         try:
-            correos = self.querys.obtener_correos_bd(limite, offset, estado)
+            pagina = self.querys.obtener_pagina_correos_bd(limite, offset, estado, cursor)
             ultimo_sync = self.querys.obtener_ultimo_sync_exitoso()
             
             result = {
-                'emails': correos,
+                'emails': self.tools.proyectar_campos(pagina['emails'], fields),
+                'next_cursor': pagina['next_cursor'],
                 'ultimo_sync': ultimo_sync,
-                'total_mostrados': len(correos)
+                'total_mostrados': len(pagina['emails'])
             }
             
             return self.tools.output(200, "Correos obtenidos desde BD.", result)
             
+        except CustomException as ce:
+            return self.tools.output(ce.codigo, ce.message, {'emails': []})
         except Exception as e:
             print(f"Error obteniendo correos desde BD: {e}")
             return self.tools.output(500, "Error obteniendo correos.", {'emails': []})
@@ -552,9 +639,11 @@ class Graph:
         limite = data.get('limite', 100)
         offset = data.get('offset', 0)
         tecnico_id = data.get('tecnico_id', None)
+        cursor = data.get('cursor')
         
         try:
-            resultado = self.querys.obtener_tickets_correos(vista, limite, offset, tecnico_id)
+            resultado = self.querys.obtener_tickets_correos(vista, limite, offset, tecnico_id, cursor)
+            resultado['tickets'] = self.tools.proyectar_campos(resultado['tickets'], data.get('fields'))
             
             # Mensaje dinámico según filtros aplicados
             mensaje = f"Tickets obtenidos para vista '{vista}'"
@@ -563,89 +652,91 @@ class Graph:
             
             return self.tools.output(200, mensaje, resultado)
                 
+        except CustomException as ce:
+            return self.tools.output(ce.codigo, ce.message, {})
         except Exception as e:
             print(f"Error obteniendo tickets de correos: {e}")
             return self.tools.output(500, "Error obteniendo tickets.", {})
     
     # Función para obtener estados de tickets
-    def obtener_estados_tickets(self):
+    def obtener_estados_tickets(self, if_none_match=None):
         """
         Obtiene todos los estados de tickets disponibles
         """
         try:
             estados = self.querys.obtener_estados_tickets()
             
-            return self.tools.output(200, "Estados de tickets obtenidos.", estados)
+            return self.tools.output_catalogo("Estados de tickets obtenidos.", estados, self.querys.obtener_version_catalogo('estados'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo estados de tickets: {e}")
             return self.tools.output(500, "Error obteniendo estados.", {})
     
     # Función para obtener técnicos de gestión TIC
-    def obtener_tecnicos_gestion_tic(self):
+    def obtener_tecnicos_gestion_tic(self, if_none_match=None):
         """
         Obtiene todos los técnicos de gestión TIC disponibles
         """
         try:
             tecnicos = self.querys.obtener_tecnicos_gestion_tic()
             
-            return self.tools.output(200, "Técnicos de gestión TIC obtenidos.", tecnicos)
+            return self.tools.output_catalogo("Técnicos de gestión TIC obtenidos.", tecnicos, self.querys.obtener_version_catalogo('tecnicos'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo técnicos de gestión TIC: {e}")
             return self.tools.output(500, "Error obteniendo técnicos.", {})
 
     # Función para obtener todas las prioridades disponibles
-    def obtener_prioridades(self):
+    def obtener_prioridades(self, if_none_match=None):
         """
         Obtiene todas las prioridades disponibles
         """
         try:
             prioridades = self.querys.obtener_prioridades()
             
-            return self.tools.output(200, "Prioridades obtenidas.", prioridades)
+            return self.tools.output_catalogo("Prioridades obtenidas.", prioridades, self.querys.obtener_version_catalogo('prioridades'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo prioridades: {e}")
             return self.tools.output(500, "Error obteniendo prioridades.", {})
 
     # Función para obtener todos los tipos de soporte disponibles
-    def obtener_tipo_soporte(self):
+    def obtener_tipo_soporte(self, if_none_match=None):
         """
         Obtiene todos los tipos de soporte disponibles
         """
         try:
             tipos_soporte = self.querys.obtener_tipo_soporte()
             
-            return self.tools.output(200, "Tipos de soporte obtenidos.", tipos_soporte)
+            return self.tools.output_catalogo("Tipos de soporte obtenidos.", tipos_soporte, self.querys.obtener_version_catalogo('tipos_soporte'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo tipos de soporte: {e}")
             return self.tools.output(500, "Error obteniendo tipos de soporte.", {})
 
     # Función para obtener todos los tipos de ticket disponibles
-    def obtener_tipo_ticket(self):
+    def obtener_tipo_ticket(self, if_none_match=None):
         """
         Obtiene todos los tipos de ticket disponibles
         """
         try:
             tipos_ticket = self.querys.obtener_tipo_ticket()
             
-            return self.tools.output(200, "Tipos de ticket obtenidos.", tipos_ticket)
+            return self.tools.output_catalogo("Tipos de ticket obtenidos.", tipos_ticket, self.querys.obtener_version_catalogo('tipos_ticket'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo tipos de ticket: {e}")
             return self.tools.output(500, "Error obteniendo tipos de ticket.", {})
 
     # Función para obtener todos los macroprocesos disponibles
-    def obtener_macroprocesos(self):
+    def obtener_macroprocesos(self, if_none_match=None):
         """
         Obtiene todos los macroprocesos disponibles
         """
         try:
             macroprocesos = self.querys.obtener_macroprocesos()
             
-            return self.tools.output(200, "Macroprocesos obtenidos.", macroprocesos)
+            return self.tools.output_catalogo("Macroprocesos obtenidos.", macroprocesos, self.querys.obtener_version_catalogo('macroprocesos'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo macroprocesos: {e}")
@@ -665,7 +756,10 @@ class Graph:
         - fTipoTicket: int - ID del tipo de ticket (se mapea a campo 'tipo_ticket')
         - vista: str - Vista base (todos, sin, abiertos, proceso, comp, tecnico_X)
         - limite: int - Límite de resultados
-        - offset: int - Desplazamiento para paginación
+        - cursor: str - Cursor opaco (next_cursor de la página anterior)
+        - offset: int - Desplazamiento para paginación (compatibilidad, sin cursor)
+        - incluir_total: bool - False para omitir el total (default True)
+        - fields: list|str - Campos a retornar por ticket (proyección opcional)
         """
         try:
             # Extraer parámetros con nombres del frontend
@@ -678,15 +772,19 @@ class Graph:
                 'macroproceso': data.get('fMacro') if data.get('fMacro') else None,
                 'tipo_ticket': data.get('fTipoTicket') if data.get('fTipoTicket') else None,
                 'limite': data.get('limite', 100),
-                'offset': data.get('offset', 0)
+                'offset': data.get('offset', 0),
+                'cursor': data.get('cursor') or None,
+                # El frontend puede omitir el total (p. ej. al refiltrar mientras se escribe)
+                'incluir_total': data.get('incluir_total', True) is not False
             }
             
             # Llamar al query optimizado
             resultado = self.querys.filtrar_tickets_optimizado(filtros)
+            resultado['tickets'] = self.tools.proyectar_campos(resultado['tickets'], data.get('fields'))
             
             # Contar filtros activos para mensaje
             filtros_activos = sum(1 for k, v in filtros.items() 
-                                if k not in ['vista', 'limite', 'offset'] and v is not None)
+                                if k not in ['vista', 'limite', 'offset', 'cursor', 'incluir_total'] and v is not None)
             
             mensaje = f"Tickets filtrados para vista '{filtros['vista']}'"
             if filtros_activos > 0:
@@ -694,6 +792,8 @@ class Graph:
             
             return self.tools.output(200, mensaje, resultado)
                 
+        except CustomException as ce:
+            return self.tools.output(ce.codigo, ce.message, {})
         except Exception as e:
             print(f"Error filtrando tickets: {e}")
             return self.tools.output(500, "Error aplicando filtros.", {})
@@ -790,9 +890,8 @@ class Graph:
             if not respuesta.strip():
                 return self.tools.output(400, "Se requiere contenido de la respuesta.", {})
             
-            # Obtener el token desde la base de datos
-            result = self.querys.get_token()
-            self.token = self.validar_existencia_token(result)
+            # Obtener el token compartido (en memoria, renovado en segundo plano)
+            self.token = graph_token_provider.obtener_token()
 
             if not self.token:
                 return self.tools.output(400, "No se pudo obtener token de acceso.", {})
@@ -827,15 +926,18 @@ class Graph:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            response = graph_session.post(url, headers=headers, json=payload)
 
             if response.status_code in [200, 202]:
                 # Registrar la respuesta en la base de datos
                 self.querys.registrar_respuesta_correo(
                     message_id=message_id,
                     respuesta=respuesta,
-                    ticket_id=ticket_id
+                    ticket_id=ticket_id,
+                    contenido_html=payload["message"]["body"]["content"]
                 )
+                # El hilo en caché ya no incluye la respuesta enviada
+                invalidar_hilos([correo_original.get('conversation_id')])
                 
                 return self.tools.output(200, "Respuesta enviada exitosamente.", {
                     "message_id": message_id,
@@ -857,85 +959,53 @@ class Graph:
         """
         try:
             message_id = data.get('message_id')
+            conversation_id = data.get('conversation_id')
             
-            if not message_id:
+            if not message_id and not conversation_id:
                 return self.tools.output(400, "Se requiere message_id.", {})
             
-            # Obtener el token desde la base de datos
-            result = self.querys.get_token()
-            self.token = self.validar_existencia_token(result)
-
-            if not self.token:
-                return self.tools.output(400, "No se pudo obtener token de acceso.", {})
-
-            # Primero obtener el mensaje original para extraer el conversation ID
-            url_original = f"https://graph.microsoft.com/v1.0/users/{EMAIL_USER}/messages/{message_id}"
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json"
-            }
-            
-            response_original = requests.get(url_original, headers=headers)
-
-            if response_original.status_code != 200:
-                print(f"Error obteniendo mensaje original: {response_original.text}")
-                return self.tools.output(404, "Mensaje original no encontrado.", {})
-            
-            mensaje_data = response_original.json()
-            conversation_id = mensaje_data.get('conversationId')
-            
+            # El conversation ID se guarda al sincronizar: Graph solo se consulta si falta en BD
             if not conversation_id:
-                return self.tools.output(400, "No se pudo obtener conversation ID.", {})
-
-            # Usar método robusto: obtener mensajes recientes y filtrar localmente
-            # Esto evita el problema de filtros complejos en Microsoft Graph
-            url_conversacion = f"https://graph.microsoft.com/v1.0/users/{EMAIL_USER}/messages"
-            params = {
-                "$top": "100",  # Aumentar para asegurar que capturemos toda la conversación
-                "$orderby": "receivedDateTime desc",
-                "$select": "id,conversationId,subject,from,receivedDateTime,body,isRead"
-            }
-            
-            response_hilo = requests.get(url_conversacion, headers=headers, params=params)
-            
-            if response_hilo.status_code == 200:
-                todos_mensajes = response_hilo.json().get('value', [])
-                
-                # Filtrar mensajes de la misma conversación localmente
-                mensajes_conversacion = [msg for msg in todos_mensajes if msg.get('conversationId') == conversation_id]
-                
-                # Ya están ordenados por receivedDateTime desc, así que no necesitamos reordenar
-                hilo_data = {'value': mensajes_conversacion}
-            else:
-                print(f"Error obteniendo mensajes: {response_hilo.text}")
-                return self.tools.output(500, f"No se pudo obtener el hilo de conversación: {response_hilo.status_code}", {})
-            
-            if response_hilo.status_code == 200:
-                # hilo_data ya está asignado en el bloque anterior
-                mensajes = hilo_data.get('value', [])
-                
-                # Procesar cada mensaje del hilo
-                hilo_procesado = []
-                for mensaje in mensajes:
-                    mensaje_procesado = {
-                        'id': mensaje.get('id'),
-                        'subject': mensaje.get('subject'),
-                        'from_name': mensaje.get('from', {}).get('emailAddress', {}).get('name', ''),
-                        'from_email': mensaje.get('from', {}).get('emailAddress', {}).get('address', ''),
-                        'receivedDateTime': mensaje.get('receivedDateTime'),
-                        'body': mensaje.get('body', {}).get('content', ''),
-                        'isRead': mensaje.get('isRead', False)
-                    }
-                    hilo_procesado.append(mensaje_procesado)
-                
+                conversation_id = self.querys.obtener_conversation_id_por_message_id(message_id)
+
+            # Hilo local (intranet_hilo_mensajes): basta si está vigente y contiene el mensaje pedido
+            ticket_id = data.get('ticket_id')
+            hilo_procesado, vigente = self.querys.obtener_mensajes_hilo(conversation_id, ticket_id) if conversation_id else ([], False)
+            if vigente and (not message_id or any(mensaje['id'] == message_id for mensaje in hilo_procesado)):
                 return self.tools.output(200, f"Hilo de conversación obtenido. {len(hilo_procesado)} mensajes.", {
                     'conversacion_id': conversation_id,
                     'mensajes': hilo_procesado,
                     'total_mensajes': len(hilo_procesado)
                 })
-            else:
-                print(f"Error obteniendo hilo - Status: {response_hilo.status_code}, Texto: {response_hilo.text}")
-                return self.tools.output(500, f"Error obteniendo hilo de conversación: {response_hilo.status_code}", {})
+
+            # Obtener el token compartido (en memoria, renovado en segundo plano)
+            self.token = graph_token_provider.obtener_token()
+
+            if not self.token:
+                return self.tools.output(400, "No se pudo obtener token de acceso.", {})
+
+            if not conversation_id:
+                conversation_id = obtener_conversation_id_graph(message_id, self.token)
+            
+            if not conversation_id:
+                return self.tools.output(404, "No se pudo obtener conversation ID.", {})
+
+            # Filtro conversationId en Graph (paginado), con caché por conversación
+            hilo_procesado = obtener_hilo(conversation_id, self.token)
+
+            if hilo_procesado is None:
+                return self.tools.output(500, "No se pudo obtener el hilo de conversación.", {})
+
+            # Los mensajes que faltaban quedan en el hilo local para las siguientes consultas;
+            # releído, el hilo incluye también las respuestas enlazadas solo por ticket_id
+            if self.querys.completar_hilo_desde_graph(conversation_id, hilo_procesado, ticket_id):
+                hilo_procesado = self.querys.obtener_mensajes_hilo(conversation_id, ticket_id)[0] or hilo_procesado
+            
+            return self.tools.output(200, f"Hilo de conversación obtenido. {len(hilo_procesado)} mensajes.", {
+                'conversacion_id': conversation_id,
+                'mensajes': hilo_procesado,
+                'total_mensajes': len(hilo_procesado)
+            })
                 
         except Exception as e:
             print(f"Error obteniendo hilo de conversación: {e}")
@@ -958,9 +1028,8 @@ class Graph:
                 "data": {}
             }
         
-        # Obtenemos el token desde la base de datos
-        result = self.querys.get_token()
-        self.token = self.validar_existencia_token(result)
+        # Obtener el token compartido (en memoria, renovado en segundo plano)
+        self.token = graph_token_provider.obtener_token()
 
         if not self.token:
             return self.tools.output(400, "No se pudo obtener token de acceso.")
@@ -974,7 +1043,7 @@ class Graph:
             
             # Obtener el correo original para saber a quién responder (usar usuario específico)
             correo_url = f"{MICROSOFT_URL_GRAPH}{EMAIL_USER}/messages/{message_id}"
-            response_correo = requests.get(correo_url, headers=headers_correo)
+            response_correo = graph_session.get(correo_url, headers=headers_correo)
             
             if response_correo.status_code != 200:
                 print(f"Error obteniendo correo original - Status: {response_correo.status_code}")
@@ -1027,7 +1096,7 @@ class Graph:
                 'Content-Type': 'application/json'
             }
             
-            response_reply = requests.post(reply_url, json=reply_data, headers=headers_reply)
+            response_reply = graph_session.post(reply_url, json=reply_data, headers=headers_reply)
             
             if response_reply.status_code == 202:
                 return self.tools.output(200, "Respuesta automática enviada exitosamente.", {
@@ -1069,9 +1138,8 @@ class Graph:
         if not message_id_clean or len(message_id_clean) < 10:
             return self.tools.output(400, f"Message ID inválido: '{message_id_clean}'")
             
-        # Obtenemos el token desde la base de datos
-        result = self.querys.get_token()
-        self.token = self.validar_existencia_token(result)
+        # Obtener el token compartido (en memoria, renovado en segundo plano)
+        self.token = graph_token_provider.obtener_token()
 
         if not self.token:
             return self.tools.output(400, "No se pudo obtener token de acceso.")
@@ -1124,7 +1192,7 @@ class Graph:
                 'Content-Type': 'application/json'
             }
             
-            response_reply = requests.post(reply_url, json=reply_data, headers=headers_reply)
+            response_reply = graph_session.post(reply_url, json=reply_data, headers=headers_reply)
             
             if response_reply.status_code == 202:
                 print(f"✅ Respuesta automática optimizada enviada para ticket {ticket_id} a {from_email}")
@@ -1156,9 +1224,8 @@ class Graph:
         if not ticket_id or not from_email:
             return self.tools.output(400, "Se requieren ticket_id y from_email")
 
-        # Obtenemos el token desde la base de datos
-        result = self.querys.get_token()
-        self.token = self.validar_existencia_token(result)
+        # Obtener el token compartido (en memoria, renovado en segundo plano)
+        self.token = graph_token_provider.obtener_token()
 
         if not self.token:
             return self.tools.output(400, "No se pudo obtener token de acceso.")
@@ -1229,7 +1296,7 @@ class Graph:
             }
             
 
-            response_send = requests.post(send_url, json=email_data, headers=headers_send)
+            response_send = graph_session.post(send_url, json=email_data, headers=headers_send)
             if response_send.status_code != 202:
                 print(f"📋 Response body: {response_send.text}")
             
@@ -1,13 +1,9 @@
-import requests
 from Utils.tools import Tools, CustomException
 from Utils.querys import Querys
+from Utils.analitica import FRECUENCIAS, tickets_a_dataframe, calcular_indicadores
 from datetime import datetime, timedelta
 
-from Utils.constants import (
-    MICROSOFT_CLIENT_ID, MICROSOFT_CLIENT_SECRET, MICROSOFT_TENANT_ID,
-    MICROSOFT_API_SCOPE, MICROSOFT_URL, MICROSOFT_URL_GRAPH, PARENT_FOLDER,
-    TARGET_FOLDER, EMAIL_USER
-)
+from Utils.constants import INDICADORES_MAX_ANIOS, INDICADORES_ANIO_MIN, INDICADORES_ANIO_MAX
 
 class Indicadores:
 
@@ -61,6 +57,112 @@ class Indicadores:
             print(f"Error obteniendo indicadores estratégicos: {e}")
             return self.tools.output(500, "Error obteniendo indicadores estratégicos.", {})
     
+    # Función para comparar los indicadores mensuales de varios años
+    def obtener_indicadores_comparativo(self, data=None):
+        """
+        Obtiene los indicadores de varios años en una sola consulta.
+        Recibe 'anios' (lista) o un rango 'anio_inicio' / 'anio_fin', y 'tipo_ticket' (1 = Gestión, 2 = Estratégico)
+        """
+        try:
+            filtros = data or {}
+            anios = filtros.get('anios')
+
+            if anios is not None and not isinstance(anios, list):
+                return self.tools.output(400, "'anios' debe ser una lista de años.", {})
+
+            try:
+                tipo_ticket = int(filtros.get('tipo_ticket', 1))  # Default 1 (Gestión)
+                if anios:
+                    anios = {int(anio) for anio in anios}
+                    anio_inicio, anio_fin = min(anios), max(anios)
+                else:
+                    anio_inicio = int(filtros.get('anio_inicio'))
+                    anio_fin = int(filtros.get('anio_fin', anio_inicio))
+                    anio_inicio, anio_fin = min(anio_inicio, anio_fin), max(anio_inicio, anio_fin)
+            except (TypeError, ValueError):
+                return self.tools.output(400, "Se requiere 'anios' o 'anio_inicio' y 'anio_fin' válidos, y un tipo_ticket numérico.", {})
+
+            if anio_inicio < INDICADORES_ANIO_MIN or anio_fin > INDICADORES_ANIO_MAX:
+                return self.tools.output(400, f"Los años deben estar entre {INDICADORES_ANIO_MIN} y {INDICADORES_ANIO_MAX}.", {})
+
+            anios = sorted(anios) if anios else list(range(anio_inicio, anio_fin + 1))
+            if len(anios) > INDICADORES_MAX_ANIOS:
+                return self.tools.output(400, f"Se pueden comparar máximo {INDICADORES_MAX_ANIOS} años.", {})
+
+            if tipo_ticket not in (1, 2):
+                return self.tools.output(400, "El tipo_ticket debe ser 1 (Gestión) o 2 (Estratégico).", {})
+
+            indicadores = self.querys.obtener_indicadores_comparativo(anios, tipo_ticket)
+
+            return self.tools.output(200, "Indicadores comparativos obtenidos exitosamente.", indicadores)
+
+        except Exception as e:
+            print(f"Error obteniendo indicadores comparativos: {e}")
+            return self.tools.output(500, "Error obteniendo indicadores comparativos.", {})
+
+    # Función para obtener indicadores de un rango de fechas arbitrario
+    def obtener_indicadores_periodo(self, data=None):
+        """
+        Obtiene los indicadores entre fecha_inicio y fecha_fin (inclusive, 'YYYY-MM-DD')
+        agrupados por 'frecuencia': dia, semana, mes (default), trimestre o anio.
+        tipo_ticket: 1 = Gestión, 2 = Estratégico (sin tipo_ticket se toman todos los tickets)
+        """
+        try:
+            filtros = data or {}
+            frecuencia = filtros.get('frecuencia', 'mes')
+            tipo_ticket = filtros.get('tipo_ticket')
+
+            if frecuencia not in FRECUENCIAS:
+                return self.tools.output(400, f"Frecuencia no válida. Opciones: {', '.join(FRECUENCIAS)}.", {})
+
+            try:
+                inicio = datetime.strptime(str(filtros.get('fecha_inicio')), '%Y-%m-%d').date()
+                fin = datetime.strptime(str(filtros.get('fecha_fin')), '%Y-%m-%d').date() + timedelta(days=1)
+                tipo_ticket = int(tipo_ticket) if tipo_ticket not in (None, '') else None
+            except ValueError:
+                return self.tools.output(400, "Se requieren fecha_inicio y fecha_fin con formato YYYY-MM-DD.", {})
+
+            if fin <= inicio:
+                return self.tools.output(400, "La fecha_fin no puede ser anterior a la fecha_inicio.", {})
+
+            registros = self.querys.obtener_tickets_analitica(inicio, fin, tipo_ticket)
+            indicadores = calcular_indicadores(
+                tickets_a_dataframe(registros), inicio, fin, frecuencia,
+                # Estratégico mide la oportunidad sobre todo lo que vence en el periodo (cerrados + pendientes)
+                porcentaje_sobre='total_a_vencer' if tipo_ticket == 2 else 'completados'
+            )
+            indicadores.update({
+                'fecha_inicio': inicio.isoformat(),
+                'fecha_fin': (fin - timedelta(days=1)).isoformat(),
+                'frecuencia': frecuencia,
+                'tipo_ticket': tipo_ticket
+            })
+
+            return self.tools.output(200, "Indicadores del periodo obtenidos exitosamente.", indicadores)
+
+        except Exception as e:
+            print(f"Error obteniendo indicadores del periodo: {e}")
+            return self.tools.output(500, "Error obteniendo indicadores del periodo.", {})
+
+    # Función para reconstruir la tabla resumen de indicadores mensuales
+    def reconstruir_indicadores(self, data=None):
+        """
+        Recalcula los indicadores precalculados del año indicado (o de todos los años con tickets)
+        """
+        try:
+            filtros = data or {}
+            anio = filtros.get('anio')
+
+            resultado = self.querys.reconstruir_indicadores([anio] if anio else None)
+
+            return self.tools.output(200, "Indicadores reconstruidos exitosamente.", {
+                'anios': [{'anio': anio, 'filas': filas} for anio, filas in resultado.items()]
+            })
+
+        except Exception as e:
+            print(f"Error reconstruyendo indicadores: {e}")
+            return self.tools.output(500, "Error reconstruyendo indicadores.", {})
+
     # Función para obtener observación de un mes
     def obtener_observacion_mes(self, data=None):
         """
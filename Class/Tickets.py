@@ -1,16 +1,14 @@
-import requests
 from Utils.tools import Tools, CustomException
 from Utils.querys import Querys
-from Models.IntranetGraphTokenModel import IntranetGraphTokenModel as TokenModel
-from datetime import datetime, timedelta
+from Utils.graph_token import graph_token_provider
+from Utils.graph_client import graph_session
+from Utils.graph_conversacion import obtener_hilo, invalidar_hilos, obtener_conversation_id_graph
+from Utils.catalogos import catalogo_cache, CATALOGOS
+from datetime import datetime
 import hashlib
 import traceback
 
-from Utils.constants import (
-    MICROSOFT_CLIENT_ID, MICROSOFT_CLIENT_SECRET, MICROSOFT_TENANT_ID,
-    MICROSOFT_API_SCOPE, MICROSOFT_URL, MICROSOFT_URL_GRAPH, PARENT_FOLDER,
-    TARGET_FOLDER, EMAIL_USER
-)
+from Utils.constants import MICROSOFT_URL_GRAPH, EMAIL_USER
 
 class Tickets:
 
@@ -20,59 +18,6 @@ class Tickets:
         self.querys = Querys(self.db)
         self.token = None
 
-    # Función auxiliar para validar token (compartida con Graph)
-    def validar_existencia_token(self, result: dict):
-        # Si hay un token en BD, validar si aún está vigente
-        if result:
-            fecha_vencimiento_str = result.get('fecha_vencimiento')
-            if fecha_vencimiento_str:
-                # Convertir string a datetime si es necesario
-                if isinstance(fecha_vencimiento_str, str):
-                    fecha_vencimiento = datetime.fromisoformat(fecha_vencimiento_str.replace('Z', '+00:00'))
-                else:
-                    fecha_vencimiento = fecha_vencimiento_str
-                
-                # Comparar con tiempo actual
-                ahora = datetime.now()
-                
-                if ahora < fecha_vencimiento:
-                    # Token aún vigente
-                    return result['token']
-                else:
-                    # Token expirado, desactivar
-                    token_id = result.get('id')
-                    if token_id:
-                        self.querys.desactivar_token(token_id)
-
-        # Si no hay token válido, obtener uno nuevo desde Microsoft Graph
-        return self._crear_nuevo_token()
-
-    # Función auxiliar para crear nuevo token
-    def _crear_nuevo_token(self):
-        """Crea un nuevo token desde Microsoft Graph API."""
-        url = f"{MICROSOFT_URL}{MICROSOFT_TENANT_ID}/oauth2/v2.0/token"
-        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        data = {
-            'client_id': MICROSOFT_CLIENT_ID,
-            'scope': ' '.join(MICROSOFT_API_SCOPE),
-            'client_secret': MICROSOFT_CLIENT_SECRET,
-            'grant_type': 'client_credentials'
-        }
-        response = requests.post(url, headers=headers, data=data)
-        if response.status_code == 200:
-            token = response.json().get('access_token')
-            expires_in = response.json().get('expires_in')
-            
-            data_insert = {
-                "token": token,
-                "fecha_vencimiento": datetime.now() + timedelta(seconds=expires_in)
-            }
-            self.querys.insertar_datos(TokenModel, data_insert)
-            return token
-        
-        print(f"Error obteniendo el token: {response.status_code} - {response.text}")
-        return None
-
     # Función para convertir correo a ticket
     def convertir_correo_ticket(self, data: dict):
         """
@@ -105,9 +50,11 @@ class Tickets:
         limite = data.get('limite', 100)
         offset = data.get('offset', 0)
         tecnico_id = data.get('tecnico_id', None)
+        cursor = data.get('cursor')
         
         try:
-            resultado = self.querys.obtener_tickets_correos(vista, limite, offset, tecnico_id)
+            resultado = self.querys.obtener_tickets_correos(vista, limite, offset, tecnico_id, cursor)
+            resultado['tickets'] = self.tools.proyectar_campos(resultado['tickets'], data.get('fields'))
             
             # Mensaje dinámico según filtros aplicados
             mensaje = f"Tickets obtenidos para vista '{vista}'"
@@ -116,122 +63,182 @@ class Tickets:
             
             return self.tools.output(200, mensaje, resultado)
                 
+        except CustomException as ce:
+            return self.tools.output(ce.codigo, ce.message, {})
         except Exception as e:
             print(f"Error obteniendo tickets de correos: {e}")
             return self.tools.output(500, "Error obteniendo tickets.", {})
     
     # Función para obtener estados de tickets
-    def obtener_estados_tickets(self):
+    def obtener_estados_tickets(self, if_none_match=None):
         """
         Obtiene todos los estados de tickets disponibles
         """
         try:
             estados = self.querys.obtener_estados_tickets()
             
-            return self.tools.output(200, "Estados de tickets obtenidos.", estados)
+            return self.tools.output_catalogo("Estados de tickets obtenidos.", estados, self.querys.obtener_version_catalogo('estados'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo estados de tickets: {e}")
             return self.tools.output(500, "Error obteniendo estados.", {})
     
     # Función para obtener técnicos de gestión TIC
-    def obtener_tecnicos_gestion_tic(self):
+    def obtener_tecnicos_gestion_tic(self, if_none_match=None):
         """
         Obtiene todos los técnicos de gestión TIC disponibles
         """
         try:
             tecnicos = self.querys.obtener_tecnicos_gestion_tic()
             
-            return self.tools.output(200, "Técnicos de gestión TIC obtenidos.", tecnicos)
+            return self.tools.output_catalogo("Técnicos de gestión TIC obtenidos.", tecnicos, self.querys.obtener_version_catalogo('tecnicos'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo técnicos de gestión TIC: {e}")
             return self.tools.output(500, "Error obteniendo técnicos.", {})
 
     # Función para obtener todas las prioridades disponibles
-    def obtener_prioridades(self):
+    def obtener_prioridades(self, if_none_match=None):
         """
         Obtiene todas las prioridades disponibles
         """
         try:
             prioridades = self.querys.obtener_prioridades()
             
-            return self.tools.output(200, "Prioridades obtenidas.", prioridades)
+            return self.tools.output_catalogo("Prioridades obtenidas.", prioridades, self.querys.obtener_version_catalogo('prioridades'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo prioridades: {e}")
             return self.tools.output(500, "Error obteniendo prioridades.", {})
 
     # Función para obtener todos los tipos de soporte disponibles
-    def obtener_tipo_soporte(self):
+    def obtener_tipo_soporte(self, if_none_match=None):
         """
         Obtiene todos los tipos de soporte disponibles
         """
         try:
             tipos_soporte = self.querys.obtener_tipo_soporte()
             
-            return self.tools.output(200, "Tipos de soporte obtenidos.", tipos_soporte)
+            return self.tools.output_catalogo("Tipos de soporte obtenidos.", tipos_soporte, self.querys.obtener_version_catalogo('tipos_soporte'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo tipos de soporte: {e}")
             return self.tools.output(500, "Error obteniendo tipos de soporte.", {})
 
     # Función para obtener todos los tipos de ticket disponibles
-    def obtener_tipo_ticket(self):
+    def obtener_tipo_ticket(self, if_none_match=None):
         """
         Obtiene todos los tipos de ticket disponibles
         """
         try:
             tipos_ticket = self.querys.obtener_tipo_ticket()
             
-            return self.tools.output(200, "Tipos de ticket obtenidos.", tipos_ticket)
+            return self.tools.output_catalogo("Tipos de ticket obtenidos.", tipos_ticket, self.querys.obtener_version_catalogo('tipos_ticket'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo tipos de ticket: {e}")
             return self.tools.output(500, "Error obteniendo tipos de ticket.", {})
 
     # Función para obtener todos los macroprocesos disponibles
-    def obtener_macroprocesos(self):
+    def obtener_macroprocesos(self, if_none_match=None):
         """
         Obtiene todos los macroprocesos disponibles
         """
         try:
             macroprocesos = self.querys.obtener_macroprocesos()
             
-            return self.tools.output(200, "Macroprocesos obtenidos.", macroprocesos)
+            return self.tools.output_catalogo("Macroprocesos obtenidos.", macroprocesos, self.querys.obtener_version_catalogo('macroprocesos'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo macroprocesos: {e}")
             return self.tools.output(500, "Error obteniendo macroprocesos.", {})
 
     # Función para obtener todos los tipos de nivel disponibles
-    def obtener_tipo_nivel(self):
+    def obtener_tipo_nivel(self, if_none_match=None):
         """
         Obtiene todos los tipos de nivel disponibles
         """
         try:
             tipos_nivel = self.querys.obtener_tipo_nivel()
             
-            return self.tools.output(200, "Tipos de nivel obtenidos.", tipos_nivel)
+            return self.tools.output_catalogo("Tipos de nivel obtenidos.", tipos_nivel, self.querys.obtener_version_catalogo('tipos_nivel'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo tipos de nivel: {e}")
             return self.tools.output(500, "Error obteniendo tipos de nivel.", {})
 
     # Función para obtener todos los orígenes estratégicos disponibles
-    def obtener_origen_estrategico(self):
+    def obtener_origen_estrategico(self, if_none_match=None):
         """
         Obtiene todos los orígenes estratégicos disponibles
         """
         try:
             origenes = self.querys.obtener_origen_estrategico()
             
-            return self.tools.output(200, "Orígenes estratégicos obtenidos.", origenes)
+            return self.tools.output_catalogo("Orígenes estratégicos obtenidos.", origenes, self.querys.obtener_version_catalogo('origenes_estrategicos'), if_none_match)
                 
         except Exception as e:
             print(f"Error obteniendo orígenes estratégicos: {e}")
             return self.tools.output(500, "Error obteniendo orígenes estratégicos.", {})
 
+    # Función para obtener todos los catálogos de tickets en una sola respuesta
+    def obtener_catalogos(self, version=None, if_none_match=None):
+        """
+        Retorna estados, técnicos, prioridades, tipos de soporte, tipos de ticket,
+        macroprocesos, tipos de nivel y orígenes estratégicos con una versión combinada.
+        Si el cliente envía la versión vigente no se reenvían los catálogos.
+        """
+        try:
+            catalogos, version_actual = self.querys.obtener_catalogos()
+            
+            if version and version == version_actual:
+                data = {'version': version_actual, 'sin_cambios': True, 'catalogos': None}
+            else:
+                data = {'version': version_actual, 'sin_cambios': False, 'catalogos': catalogos}
+            
+            return self.tools.output_catalogo("Catálogos obtenidos.", data, version_actual, if_none_match)
+                
+        except Exception as e:
+            print(f"Error obteniendo catálogos: {e}")
+            return self.tools.output(500, "Error obteniendo catálogos.", {})
+
+    # Función para invalidar la caché de catálogos
+    def invalidar_catalogos(self, data: dict):
+        """
+        Descarta de la caché en memoria el catálogo indicado (o todos) para que
+        los cambios hechos en BD se reflejen sin esperar el TTL
+        """
+        catalogo = data.get('catalogo')
+        
+        if catalogo and catalogo not in CATALOGOS:
+            return self.tools.output(400, f"Catálogo desconocido: {catalogo}.", {'catalogos': list(CATALOGOS)})
+        
+        catalogo_cache.invalidar(catalogo)
+        return self.tools.output(200, "Caché de catálogos invalidada.", {'catalogo': catalogo or 'todos'})
+
+    # Función para obtener el detalle completo de un ticket (incluye el body)
+    def obtener_ticket_detalle(self, data: dict):
+        """
+        Obtiene un ticket o correo con su body_content; los listados solo traen el preview
+        """
+        ticket_id = data.get('ticket_id')
+        message_id = data.get('message_id') or data.get('messageId')
+        
+        if not (ticket_id or message_id):
+            return self.tools.output(400, "Se requiere ticket_id o message_id.", {})
+        
+        try:
+            detalle = self.querys.obtener_ticket_detalle(ticket_id, message_id)
+            
+            if not detalle:
+                return self.tools.output(404, "Ticket no encontrado.", {})
+            
+            return self.tools.output(200, "Detalle del ticket obtenido.", self.tools.proyectar_campos([detalle], data.get('fields'))[0])
+                
+        except Exception as e:
+            print(f"Error obteniendo detalle del ticket: {e}")
+            return self.tools.output(500, "Error obteniendo detalle del ticket.", {})
+
     # Función para filtrar tickets con parámetros específicos (Backend Filtering)
     def filtrar_tickets(self, data: dict):
         """
@@ -248,15 +255,19 @@ class Tickets:
                 'macroproceso': data.get('fMacro') if data.get('fMacro') else None,
                 'tipo_ticket': data.get('fTipoTicket') if data.get('fTipoTicket') else None,
                 'limite': data.get('limite', 100),
-                'offset': data.get('offset', 0)
+                'offset': data.get('offset', 0),
+                'cursor': data.get('cursor') or None,
+                # El frontend puede omitir el total (p. ej. al refiltrar mientras se escribe)
+                'incluir_total': data.get('incluir_total', True) is not False
             }
             
             # Llamar al query optimizado
             resultado = self.querys.filtrar_tickets_optimizado(filtros)
+            resultado['tickets'] = self.tools.proyectar_campos(resultado['tickets'], data.get('fields'))
             
             # Contar filtros activos para mensaje
             filtros_activos = sum(1 for k, v in filtros.items() 
-                                if k not in ['vista', 'limite', 'offset'] and v is not None)
+                                if k not in ['vista', 'limite', 'offset', 'cursor', 'incluir_total'] and v is not None)
             
             mensaje = f"Tickets filtrados para vista '{filtros['vista']}'"
             if filtros_activos > 0:
@@ -264,6 +275,8 @@ class Tickets:
             
             return self.tools.output(200, mensaje, resultado)
                 
+        except CustomException as ce:
+            return self.tools.output(ce.codigo, ce.message, {})
         except Exception as e:
             print(f"Error filtrando tickets: {e}")
             return self.tools.output(500, "Error aplicando filtros.", {})
@@ -353,9 +366,8 @@ class Tickets:
             if not message_id or not respuesta:
                 return self.tools.output(400, "Se requieren message_id y respuesta.", {})
 
-            # Obtener el token desde la base de datos
-            result = self.querys.get_token()
-            self.token = self.validar_existencia_token(result)
+            # Obtener el token compartido (en memoria, renovado en segundo plano)
+            self.token = graph_token_provider.obtener_token()
 
             if not self.token:
                 return self.tools.output(400, "No se pudo obtener token de acceso.", {})
@@ -367,7 +379,7 @@ class Tickets:
                 "Content-Type": "application/json"
             }
             
-            response_info = requests.get(url_correo, headers=headers_info)
+            response_info = graph_session.get(url_correo, headers=headers_info)
 
             if response_info.status_code != 200:
                 print(f"Error obteniendo correo original: {response_info.text}")
@@ -399,15 +411,18 @@ class Tickets:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            response = graph_session.post(url, headers=headers, json=payload)
 
             if response.status_code in [200, 202]:
                 # Registrar la respuesta en la base de datos
                 self.querys.registrar_respuesta_correo(
                     message_id=message_id,
                     respuesta=respuesta,
-                    ticket_id=ticket_id
+                    ticket_id=ticket_id,
+                    contenido_html=payload["message"]["body"]["content"]
                 )
+                # El hilo en caché ya no incluye la respuesta enviada
+                invalidar_hilos([correo_original.get('conversationId')])
                 
                 return self.tools.output(200, "Respuesta enviada exitosamente.", {
                     "message_id": message_id,
@@ -429,83 +444,53 @@ class Tickets:
         """
         try:
             message_id = data.get('message_id')
+            conversation_id = data.get('conversation_id')
             
-            if not message_id:
+            if not message_id and not conversation_id:
                 return self.tools.output(400, "Se requiere message_id.", {})
             
-            # Obtener el token desde la base de datos
-            result = self.querys.get_token()
-            self.token = self.validar_existencia_token(result)
+            # El conversation ID se guarda al sincronizar: Graph solo se consulta si falta en BD
+            if not conversation_id:
+                conversation_id = self.querys.obtener_conversation_id_por_message_id(message_id)
+
+            # Hilo local (intranet_hilo_mensajes): basta si está vigente y contiene el mensaje pedido
+            ticket_id = data.get('ticket_id')
+            hilo_procesado, vigente = self.querys.obtener_mensajes_hilo(conversation_id, ticket_id) if conversation_id else ([], False)
+            if vigente and (not message_id or any(mensaje['id'] == message_id for mensaje in hilo_procesado)):
+                return self.tools.output(200, f"Hilo de conversación obtenido. {len(hilo_procesado)} mensajes.", {
+                    'conversacion_id': conversation_id,
+                    'mensajes': hilo_procesado,
+                    'total_mensajes': len(hilo_procesado)
+                })
+
+            # Obtener el token compartido (en memoria, renovado en segundo plano)
+            self.token = graph_token_provider.obtener_token()
 
             if not self.token:
                 return self.tools.output(400, "No se pudo obtener token de acceso.", {})
 
-            # Primero obtener el mensaje original para extraer el conversation ID
-            url_original = f"https://graph.microsoft.com/v1.0/users/{EMAIL_USER}/messages/{message_id}"
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json"
-            }
-            
-            response_original = requests.get(url_original, headers=headers)
-
-            if response_original.status_code != 200:
-                print(f"Error obteniendo mensaje original: {response_original.text}")
-                return self.tools.output(404, "Mensaje original no encontrado.", {})
-            
-            mensaje_data = response_original.json()
-            conversation_id = mensaje_data.get('conversationId')
-            
             if not conversation_id:
-                return self.tools.output(400, "No se pudo obtener conversation ID.", {})
-
-            # Usar método robusto: obtener mensajes recientes y filtrar localmente
-            url_conversacion = f"https://graph.microsoft.com/v1.0/users/{EMAIL_USER}/messages"
-            params = {
-                "$top": "100",  # Aumentar para asegurar que capturemos toda la conversación
-                "$orderby": "receivedDateTime desc",
-                "$select": "id,conversationId,subject,from,receivedDateTime,body,isRead"
-            }
+                conversation_id = obtener_conversation_id_graph(message_id, self.token)
             
-            response_hilo = requests.get(url_conversacion, headers=headers, params=params)
+            if not conversation_id:
+                return self.tools.output(404, "No se pudo obtener conversation ID.", {})
+
+            # Filtro conversationId en Graph (paginado), con caché por conversación
+            hilo_procesado = obtener_hilo(conversation_id, self.token)
+
+            if hilo_procesado is None:
+                return self.tools.output(500, "No se pudo obtener el hilo de conversación.", {})
+
+            # Los mensajes que faltaban quedan en el hilo local para las siguientes consultas;
+            # releído, el hilo incluye también las respuestas enlazadas solo por ticket_id
+            if self.querys.completar_hilo_desde_graph(conversation_id, hilo_procesado, ticket_id):
+                hilo_procesado = self.querys.obtener_mensajes_hilo(conversation_id, ticket_id)[0] or hilo_procesado
             
-            if response_hilo.status_code == 200:
-                todos_mensajes = response_hilo.json().get('value', [])
-                
-                # Filtrar mensajes de la misma conversación localmente
-                mensajes_conversacion = [msg for msg in todos_mensajes if msg.get('conversationId') == conversation_id]
-                
-                # Ya están ordenados por receivedDateTime desc
-                hilo_data = {'value': mensajes_conversacion}
-            else:
-                print(f"Error obteniendo mensajes: {response_hilo.text}")
-                return self.tools.output(500, f"No se pudo obtener el hilo de conversación: {response_hilo.status_code}", {})
-            
-            if response_hilo.status_code == 200:
-                mensajes = hilo_data.get('value', [])
-                
-                # Procesar cada mensaje del hilo
-                hilo_procesado = []
-                for mensaje in mensajes:
-                    mensaje_procesado = {
-                        'id': mensaje.get('id'),
-                        'subject': mensaje.get('subject'),
-                        'from_name': mensaje.get('from', {}).get('emailAddress', {}).get('name', ''),
-                        'from_email': mensaje.get('from', {}).get('emailAddress', {}).get('address', ''),
-                        'receivedDateTime': mensaje.get('receivedDateTime'),
-                        'body': mensaje.get('body', {}).get('content', ''),
-                        'isRead': mensaje.get('isRead', False)
-                    }
-                    hilo_procesado.append(mensaje_procesado)
-                
-                return self.tools.output(200, f"Hilo de conversación obtenido. {len(hilo_procesado)} mensajes.", {
-                    'conversacion_id': conversation_id,
-                    'mensajes': hilo_procesado,
-                    'total_mensajes': len(hilo_procesado)
-                })
-            else:
-                print(f"Error obteniendo hilo - Status: {response_hilo.status_code}, Texto: {response_hilo.text}")
-                return self.tools.output(500, f"Error obteniendo hilo de conversación: {response_hilo.status_code}", {})
+            return self.tools.output(200, f"Hilo de conversación obtenido. {len(hilo_procesado)} mensajes.", {
+                'conversacion_id': conversation_id,
+                'mensajes': hilo_procesado,
+                'total_mensajes': len(hilo_procesado)
+            })
                 
         except Exception as e:
             print(f"Error obteniendo hilo de conversación: {e}")
@@ -528,9 +513,8 @@ class Tickets:
                 "data": {}
             }
         
-        # Obtenemos el token desde la base de datos
-        result = self.querys.get_token()
-        self.token = self.validar_existencia_token(result)
+        # Obtener el token compartido (en memoria, renovado en segundo plano)
+        self.token = graph_token_provider.obtener_token()
 
         if not self.token:
             return self.tools.output(400, "No se pudo obtener token de acceso.")
@@ -544,7 +528,7 @@ class Tickets:
             
             # Obtener el correo original para saber a quién responder
             correo_url = f"{MICROSOFT_URL_GRAPH}{EMAIL_USER}/messages/{message_id}"
-            response_correo = requests.get(correo_url, headers=headers_correo)
+            response_correo = graph_session.get(correo_url, headers=headers_correo)
             
             if response_correo.status_code != 200:
                 print(f"Error obteniendo correo original - Status: {response_correo.status_code}")
@@ -597,7 +581,7 @@ class Tickets:
                 'Content-Type': 'application/json'
             }
             
-            response_reply = requests.post(reply_url, json=reply_data, headers=headers_reply)
+            response_reply = graph_session.post(reply_url, json=reply_data, headers=headers_reply)
             
             if response_reply.status_code == 202:
                 return self.tools.output(200, "Respuesta automática enviada exitosamente.", {
@@ -639,9 +623,8 @@ class Tickets:
         if not message_id_clean or len(message_id_clean) < 10:
             return self.tools.output(400, f"Message ID inválido: '{message_id_clean}'")
             
-        # Obtenemos el token desde la base de datos
-        result = self.querys.get_token()
-        self.token = self.validar_existencia_token(result)
+        # Obtener el token compartido (en memoria, renovado en segundo plano)
+        self.token = graph_token_provider.obtener_token()
 
         if not self.token:
             return self.tools.output(400, "No se pudo obtener token de acceso.")
@@ -694,7 +677,7 @@ class Tickets:
                 'Content-Type': 'application/json'
             }
             
-            response_reply = requests.post(reply_url, json=reply_data, headers=headers_reply)
+            response_reply = graph_session.post(reply_url, json=reply_data, headers=headers_reply)
             
             if response_reply.status_code == 202:
                 print(f"✅ Respuesta automática optimizada enviada para ticket {ticket_id} a {from_email}")
@@ -726,9 +709,8 @@ class Tickets:
         if not ticket_id or not from_email:
             return self.tools.output(400, "Se requieren ticket_id y from_email")
             
-        # Obtenemos el token desde la base de datos
-        result = self.querys.get_token()
-        self.token = self.validar_existencia_token(result)
+        # Obtener el token compartido (en memoria, renovado en segundo plano)
+        self.token = graph_token_provider.obtener_token()
 
         if not self.token:
             return self.tools.output(400, "No se pudo obtener token de acceso.")
@@ -799,7 +781,7 @@ class Tickets:
                 'Content-Type': 'application/json'
             }
             
-            response_send = requests.post(send_url, json=mail_data, headers=headers_send)
+            response_send = graph_session.post(send_url, json=mail_data, headers=headers_send)
             
             if response_send.status_code == 202:
                 print(f"✅ Correo nuevo automático enviado para ticket {ticket_id} a {from_email}")
@@ -37,6 +37,7 @@ engine = sqlalchemy.create_engine(
     max_overflow=20,
     pool_pre_ping=True,  # Verifica la conexión antes de usarla
     pool_recycle=3600,   # Recicla conexiones cada hora
+    fast_executemany=True,  # Envía los executemany (inserciones/actualizaciones en lote) en un solo viaje
     connect_args={
         "timeout": 30,   # Timeout de conexión
         "autocommit": True
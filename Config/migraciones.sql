@@ -0,0 +1,63 @@
+-- Cambios de esquema sobre tablas existentes.
+-- BASE.metadata.create_all solo crea tablas nuevas, por lo que las columnas e índices
+-- agregados a tablas ya creadas deben aplicarse manualmente en SQL Server, en orden.
+
+-- Sincronización incremental con messages/delta de Microsoft Graph
+IF COL_LENGTH('dbo.intranet_sync_log', 'delta_link') IS NULL
+    ALTER TABLE dbo.intranet_sync_log ADD delta_link NVARCHAR(MAX) NULL;
+GO
+
+-- Paginación keyset (cursor) de bandeja y tickets
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_ticket_received_date' AND object_id = OBJECT_ID('dbo.intranet_correos_microsoft'))
+    CREATE INDEX idx_ticket_received_date ON dbo.intranet_correos_microsoft (ticket, activo, received_date, id);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_ticket_created_at' AND object_id = OBJECT_ID('dbo.intranet_correos_microsoft'))
+    CREATE INDEX idx_ticket_created_at ON dbo.intranet_correos_microsoft (ticket, activo, created_at, id);
+GO
+
+-- Búsqueda full-text de tickets (filtro q). Requiere el componente Full-Text Search de SQL Server.
+-- Activar en la aplicación con TICKETS_FULLTEXT_ENABLED=true una vez creado el índice.
+IF NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'ftc_intranet_tickets')
+    CREATE FULLTEXT CATALOG ftc_intranet_tickets;
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('dbo.intranet_correos_microsoft'))
+BEGIN
+    -- El índice full-text se ancla a la clave primaria, cuyo nombre lo genera SQL Server
+    DECLARE @pk SYSNAME = (
+        SELECT name FROM sys.indexes
+        WHERE object_id = OBJECT_ID('dbo.intranet_correos_microsoft') AND is_primary_key = 1
+    );
+    EXEC('CREATE FULLTEXT INDEX ON dbo.intranet_correos_microsoft (subject, from_name, from_email, body_content)
+          KEY INDEX ' + @pk + ' ON ftc_intranet_tickets WITH CHANGE_TRACKING AUTO');
+END
+GO
+
+-- Filtros de rango (sargables) de dashboard e indicadores
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_fecha_cierre' AND object_id = OBJECT_ID('dbo.intranet_correos_microsoft'))
+    CREATE INDEX idx_fecha_cierre ON dbo.intranet_correos_microsoft (fecha_cierre);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'idx_fecha_vencimiento' AND object_id = OBJECT_ID('dbo.intranet_correos_microsoft'))
+    CREATE INDEX idx_fecha_vencimiento ON dbo.intranet_correos_microsoft (fecha_vencimiento);
+GO
+
+-- Indicadores mensuales precalculados (intranet_indicadores_mensuales).
+-- La tabla la crea create_all; la carga inicial se hace con:
+--     python -m Utils.reconstruir_indicadores
+
+-- Hilos de conversación de los tickets (intranet_hilo_mensajes).
+-- La tabla la crea create_all; la sincronización y responder_correo la alimentan.
+-- Los hilos de tickets anteriores se completan desde Graph la primera vez que se consultan.
+-- El body de los mensajes que también están en intranet_correos_microsoft se lee del correo;
+-- libera el body duplicado que guardaban las filas creadas antes de este cambio.
+UPDATE h SET body_content = NULL
+FROM dbo.intranet_hilo_mensajes h
+INNER JOIN dbo.intranet_correos_microsoft c ON c.message_id = h.message_id
+WHERE h.body_content IS NOT NULL;
+GO
+
+-- Subject normalizado (sin prefijos RE:/FW:, en minúsculas) para comparar respuestas sin normalizar en cada sincronización.
+-- Después de agregar la columna, completar los correos existentes con:
+--     python -m Utils.normalizar_subjects
+IF COL_LENGTH('dbo.intranet_correos_microsoft', 'subject_normalizado') IS NULL
+    ALTER TABLE dbo.intranet_correos_microsoft ADD subject_normalizado VARCHAR(255) NULL;
+GO
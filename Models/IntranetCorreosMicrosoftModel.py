@@ -1,6 +1,7 @@
 from Config.db import BASE
 from sqlalchemy import Column, String, BigInteger, Text, Integer, DateTime, Date, Index
 from datetime import datetime
+from Utils.subjects import normalizar_subject
 
 class IntranetCorreosMicrosoftModel(BASE):
 
@@ -10,6 +11,7 @@ class IntranetCorreosMicrosoftModel(BASE):
     message_id = Column(String(255), unique=True, nullable=False)  # ID único de Microsoft
     conversation_id = Column(String(255))  # ID de conversación de Microsoft Graph
     subject = Column(String(500))
+    subject_normalizado = Column(String(255))  # Sin prefijos RE:/FW:, en minúsculas (Utils.subjects)
     from_email = Column(String(255))
     from_name = Column(String(255))
     received_date = Column(DateTime)
@@ -41,12 +43,19 @@ class IntranetCorreosMicrosoftModel(BASE):
         Index('idx_received_date', 'received_date'),
         Index('idx_from_email', 'from_email'),
         Index('idx_conversation_id', 'conversation_id'),
+        # Paginación keyset de bandeja/tickets: (ticket, activo) + orden (fecha, id)
+        Index('idx_ticket_received_date', 'ticket', 'activo', 'received_date', 'id'),
+        Index('idx_ticket_created_at', 'ticket', 'activo', 'created_at', 'id'),
+        # Rangos por año/mes de los indicadores (cierre y vencimiento)
+        Index('idx_fecha_cierre', 'fecha_cierre'),
+        Index('idx_fecha_vencimiento', 'fecha_vencimiento'),
     )
 
     def __init__(self, data: dict):
         self.message_id = data.get('message_id')
         self.conversation_id = data.get('conversation_id')
         self.subject = data.get('subject', '')
+        self.subject_normalizado = normalizar_subject(self.subject)
         self.from_email = data.get('from_email', '')
         self.from_name = data.get('from_name', '')
         self.received_date = data.get('received_date')
@@ -100,9 +109,13 @@ class IntranetCorreosMicrosoftModel(BASE):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
-    def to_frontend_format(self):
-        """Convierte al formato que espera el frontend actual"""
-        return {
+    def to_frontend_format(self, incluir_body=True):
+        """
+        Convierte al formato que espera el frontend actual.
+        Los listados usan incluir_body=False: solo llevan el preview y el body se
+        consulta bajo demanda (/obtener_ticket_detalle).
+        """
+        datos = {
             'id': self.message_id,  # El frontend usa esto como ID
             'ticket_id': self.id,  # Número puro para uso interno
             'ticket_id_display': f"TCK-{self.id:04d}" if self.ticket == 1 else None,  # Formato display para UI
@@ -111,7 +124,6 @@ class IntranetCorreosMicrosoftModel(BASE):
             'from_email': f"{self.from_email}" if self.from_email else '',
             'receivedAt': self.received_date.date().isoformat() if self.received_date else None,
             'preview': self.body_preview,
-            'body': self.body_content,
             'estado': self.estado,
             'ticket': self.ticket,
             'asignado': self.asignado,
@@ -129,3 +141,6 @@ class IntranetCorreosMicrosoftModel(BASE):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
+        if incluir_body:
+            datos['body'] = self.body_content
+        return datos
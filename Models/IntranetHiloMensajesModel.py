@@ -0,0 +1,63 @@
+from Config.db import BASE
+from sqlalchemy import Column, String, BigInteger, Text, DateTime, Index
+from datetime import datetime
+
+class IntranetHiloMensajesModel(BASE):
+    """
+    Mensajes de los hilos de conversación de los tickets (entrantes y salientes).
+    - ticket_id: id del correo raíz en intranet_correos_microsoft
+    - message_id: ID de Microsoft Graph; las respuestas enviadas desde el sistema quedan sin
+      message_id (el endpoint /reply no lo retorna) hasta que el hilo se completa desde Graph
+    - body_content: solo para mensajes que no están en intranet_correos_microsoft (respuestas
+      enviadas, mensajes traídos desde Graph); los demás toman el body del correo por message_id
+    """
+
+    __tablename__ = "intranet_hilo_mensajes"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    ticket_id = Column(BigInteger, nullable=True)
+    conversation_id = Column(String(255), nullable=False)
+    message_id = Column(String(255), nullable=True)
+    direccion = Column(String(10), nullable=False, default='entrante')  # entrante | saliente
+    subject = Column(String(500))
+    from_email = Column(String(255))
+    from_name = Column(String(255))
+    fecha = Column(DateTime)
+    body_content = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        # Lectura del hilo completo en orden cronológico
+        Index('idx_hilo_conversacion_fecha', 'conversation_id', 'fecha'),
+        Index('idx_hilo_ticket_fecha', 'ticket_id', 'fecha'),
+        Index('idx_hilo_message_id', 'message_id'),
+    )
+
+    def __init__(self, data: dict):
+        self.ticket_id = data.get('ticket_id')
+        self.conversation_id = data.get('conversation_id')
+        self.message_id = data.get('message_id')
+        self.direccion = data.get('direccion', 'entrante')
+        self.subject = data.get('subject', '')
+        self.from_email = data.get('from_email', '')
+        self.from_name = data.get('from_name', '')
+        self.fecha = data.get('fecha')
+        self.body_content = data.get('body_content')
+        self.created_at = data.get('created_at', datetime.now())
+
+    def to_hilo_format(self, body_correo=None):
+        """
+        Formato de cada mensaje en /obtener_hilo_conversacion (igual al que arma Graph).
+        body_correo: body del correo con el mismo message_id, si el mensaje no guarda el suyo
+        """
+        return {
+            'id': self.message_id,
+            'subject': self.subject,
+            'from_name': self.from_name or '',
+            'from_email': self.from_email or '',
+            'receivedDateTime': self.fecha.isoformat() if self.fecha else None,
+            'body': self.body_content or body_correo or '',
+            # Los mensajes del hilo local ya fueron procesados por el sistema
+            'isRead': True,
+            'direccion': self.direccion
+        }
@@ -0,0 +1,47 @@
+from Config.db import BASE
+from sqlalchemy import Column, BigInteger, Integer, DateTime, UniqueConstraint
+from datetime import datetime
+
+class IntranetIndicadoresMensualesModel(BASE):
+    """
+    Resumen precalculado de los indicadores de tickets por mes.
+    Una fila por (anio, mes, tipo_ticket, origen_estrategico); 0 representa "sin valor".
+    - completados/oportunos/no_oportunos/sin_fecha_vencimiento: tickets cerrados (estado 3) por mes de fecha_cierre
+    - pendientes: tickets abiertos/en proceso (estado 1, 2) por mes de fecha_vencimiento
+    - ingresados: tickets por mes de received_date
+    - mes 0: fila sin contadores que marca el año como construido (aunque no tenga tickets)
+    """
+
+    __tablename__ = "intranet_indicadores_mensuales"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    tipo_ticket = Column(BigInteger, nullable=False, default=0)
+    origen_estrategico = Column(BigInteger, nullable=False, default=0)
+    completados = Column(Integer, nullable=False, default=0)
+    oportunos = Column(Integer, nullable=False, default=0)
+    no_oportunos = Column(Integer, nullable=False, default=0)
+    sin_fecha_vencimiento = Column(Integer, nullable=False, default=0)
+    pendientes = Column(Integer, nullable=False, default=0)
+    ingresados = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('anio', 'mes', 'tipo_ticket', 'origen_estrategico', name='uq_indicadores_mensuales_periodo'),
+    )
+
+    def to_dict(self):
+        return {
+            'anio': self.anio,
+            'mes': self.mes,
+            'tipo_ticket': self.tipo_ticket,
+            'origen_estrategico': self.origen_estrategico,
+            'completados': self.completados,
+            'oportunos': self.oportunos,
+            'no_oportunos': self.no_oportunos,
+            'sin_fecha_vencimiento': self.sin_fecha_vencimiento,
+            'pendientes': self.pendientes,
+            'ingresados': self.ingresados,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -15,6 +15,7 @@ class IntranetSyncLogModel(BASE):
     correos_eliminados = Column(Integer, default=0)
     estado = Column(Integer, default=1)
     mensaje_error = Column(Text)
+    delta_link = Column(Text)  # deltaLink de Graph para continuar la sincronización incremental
     created_at = Column(DateTime, default=datetime.now)
     
     # Índices para mejorar performance
@@ -33,6 +34,7 @@ class IntranetSyncLogModel(BASE):
         self.correos_eliminados = data.get('correos_eliminados', 0)
         self.estado = data.get('estado', 1)
         self.mensaje_error = data.get('mensaje_error')
+        self.delta_link = data.get('delta_link')
 
     def to_dict(self):
         """Convierte el modelo a diccionario para serialización JSON"""
@@ -46,5 +48,6 @@ class IntranetSyncLogModel(BASE):
             'correos_eliminados': self.correos_eliminados,
             'estado': self.estado,
             'mensaje_error': self.mensaje_error,
+            'delta_link': self.delta_link,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from Class.Graph import Graph
 from Utils.decorator import http_decorator
 from Config.db import get_db
+from Utils.executor_bd import ejecutor_bd
 
 graph_router = APIRouter()
 
@@ -10,8 +11,8 @@ graph_router = APIRouter()
 @http_decorator
 def obtener_correos(request: Request, db: Session = Depends(get_db)):
     """
-    Sincroniza correos de Microsoft Graph y los retorna desde BD
-    Implementa sincronización inteligente (solo nuevos correos)
+    Retorna los correos desde BD y la metadata del último sync.
+    La sincronización con Graph corre en segundo plano; forzar_sync la dispara sin esperarla.
     """
     data = getattr(request.state, "json_data", {})
     forzar_sync = data.get('forzar_sync', False)
@@ -24,22 +25,35 @@ def obtener_correos_bd(
     db: Session = Depends(get_db),
     limite: int = Query(100, description="Número máximo de correos a obtener"),
     offset: int = Query(0, description="Número de correos a saltar"),
-    estado: str = Query(None, description="Filtrar por estado (nuevo, procesado, convertido_ticket)")
+    estado: str = Query(None, description="Filtrar por estado (nuevo, procesado, convertido_ticket)"),
+    cursor: str = Query(None, description="Cursor de la página siguiente (next_cursor de la respuesta anterior)"),
+    fields: str = Query(None, description="Campos a retornar por correo, separados por coma")
 ):
     """
     Obtiene correos únicamente desde la base de datos (sin sincronizar)
     Útil para cargas rápidas y paginación
     """
-    response = Graph(db).obtener_correos_bd_solo(limite, offset, estado)
+    response = Graph(db).obtener_correos_bd_solo(limite, offset, estado, cursor, fields)
     return response
 
 @graph_router.post('/sincronizar_correos', tags=["TIC"], response_model=dict)
 @http_decorator
 def sincronizar_correos(request: Request, db: Session = Depends(get_db)):
     """
-    Fuerza una sincronización completa de correos desde Microsoft Graph
+    Ejecuta una sincronización completa de correos y espera su resultado
     """
-    response = Graph(db).obtener_correos(forzar_sync=True)
+    response = Graph(db).sincronizar_correos_ahora()
+    return response
+
+@graph_router.post('/disparar_sincronizacion', tags=["TIC"], response_model=dict)
+@http_decorator
+def disparar_sincronizacion(request: Request, db: Session = Depends(get_db)):
+    """
+    Dispara una sincronización en segundo plano y retorna sin esperarla
+    """
+    data = getattr(request.state, "json_data", {})
+    forzar_sync = data.get('forzar_sync', False)
+    response = Graph(db).disparar_sincronizacion(forzar_sync)
     return response
 
 @graph_router.post('/marcar_correo_procesado', tags=["TIC"], response_model=dict)
@@ -84,19 +98,19 @@ def obtener_tickets_correos(request: Request, db: Session = Depends(get_db)):
     return response
 
 @graph_router.get('/obtener_estados_tickets', tags=["TIC"], response_model=dict)
-def obtener_estados_tickets(db: Session = Depends(get_db)):
+def obtener_estados_tickets(request: Request, db: Session = Depends(get_db)):
     """
     Obtiene todos los estados de tickets disponibles
     """
-    response = Graph(db).obtener_estados_tickets()
+    response = Graph(db).obtener_estados_tickets(request.headers.get('if-none-match'))
     return response
 
 @graph_router.get('/obtener_tecnicos_gestion_tic', tags=["TIC"], response_model=dict)
-def obtener_tecnicos_gestion_tic(db: Session = Depends(get_db)):
+def obtener_tecnicos_gestion_tic(request: Request, db: Session = Depends(get_db)):
     """
     Obtiene todos los técnicos de gestión TIC disponibles
     """
-    response = Graph(db).obtener_tecnicos_gestion_tic()
+    response = Graph(db).obtener_tecnicos_gestion_tic(request.headers.get('if-none-match'))
     return response
 
 @graph_router.post('/obtener_attachments', tags=["TIC"], response_model=dict)
@@ -109,47 +123,57 @@ def obtener_attachments(request: Request, db: Session = Depends(get_db)):
     response = Graph(db).obtener_attachments(data)
     return response
 
+@graph_router.post('/obtener_attachments_lote', tags=["TIC"], response_model=dict)
+@http_decorator
+def obtener_attachments_lote(request: Request, db: Session = Depends(get_db)):
+    """
+    Obtiene la metadata de los attachments de varios correos (messageIds) en una sola llamada
+    """
+    data = getattr(request.state, "json_data", {})
+    response = Graph(db).obtener_attachments_lote(data)
+    return response
+
 @graph_router.post('/obtener_prioridades', tags=["TIC"], response_model=dict)
-def obtener_prioridades(db: Session = Depends(get_db)):
+def obtener_prioridades(request: Request, db: Session = Depends(get_db)):
     """
     Obtiene todas las prioridades disponibles
     """
-    response = Graph(db).obtener_prioridades()
+    response = Graph(db).obtener_prioridades(request.headers.get('if-none-match'))
     return response
 
 @graph_router.post('/obtener_tipo_soporte', tags=["TIC"], response_model=dict)
-def obtener_tipo_soporte(db: Session = Depends(get_db)):
+def obtener_tipo_soporte(request: Request, db: Session = Depends(get_db)):
     """
     Obtiene todos los tipos de soporte disponibles
     """
-    response = Graph(db).obtener_tipo_soporte()
+    response = Graph(db).obtener_tipo_soporte(request.headers.get('if-none-match'))
     return response
 
 @graph_router.post('/obtener_tipo_ticket', tags=["TIC"], response_model=dict)
-def obtener_tipo_ticket(db: Session = Depends(get_db)):
+def obtener_tipo_ticket(request: Request, db: Session = Depends(get_db)):
     """
     Obtiene todos los tipos de ticket disponibles
     """
-    response = Graph(db).obtener_tipo_ticket()
+    response = Graph(db).obtener_tipo_ticket(request.headers.get('if-none-match'))
     return response
 
 @graph_router.post('/obtener_macroprocesos', tags=["TIC"], response_model=dict)
-def obtener_macroprocesos(db: Session = Depends(get_db)):
+def obtener_macroprocesos(request: Request, db: Session = Depends(get_db)):
     """
     Obtiene todos los macroprocesos disponibles
     """
-    response = Graph(db).obtener_macroprocesos()
+    response = Graph(db).obtener_macroprocesos(request.headers.get('if-none-match'))
     return response
 
 @graph_router.post('/filtrar_tickets', tags=["TIC"], response_model=dict)
 @http_decorator
-def filtrar_tickets(request: Request, db: Session = Depends(get_db)):
+async def filtrar_tickets(request: Request):
     """
     Filtra tickets con parámetros específicos usando los campos reales de la tabla
     Frontend envía: q (texto), fEstado, fAsignado, fTipoSoporte, fMacro, fTipoTicket (IDs)
     """
     data = getattr(request.state, "json_data", {})
-    response = Graph(db).filtrar_tickets(data)
+    response = await ejecutor_bd.ejecutar(lambda db: Graph(db).filtrar_tickets(data))
     return response
 
 @graph_router.post('/actualizar_ticket', tags=["TIC"], response_model=dict)
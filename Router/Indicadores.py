@@ -3,23 +3,48 @@ from sqlalchemy.orm import Session
 from Class.Indicadores import Indicadores
 from Utils.decorator import http_decorator
 from Config.db import get_db
+from Utils.executor_bd import ejecutor_bd
 
 indicadores_router = APIRouter()
 
 @indicadores_router.post('/obtener_indicadores_gestion', tags=["INDICADORES"], response_model=dict)
 @http_decorator
-def obtener_indicadores_gestion(request: Request, db: Session = Depends(get_db)):
+async def obtener_indicadores_gestion(request: Request):
     """Obtiene indicadores de gestión mensual: tickets completados, oportunos y no oportunos"""
     data = getattr(request.state, "json_data", {})
-    response = Indicadores(db).obtener_indicadores_gestion(data)
+    response = await ejecutor_bd.ejecutar(lambda db: Indicadores(db).obtener_indicadores_gestion(data))
     return response
 
 @indicadores_router.post('/obtener_indicadores_estrategicos', tags=["INDICADORES"], response_model=dict)
 @http_decorator
-def obtener_indicadores_estrategicos(request: Request, db: Session = Depends(get_db)):
+async def obtener_indicadores_estrategicos(request: Request):
     """Obtiene indicadores de tickets estratégicos agrupados por origen_estrategico"""
     data = getattr(request.state, "json_data", {})
-    response = Indicadores(db).obtener_indicadores_estrategicos(data)
+    response = await ejecutor_bd.ejecutar(lambda db: Indicadores(db).obtener_indicadores_estrategicos(data))
+    return response
+
+@indicadores_router.post('/obtener_indicadores_comparativo', tags=["INDICADORES"], response_model=dict)
+@http_decorator
+async def obtener_indicadores_comparativo(request: Request):
+    """Obtiene los indicadores mensuales de varios años ('anios' o 'anio_inicio'/'anio_fin') en una sola consulta"""
+    data = getattr(request.state, "json_data", {})
+    response = await ejecutor_bd.ejecutar(lambda db: Indicadores(db).obtener_indicadores_comparativo(data))
+    return response
+
+@indicadores_router.post('/obtener_indicadores_periodo', tags=["INDICADORES"], response_model=dict)
+@http_decorator
+async def obtener_indicadores_periodo(request: Request):
+    """Obtiene indicadores de un rango de fechas agrupados por día, semana, mes, trimestre o año"""
+    data = getattr(request.state, "json_data", {})
+    response = await ejecutor_bd.ejecutar(lambda db: Indicadores(db).obtener_indicadores_periodo(data))
+    return response
+
+@indicadores_router.post('/reconstruir_indicadores', tags=["INDICADORES"], response_model=dict)
+@http_decorator
+def reconstruir_indicadores(request: Request, db: Session = Depends(get_db)):
+    """Recalcula la tabla resumen de indicadores mensuales (un 'anio' o todos los años)"""
+    data = getattr(request.state, "json_data", {})
+    response = Indicadores(db).reconstruir_indicadores(data)
     return response
 
 @indicadores_router.post('/obtener_observacion_mes', tags=["INDICADORES"], response_model=dict)
@@ -56,10 +81,10 @@ def guardar_analisis_causas(request: Request, db: Session = Depends(get_db)):
 
 @indicadores_router.post('/obtener_tickets_periodo', tags=["INDICADORES"], response_model=dict)
 @http_decorator
-def obtener_tickets_periodo(request: Request, db: Session = Depends(get_db)):
+async def obtener_tickets_periodo(request: Request):
     """Obtiene los tickets del periodo especificado (año y mes)"""
     data = getattr(request.state, "json_data", {})
-    response = Indicadores(db).obtener_tickets_periodo(data)
+    response = await ejecutor_bd.ejecutar(lambda db: Indicadores(db).obtener_tickets_periodo(data))
     return response
 
 @indicadores_router.post('/obtener_anios', tags=["INDICADORES"], response_model=dict)
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from Class.Tickets import Tickets
 from Utils.decorator import http_decorator
 from Config.db import get_db
+from Utils.executor_bd import ejecutor_bd
 
 tickets_router = APIRouter()
 
@@ -22,60 +23,86 @@ def obtener_tickets_correos(request: Request, db: Session = Depends(get_db)):
     response = Tickets(db).obtener_tickets_correos(data)
     return response
 
+@tickets_router.post('/obtener_ticket_detalle', tags=["TICKETS"], response_model=dict)
+@http_decorator
+def obtener_ticket_detalle(request: Request, db: Session = Depends(get_db)):
+    """Obtiene el detalle completo de un ticket (incluye el body) por ticket_id o message_id"""
+    data = getattr(request.state, "json_data", {})
+    response = Tickets(db).obtener_ticket_detalle(data)
+    return response
+
 @tickets_router.get('/obtener_estados_tickets', tags=["TICKETS"], response_model=dict)
-def obtener_estados_tickets(db: Session = Depends(get_db)):
+def obtener_estados_tickets(request: Request, db: Session = Depends(get_db)):
     """Obtiene todos los estados de tickets disponibles"""
-    response = Tickets(db).obtener_estados_tickets()
+    response = Tickets(db).obtener_estados_tickets(request.headers.get('if-none-match'))
     return response
 
 @tickets_router.get('/obtener_tecnicos_gestion_tic', tags=["TICKETS"], response_model=dict)
-def obtener_tecnicos_gestion_tic(db: Session = Depends(get_db)):
+def obtener_tecnicos_gestion_tic(request: Request, db: Session = Depends(get_db)):
     """Obtiene todos los técnicos de gestión TIC disponibles"""
-    response = Tickets(db).obtener_tecnicos_gestion_tic()
+    response = Tickets(db).obtener_tecnicos_gestion_tic(request.headers.get('if-none-match'))
     return response
 
 @tickets_router.post('/obtener_prioridades', tags=["TICKETS"], response_model=dict)
-def obtener_prioridades(db: Session = Depends(get_db)):
+def obtener_prioridades(request: Request, db: Session = Depends(get_db)):
     """Obtiene todas las prioridades disponibles"""
-    response = Tickets(db).obtener_prioridades()
+    response = Tickets(db).obtener_prioridades(request.headers.get('if-none-match'))
     return response
 
 @tickets_router.post('/obtener_tipo_soporte', tags=["TICKETS"], response_model=dict)
-def obtener_tipo_soporte(db: Session = Depends(get_db)):
+def obtener_tipo_soporte(request: Request, db: Session = Depends(get_db)):
     """Obtiene todos los tipos de soporte disponibles"""
-    response = Tickets(db).obtener_tipo_soporte()
+    response = Tickets(db).obtener_tipo_soporte(request.headers.get('if-none-match'))
     return response
 
 @tickets_router.post('/obtener_tipo_ticket', tags=["TICKETS"], response_model=dict)
-def obtener_tipo_ticket(db: Session = Depends(get_db)):
+def obtener_tipo_ticket(request: Request, db: Session = Depends(get_db)):
     """Obtiene todos los tipos de ticket disponibles"""
-    response = Tickets(db).obtener_tipo_ticket()
+    response = Tickets(db).obtener_tipo_ticket(request.headers.get('if-none-match'))
     return response
 
 @tickets_router.post('/obtener_macroprocesos', tags=["TICKETS"], response_model=dict)
-def obtener_macroprocesos(db: Session = Depends(get_db)):
+def obtener_macroprocesos(request: Request, db: Session = Depends(get_db)):
     """Obtiene todos los macroprocesos disponibles"""
-    response = Tickets(db).obtener_macroprocesos()
+    response = Tickets(db).obtener_macroprocesos(request.headers.get('if-none-match'))
     return response
 
 @tickets_router.post('/obtener_tipo_nivel', tags=["TICKETS"], response_model=dict)
-def obtener_tipo_nivel(db: Session = Depends(get_db)):
+def obtener_tipo_nivel(request: Request, db: Session = Depends(get_db)):
     """Obtiene todos los tipos de nivel disponibles"""
-    response = Tickets(db).obtener_tipo_nivel()
+    response = Tickets(db).obtener_tipo_nivel(request.headers.get('if-none-match'))
     return response
 
 @tickets_router.post('/obtener_origen_estrategico', tags=["TICKETS"], response_model=dict)
-def obtener_origen_estrategico(db: Session = Depends(get_db)):
+def obtener_origen_estrategico(request: Request, db: Session = Depends(get_db)):
     """Obtiene todos los orígenes estratégicos disponibles"""
-    response = Tickets(db).obtener_origen_estrategico()
+    response = Tickets(db).obtener_origen_estrategico(request.headers.get('if-none-match'))
+    return response
+
+@tickets_router.get('/obtener_catalogos', tags=["TICKETS"], response_model=dict)
+def obtener_catalogos(
+    request: Request,
+    db: Session = Depends(get_db),
+    version: str = Query(None, description="Versión que ya tiene el cliente; si coincide no se reenvían los catálogos")
+):
+    """Obtiene todos los catálogos de tickets en una sola llamada, con versión combinada"""
+    response = Tickets(db).obtener_catalogos(version, request.headers.get('if-none-match'))
+    return response
+
+@tickets_router.post('/invalidar_catalogos', tags=["TICKETS"], response_model=dict)
+@http_decorator
+def invalidar_catalogos(request: Request, db: Session = Depends(get_db)):
+    """Invalida la caché en memoria de catálogos (uno con 'catalogo' o todos)"""
+    data = getattr(request.state, "json_data", {})
+    response = Tickets(db).invalidar_catalogos(data)
     return response
 
 @tickets_router.post('/filtrar_tickets', tags=["TICKETS"], response_model=dict)
 @http_decorator
-def filtrar_tickets(request: Request, db: Session = Depends(get_db)):
+async def filtrar_tickets(request: Request):
     """Filtra tickets con parámetros específicos usando los campos reales de la tabla"""
     data = getattr(request.state, "json_data", {})
-    response = Tickets(db).filtrar_tickets(data)
+    response = await ejecutor_bd.ejecutar(lambda db: Tickets(db).filtrar_tickets(data))
     return response
 
 # Endpoints para respuestas automáticas y comunicación
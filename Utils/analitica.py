@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Frecuencias de agrupación admitidas (alias de periodos de pandas)
+FRECUENCIAS = {
+    'dia': 'D',
+    'semana': 'W',
+    'mes': 'M',
+    'trimestre': 'Q',
+    'anio': 'Y',
+}
+
+# Proyección de tickets que necesitan los indicadores
+COLUMNAS_TICKETS = ['id', 'tipo_ticket', 'origen_estrategico', 'estado', 'received_date', 'fecha_cierre', 'fecha_vencimiento']
+
+# Desglose de tickets estratégicos por origen_estrategico
+ORIGENES = {1: 'proyectos', 2: 'acpm', 3: 'actividades_informe'}
+
+CONTADORES = ['completados', 'oportunos', 'no_oportunos', 'pendientes', 'ingresados'] + list(ORIGENES.values())
+
+
+# Función para convertir los registros de tickets en un DataFrame tipado
+def tickets_a_dataframe(registros):
+    df = pd.DataFrame.from_records(registros, columns=COLUMNAS_TICKETS)
+    for columna in ('received_date', 'fecha_cierre', 'fecha_vencimiento'):
+        df[columna] = pd.to_datetime(df[columna], errors='coerce')
+    for columna in ('tipo_ticket', 'origen_estrategico', 'estado'):
+        df[columna] = pd.to_numeric(df[columna], errors='coerce').fillna(0).astype(int)
+    return df
+
+
+# Función para calcular los indicadores de tickets por periodo con operaciones vectorizadas
+def calcular_indicadores(df, inicio, fin, frecuencia='mes', porcentaje_sobre='completados'):
+    """
+    Calcula los indicadores del rango [inicio, fin) agrupados por periodo (dia, semana, mes, trimestre, anio):
+    - completados/oportunos/no_oportunos: tickets cerrados (estado 3) en el periodo de fecha_cierre
+    - pendientes (= tickets abiertos): estado 1-2 en el periodo de fecha_vencimiento
+    - ingresados: tickets en el periodo de received_date
+    - porcentaje: oportunos sobre 'completados' (gestión) o sobre 'total_a_vencer' (estratégico)
+    - acumulados y porcentaje_acumulado con sumas acumuladas
+    Retorna {'periodos': [...], 'totales': {...}}
+    """
+    freq = FRECUENCIAS[frecuencia]
+    inicio, fin = pd.Timestamp(inicio), pd.Timestamp(fin)
+    periodos = pd.period_range(inicio, fin - pd.Timedelta(days=1), freq=freq)
+
+    def en_rango(columna):
+        return df[columna].ge(inicio) & df[columna].lt(fin)
+
+    # Completados por periodo de cierre (la oportunidad se compara por día)
+    cerrados = df[df['estado'].eq(3) & en_rango('fecha_cierre')]
+    dia_cierre = cerrados['fecha_cierre'].dt.normalize()
+    con_vencimiento = cerrados['fecha_vencimiento'].notna()
+    series_cierre = pd.DataFrame({
+        'periodo': cerrados['fecha_cierre'].dt.to_period(freq),
+        'origen': cerrados['origen_estrategico'],
+        'completados': 1,
+        'oportunos': (con_vencimiento & dia_cierre.le(cerrados['fecha_vencimiento'])).astype(int),
+        'no_oportunos': (con_vencimiento & dia_cierre.gt(cerrados['fecha_vencimiento'])).astype(int),
+    })
+
+    # Pendientes por periodo de vencimiento
+    abiertos = df[df['estado'].isin([1, 2]) & en_rango('fecha_vencimiento')]
+    series_pendientes = pd.DataFrame({
+        'periodo': abiertos['fecha_vencimiento'].dt.to_period(freq),
+        'origen': abiertos['origen_estrategico'],
+        'pendientes': 1,
+    })
+
+    # Ingresados por periodo de recepción
+    ingresados = df[en_rango('received_date')]
+    series_ingresados = pd.DataFrame({
+        'periodo': ingresados['received_date'].dt.to_period(freq),
+        'ingresados': 1,
+    })
+
+    # Desglose por origen: cerrados + pendientes
+    origenes = pd.concat([series_cierre[['periodo', 'origen']], series_pendientes[['periodo', 'origen']]])
+    origenes = origenes[origenes['origen'].isin(list(ORIGENES))]
+    por_origen = pd.get_dummies(origenes['origen'].map(ORIGENES), dtype=int).groupby(origenes['periodo']).sum()
+
+    tabla = pd.concat([
+        series_cierre.drop(columns='origen').groupby('periodo').sum(),
+        series_pendientes.drop(columns='origen').groupby('periodo').sum(),
+        series_ingresados.groupby('periodo').sum(),
+        por_origen,
+    ], axis=1)
+    tabla = tabla.reindex(index=periodos, columns=CONTADORES).fillna(0).astype(int)
+
+    tabla['total_a_vencer'] = tabla['completados'] + tabla['pendientes']
+    tabla['sin_respuesta'] = tabla['total_a_vencer'] - tabla['oportunos'] - tabla['no_oportunos']
+    tabla['porcentaje'] = _porcentaje(tabla['oportunos'], tabla[porcentaje_sobre])
+
+    acumulado = tabla[['oportunos', 'total_a_vencer']].cumsum()
+    tabla['porcentaje_acumulado'] = _porcentaje(acumulado['oportunos'], acumulado['total_a_vencer'])
+
+    resultado = [{
+        'periodo': str(periodo),
+        'inicio': periodo.start_time.date().isoformat(),
+        'fin': periodo.end_time.date().isoformat(),
+        'total_completados': int(fila.total_a_vencer),
+        'oportunos': int(fila.oportunos),
+        'no_oportunos': int(fila.no_oportunos),
+        'sin_respuesta': int(fila.sin_respuesta),
+        'total_ingresados': int(fila.ingresados),
+        'tickets_abiertos': int(fila.pendientes),
+        'porcentaje': float(fila.porcentaje),
+        'porcentaje_acumulado': float(fila.porcentaje_acumulado),
+        **{nombre: int(getattr(fila, nombre)) for nombre in ORIGENES.values()}
+    } for periodo, fila in zip(tabla.index, tabla.itertuples(index=False))]
+
+    totales = tabla[CONTADORES + ['total_a_vencer', 'sin_respuesta']].sum()
+    return {
+        'periodos': resultado,
+        'totales': {
+            'total_completados': int(totales['total_a_vencer']),
+            'oportunos': int(totales['oportunos']),
+            'no_oportunos': int(totales['no_oportunos']),
+            'sin_respuesta': int(totales['sin_respuesta']),
+            'total_ingresados': int(totales['ingresados']),
+            'porcentaje_global': round(float(totales['oportunos'] / totales['total_a_vencer'] * 100), 2) if totales['total_a_vencer'] > 0 else 0,
+            **{nombre: int(totales[nombre]) for nombre in ORIGENES.values()}
+        }
+    }
+
+
+def _porcentaje(numerador, denominador):
+    """Porcentaje redondeado a 2 decimales; 0 cuando el denominador es 0"""
+    numerador_arr = np.asarray(numerador, dtype=float)
+    denominador_arr = np.asarray(denominador, dtype=float)
+    valores = np.divide(numerador_arr, denominador_arr, out=np.zeros_like(numerador_arr), where=denominador_arr > 0)
+    return pd.Series(np.round(valores * 100, 2), index=numerador.index)
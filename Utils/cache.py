@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por entrada, segura para hilos.
+    - Cada valor vive `ttl` segundos desde que se guarda
+    - `max_entradas` acota la memoria: al superarse se descartan primero las entradas vencidas
+      y luego las más antiguas
+    """
+
+    def __init__(self, ttl=60, max_entradas=1024):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    # Función para obtener un valor vigente (None si no existe o expiró)
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            vence, valor = entrada
+            if vence <= time.monotonic():
+                del self._datos[clave]
+                return None
+            return valor
+
+    # Función para guardar un valor con el TTL de la caché (o uno propio)
+    def guardar(self, clave, valor, ttl=None):
+        with self._lock:
+            if clave not in self._datos and len(self._datos) >= self.max_entradas:
+                self._liberar_espacio()
+            self._datos[clave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+
+    # Función para eliminar una clave
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    # Función para vaciar la caché
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def _liberar_espacio(self):
+        ahora = time.monotonic()
+        for clave in [clave for clave, (vence, _) in self._datos.items() if vence <= ahora]:
+            del self._datos[clave]
+        # Los dict conservan el orden de inserción: la primera clave es la más antigua
+        while len(self._datos) >= self.max_entradas:
+            del self._datos[next(iter(self._datos))]
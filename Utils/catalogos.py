@@ -0,0 +1,100 @@
+import hashlib
+import json
+import threading
+from Utils.cache import TTLCache
+from Utils.constants import CATALOGOS_CACHE_TTL
+from Models.IntranetEstadosTickets import IntranetEstadosTickets
+from Models.IntranetUsuariosGestionTicModel import IntranetUsuariosGestionTicModel
+from Models.IntranetTipoPrioridadModel import IntranetTipoPrioridadModel
+from Models.IntranetTipoSoporteModel import IntranetTipoSoporteModel
+from Models.IntranetTipoTicketModel import IntranetTipoTicketModel
+from Models.IntranetPerfilesMacroprocesoModel import IntranetPerfilesMacroprocesoModel
+from Models.IntranetTipoNivelModel import IntranetTipoNivelModel
+from Models.IntranetOrigenEstrategicoModel import IntranetOrigenEstrategicoModel
+
+# Tablas de catálogo de tickets (todas tienen id, nombre y estado)
+CATALOGOS = {
+    'estados': IntranetEstadosTickets,
+    'tecnicos': IntranetUsuariosGestionTicModel,
+    'prioridades': IntranetTipoPrioridadModel,
+    'tipos_soporte': IntranetTipoSoporteModel,
+    'tipos_ticket': IntranetTipoTicketModel,
+    'macroprocesos': IntranetPerfilesMacroprocesoModel,
+    'tipos_nivel': IntranetTipoNivelModel,
+    'origenes_estrategicos': IntranetOrigenEstrategicoModel,
+}
+
+
+class CatalogoCache:
+    """
+    Caché en memoria del proceso para las tablas de catálogo.
+    - Cada catálogo se carga completo (activos e inactivos) con una sola consulta
+    - Expira a los `ttl` segundos o al invalidarlo explícitamente
+    - Cada carga lleva un hash de versión para ETag y para detectar cambios en el cliente
+    """
+
+    def __init__(self, ttl=300):
+        self._cache = TTLCache(ttl=ttl, max_entradas=len(CATALOGOS))
+        self._lock = threading.Lock()
+
+    # Función para obtener la lista de registros activos (id, nombre) de un catálogo
+    def activos(self, db, catalogo):
+        # Copias: quien reciba la lista puede modificarla sin alterar la caché
+        return [dict(registro) for registro in self._obtener(db, catalogo)['activos']]
+
+    # Función para obtener el mapa id -> nombre de un catálogo (incluye inactivos)
+    def nombres(self, db, catalogo):
+        return self._obtener(db, catalogo)['nombres']
+
+    # Función para obtener la versión (hash) de un catálogo
+    def version(self, db, catalogo):
+        return self._obtener(db, catalogo)['version']
+
+    # Función para obtener todos los catálogos activos con una versión combinada
+    def todos(self, db):
+        """Retorna ({catalogo: activos}, version_combinada)"""
+        catalogos = {catalogo: self.activos(db, catalogo) for catalogo in CATALOGOS}
+        versiones = '|'.join(self.version(db, catalogo) for catalogo in CATALOGOS)
+        return catalogos, hashlib.sha1(versiones.encode('utf-8')).hexdigest()[:16]
+
+    # Función para invalidar un catálogo o todos
+    def invalidar(self, catalogo=None):
+        """Descarta el catálogo indicado (o todos) para que la próxima lectura vaya a BD"""
+        if catalogo:
+            self._cache.invalidar(catalogo)
+        else:
+            self._cache.limpiar()
+
+    def _obtener(self, db, catalogo):
+        if catalogo not in CATALOGOS:
+            raise KeyError(catalogo)
+
+        datos = self._cache.obtener(catalogo)
+        if datos is not None:
+            return datos
+
+        with self._lock:
+            # Otra petición pudo haberlo cargado mientras se esperaba el lock
+            datos = self._cache.obtener(catalogo)
+            if datos is None:
+                datos = self._cargar(db, catalogo)
+                self._cache.guardar(catalogo, datos)
+            return datos
+
+    def _cargar(self, db, catalogo):
+        modelo = CATALOGOS[catalogo]
+        filas = db.query(modelo.id, modelo.nombre, modelo.estado).order_by(modelo.id).all()
+
+        activos = [{'id': fila.id, 'nombre': fila.nombre} for fila in filas if fila.estado == 1]
+        version = hashlib.sha1(
+            json.dumps([[fila.id, fila.nombre, fila.estado] for fila in filas], default=str).encode('utf-8')
+        ).hexdigest()[:16]
+
+        return {
+            'activos': activos,
+            'nombres': {fila.id: fila.nombre for fila in filas},
+            'version': version
+        }
+
+
+catalogo_cache = CatalogoCache(CATALOGOS_CACHE_TTL)
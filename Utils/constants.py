@@ -9,6 +9,48 @@ MICROSOFT_CLIENT_ID = os.getenv("MICROSOFT_CLIENT_ID")
 MICROSOFT_CLIENT_SECRET = os.getenv("MICROSOFT_CLIENT_SECRET")
 MICROSOFT_TENANT_ID = os.getenv("MICROSOFT_TENANT_ID")
 MICROSOFT_API_SCOPE = ['https://graph.microsoft.com/.default']
+# Segundos antes del vencimiento en que se renueva el token de Graph
+GRAPH_TOKEN_MARGEN_REFRESCO = int(os.getenv("GRAPH_TOKEN_MARGEN_REFRESCO", 300))
+
+# Cliente HTTP de Graph (timeouts en segundos)
+GRAPH_TIMEOUT_CONNECT = float(os.getenv("GRAPH_TIMEOUT_CONNECT", 10))
+GRAPH_TIMEOUT_READ = float(os.getenv("GRAPH_TIMEOUT_READ", 60))
+GRAPH_POOL_SIZE = int(os.getenv("GRAPH_POOL_SIZE", 10))
+GRAPH_MAX_REINTENTOS = int(os.getenv("GRAPH_MAX_REINTENTOS", 3))
+# Peticiones simultáneas a Graph ($batch de attachments) y páginas del delta descargadas por adelantado
+GRAPH_CONCURRENCIA = int(os.getenv("GRAPH_CONCURRENCIA", 4))
+GRAPH_PAGINAS_EN_COLA = int(os.getenv("GRAPH_PAGINAS_EN_COLA", 2))
+# Máximo de messageIds por consulta de attachments en lote (20 por llamada $batch)
+GRAPH_MAX_ATTACHMENTS_LOTE = int(os.getenv("GRAPH_MAX_ATTACHMENTS_LOTE", 200))
+# Segundos que se reutiliza un hilo de conversación ya consultado a Graph
+HILOS_CACHE_TTL = int(os.getenv("HILOS_CACHE_TTL", 300))
+# Mapa conversation_id -> ticket de la sincronización: vigencia (segundos), tamaño máximo
+# y antigüedad (días) de las conversaciones que se precargan
+MAPA_CONVERSACIONES_TTL = int(os.getenv("MAPA_CONVERSACIONES_TTL", 600))
+MAPA_CONVERSACIONES_MAX = int(os.getenv("MAPA_CONVERSACIONES_MAX", 20000))
+MAPA_CONVERSACIONES_DIAS = int(os.getenv("MAPA_CONVERSACIONES_DIAS", 30))
+
+# Consultas de las rutas async (lectura intensiva) que corren a la vez en el pool de BD
+DB_ASYNC_MAX_CONCURRENCIA = int(os.getenv("DB_ASYNC_MAX_CONCURRENCIA", 20))
+
+# Sincronización de correos en segundo plano
+SYNC_ENABLED = os.getenv("SYNC_ENABLED", "true").lower() in ("1", "true", "si")
+SYNC_INTERVAL_SECONDS = int(os.getenv("SYNC_INTERVAL_SECONDS", 120))
+
+# Segundos que se reutiliza el total de /filtrar_tickets en las páginas siguientes
+TICKETS_TOTAL_CACHE_TTL = int(os.getenv("TICKETS_TOTAL_CACHE_TTL", 30))
+# Búsqueda q con índice full-text de SQL Server (ver Config/migraciones.sql)
+TICKETS_FULLTEXT_ENABLED = os.getenv("TICKETS_FULLTEXT_ENABLED", "false").lower() in ("1", "true", "si")
+# Segundos que los catálogos (estados, prioridades, técnicos...) viven en memoria
+CATALOGOS_CACHE_TTL = int(os.getenv("CATALOGOS_CACHE_TTL", 300))
+
+# Dashboard e indicadores
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 60))
+# Máximo de años por consulta en el comparativo de indicadores
+INDICADORES_MAX_ANIOS = int(os.getenv("INDICADORES_MAX_ANIOS", 10))
+# Rango de años válidos en las consultas de indicadores
+INDICADORES_ANIO_MIN = 1900
+INDICADORES_ANIO_MAX = 2100
 
 # URLs
 MICROSOFT_URL = os.getenv("MICROSOFT_URL")
@@ -0,0 +1,39 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from Config.db import session_maker
+from Utils.constants import DB_ASYNC_MAX_CONCURRENCIA
+
+
+class EjecutorBD:
+    """
+    Ejecuta consultas bloqueantes (pyodbc) desde rutas async def sin ocupar el event loop
+    ni el threadpool de Starlette.
+    - Un pool de hilos propio acota cuántas consultas corren a la vez (`max_concurrencia`),
+      por debajo de pool_size + max_overflow del engine para no agotar las conexiones
+    - Las peticiones que exceden el límite esperan en cola sin bloquear el servidor
+    - Cada tarea abre y cierra su propia sesión
+    """
+
+    def __init__(self, max_concurrencia=20):
+        self.max_concurrencia = max_concurrencia
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrencia, thread_name_prefix='bd')
+
+    # Función para ejecutar funcion(db, *args, **kwargs) en el pool y esperar su resultado
+    async def ejecutar(self, funcion, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self._con_sesion, funcion, *args, **kwargs))
+
+    # Función para liberar los hilos al apagar la aplicación
+    def detener(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _con_sesion(self, funcion, *args, **kwargs):
+        db = session_maker()
+        try:
+            return funcion(db, *args, **kwargs)
+        finally:
+            db.close()
+
+
+ejecutor_bd = EjecutorBD(DB_ASYNC_MAX_CONCURRENCIA)
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.exceptions import RequestException
+from Utils.graph_client import graph_session
+from Utils.constants import MICROSOFT_URL_GRAPH, EMAIL_USER, GRAPH_CONCURRENCIA, GRAPH_PAGINAS_EN_COLA, GRAPH_MAX_REINTENTOS
+
+# Máximo de peticiones por llamada a $batch (límite de Microsoft Graph)
+TAMANO_BATCH = 20
+
+# Campos de attachment que se piden en lote (sin contentBytes)
+CAMPOS_ATTACHMENT = 'id,name,contentType,size,isInline,lastModifiedDateTime'
+
+# Espera (segundos) ante 429/503 cuando Retry-After falta o no se puede interpretar
+ESPERA_REINTENTO_DEFECTO = 1
+
+_FIN = object()
+
+
+# Función para procesar páginas mientras se descarga la siguiente (productor/consumidor)
+def canalizar_paginas(paginas, procesar_pagina, max_en_cola=GRAPH_PAGINAS_EN_COLA):
+    """
+    Recorre el iterador `paginas` (p. ej. extraer_correos_delta) en un hilo y entrega cada
+    página a `procesar_pagina` en otro, de modo que la descarga de la página N+1 desde Graph
+    se solapa con la ingesta en BD de la página N.
+    - La cola acota cuántas páginas se descargan por adelantado (memoria)
+    - El iterador se avanza siempre desde un solo productor y las páginas se procesan en orden
+    Debe llamarse desde un hilo sin event loop (worker de sincronización o ruta sync).
+    """
+    asyncio.run(_canalizar_paginas(paginas, procesar_pagina, max_en_cola))
+
+
+async def _canalizar_paginas(paginas, procesar_pagina, max_en_cola):
+    cola = asyncio.Queue(maxsize=max(1, max_en_cola))
+    errores = []
+
+    async def productor():
+        try:
+            while (pagina := await asyncio.to_thread(next, paginas, _FIN)) is not _FIN:
+                await cola.put(pagina)
+        except Exception as e:
+            errores.append(e)
+        # Marca de fin (también si la descarga falló, para no dejar esperando al consumidor)
+        await cola.put(_FIN)
+
+    async def consumidor():
+        while (pagina := await cola.get()) is not _FIN:
+            await asyncio.to_thread(procesar_pagina, pagina)
+
+    tarea_productor = asyncio.create_task(productor())
+    try:
+        await consumidor()
+    finally:
+        # Si el consumidor falla se deja de descargar (la página en curso termina en su hilo)
+        if not tarea_productor.done():
+            tarea_productor.cancel()
+        await asyncio.gather(tarea_productor, return_exceptions=True)
+
+    if errores:
+        raise errores[0]
+
+
+# Función para obtener la metadata de los attachments de varios mensajes con $batch
+def obtener_attachments_lote(message_ids, token, concurrencia=GRAPH_CONCURRENCIA):
+    """
+    Agrupa los mensajes de a 20 por llamada a $batch y ejecuta los lotes en paralelo
+    (máximo `concurrencia` a la vez). Retorna {message_id: [attachments]}; los mensajes
+    que Graph no pudo resolver quedan con lista vacía.
+    """
+    message_ids = list(dict.fromkeys(message_id for message_id in message_ids if message_id))
+    if not message_ids or not token:
+        return {}
+    return asyncio.run(_obtener_attachments_lote(message_ids, token, concurrencia))
+
+
+async def _obtener_attachments_lote(message_ids, token, concurrencia):
+    semaforo = asyncio.Semaphore(max(1, concurrencia))
+    lotes = [message_ids[i:i + TAMANO_BATCH] for i in range(0, len(message_ids), TAMANO_BATCH)]
+
+    async def ejecutar(lote):
+        async with semaforo:
+            return await asyncio.to_thread(_batch_attachments, lote, token)
+
+    resultado = {message_id: [] for message_id in message_ids}
+    for parcial in await asyncio.gather(*(ejecutar(lote) for lote in lotes)):
+        resultado.update(parcial)
+    return resultado
+
+
+def _batch_attachments(lote, token):
+    """Ejecuta un $batch de hasta 20 GET de attachments; reintenta las respuestas 429/503 individuales"""
+    resultado = {}
+    pendientes = list(lote)
+
+    for _ in range(GRAPH_MAX_REINTENTOS + 1):
+        cuerpo = {'requests': [{
+            'id': str(indice),
+            'method': 'GET',
+            'url': f"/users/{EMAIL_USER}/messages/{message_id}/attachments?$select={CAMPOS_ATTACHMENT}"
+        } for indice, message_id in enumerate(pendientes)]}
+
+        try:
+            response = graph_session.post(
+                _url_batch(), json=cuerpo,
+                headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+            )
+        except RequestException as e:
+            print(f"Error de conexión con Microsoft Graph ($batch): {e}")
+            break
+
+        if response.status_code != 200:
+            print(f"Error en $batch de attachments: {response.status_code} - {response.text}")
+            break
+
+        reintentar = []
+        espera = 0
+        for respuesta in response.json().get('responses', []):
+            message_id = pendientes[int(respuesta.get('id'))]
+            estado = respuesta.get('status')
+            if estado == 200:
+                resultado[message_id] = respuesta.get('body', {}).get('value', [])
+            elif estado in (429, 503):
+                reintentar.append(message_id)
+                espera = max(espera, _segundos_retry_after(respuesta.get('headers', {}).get('Retry-After')))
+            else:
+                print(f"Error obteniendo attachments de {message_id}: {estado}")
+
+        if not reintentar:
+            break
+        pendientes = reintentar
+        # Corre en un hilo del pool: la espera no bloquea el event loop
+        time.sleep(min(espera, 30))
+
+    return resultado
+
+
+def _segundos_retry_after(valor):
+    # Retry-After llega en segundos ("5") o como fecha HTTP ("Wed, 21 Oct 2015 07:28:00 GMT")
+    if valor is None:
+        return ESPERA_REINTENTO_DEFECTO
+    try:
+        return max(int(valor), 0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        fecha = parsedate_to_datetime(str(valor))
+        if fecha.tzinfo is None:
+            fecha = fecha.replace(tzinfo=timezone.utc)
+        return max(int((fecha - datetime.now(timezone.utc)).total_seconds()), 0)
+    except (TypeError, ValueError, IndexError):
+        return ESPERA_REINTENTO_DEFECTO
+
+
+def _url_batch():
+    # MICROSOFT_URL_GRAPH apunta a .../v1.0/users/; $batch vive en la raíz de la versión
+    base_url = MICROSOFT_URL_GRAPH.rstrip('/')
+    if base_url.endswith('/users'):
+        base_url = base_url[:-len('/users')]
+    return f"{base_url}/$batch"
@@ -0,0 +1,50 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from Utils.constants import (
+    GRAPH_TIMEOUT_CONNECT, GRAPH_TIMEOUT_READ, GRAPH_POOL_SIZE, GRAPH_MAX_REINTENTOS
+)
+
+
+class GraphSession(requests.Session):
+    """
+    Sesión HTTP compartida para todas las llamadas a Microsoft Graph y al endpoint de token.
+    - Pool de conexiones keep-alive: se reutiliza la conexión TLS entre llamadas
+    - Timeout por defecto (conexión, lectura) para que una llamada colgada no bloquee el worker
+    - Respuestas comprimidas con gzip
+    - Reintentos automáticos ante 429/503 respetando la cabecera Retry-After
+    """
+
+    def __init__(self, timeout=(10, 60), pool_size=10, max_reintentos=3):
+        super().__init__()
+        self.timeout = timeout
+
+        reintentos = Retry(
+            total=max_reintentos,
+            connect=max_reintentos,
+            read=0,
+            status=max_reintentos,
+            status_forcelist=(429, 503),
+            allowed_methods=frozenset(['GET', 'POST', 'PATCH', 'DELETE']),
+            backoff_factor=1,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=reintentos)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+        self.headers.update({'Accept-Encoding': 'gzip, deflate'})
+
+    def request(self, method, url, **kwargs):
+        # Timeout por defecto salvo que la llamada indique uno propio
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+graph_session = GraphSession(
+    timeout=(GRAPH_TIMEOUT_CONNECT, GRAPH_TIMEOUT_READ),
+    pool_size=GRAPH_POOL_SIZE,
+    max_reintentos=GRAPH_MAX_REINTENTOS
+)
@@ -0,0 +1,98 @@
+from requests.exceptions import RequestException
+from Utils.cache import TTLCache
+from Utils.graph_client import graph_session
+from Utils.constants import MICROSOFT_URL_GRAPH, EMAIL_USER, HILOS_CACHE_TTL
+
+# Campos de cada mensaje del hilo
+CAMPOS_MENSAJE_HILO = 'id,conversationId,subject,from,receivedDateTime,body,isRead'
+
+# Mensajes por página al consultar un hilo
+TAMANO_PAGINA_HILO = 50
+
+# Hilos ya consultados por conversation_id; la sincronización invalida los que reciben mensajes
+_cache_hilos = TTLCache(ttl=HILOS_CACHE_TTL, max_entradas=256)
+
+
+# Función para obtener los mensajes de una conversación (con caché por conversation_id)
+def obtener_hilo(conversation_id, token):
+    """
+    Retorna la lista de mensajes del hilo (más reciente primero) o None si Graph falla.
+    Usa $filter=conversationId en el servidor, paginado y proyectado a los campos del hilo.
+    """
+    hilo = _cache_hilos.obtener(conversation_id)
+    if hilo is not None:
+        return hilo
+
+    hilo = _consultar_hilo(conversation_id, token)
+    if hilo is not None:
+        _cache_hilos.guardar(conversation_id, hilo)
+    return hilo
+
+
+# Función para descartar el hilo en caché de una o varias conversaciones
+def invalidar_hilos(conversation_ids):
+    for conversation_id in set(conversation_ids):
+        if conversation_id:
+            _cache_hilos.invalidar(conversation_id)
+
+
+# Función para obtener el conversationId de un mensaje directamente desde Graph
+def obtener_conversation_id_graph(message_id, token):
+    try:
+        response = graph_session.get(
+            f"{MICROSOFT_URL_GRAPH}{EMAIL_USER}/messages/{message_id}",
+            headers={'Authorization': f'Bearer {token}'},
+            params={'$select': 'conversationId'}
+        )
+    except RequestException as e:
+        print(f"Error de conexión con Microsoft Graph: {e}")
+        return None
+
+    if response.status_code != 200:
+        print(f"Error obteniendo mensaje original: {response.text}")
+        return None
+    return response.json().get('conversationId')
+
+
+def _consultar_hilo(conversation_id, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    # Graph no admite $orderby junto a este $filter: se ordena al final
+    params = {
+        '$filter': f"conversationId eq '{conversation_id.replace(chr(39), chr(39) * 2)}'",
+        '$select': CAMPOS_MENSAJE_HILO,
+        '$top': str(TAMANO_PAGINA_HILO)
+    }
+    url = f"{MICROSOFT_URL_GRAPH}{EMAIL_USER}/messages"
+    mensajes = []
+
+    while url:
+        try:
+            response = graph_session.get(url, headers=headers, params=params)
+        except RequestException as e:
+            print(f"Error de conexión con Microsoft Graph: {e}")
+            return None
+
+        if response.status_code != 200:
+            print(f"Error obteniendo hilo - Status: {response.status_code}, Texto: {response.text}")
+            return None
+
+        data = response.json()
+        mensajes.extend(_formatear_mensaje(mensaje) for mensaje in data.get('value', []))
+        # El nextLink ya incluye los parámetros de la consulta
+        url = data.get('@odata.nextLink')
+        params = None
+
+    mensajes.sort(key=lambda mensaje: mensaje.get('receivedDateTime') or '', reverse=True)
+    return mensajes
+
+
+def _formatear_mensaje(mensaje):
+    return {
+        'id': mensaje.get('id'),
+        'subject': mensaje.get('subject'),
+        'from_name': mensaje.get('from', {}).get('emailAddress', {}).get('name', ''),
+        'from_email': mensaje.get('from', {}).get('emailAddress', {}).get('address', ''),
+        'receivedDateTime': mensaje.get('receivedDateTime'),
+        'body': mensaje.get('body', {}).get('content', ''),
+        'isRead': mensaje.get('isRead', False)
+    }
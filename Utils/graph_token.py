@@ -0,0 +1,154 @@
+import threading
+from datetime import datetime, timedelta
+from Config.db import session_maker
+from Utils.graph_client import graph_session
+from Utils.querys import Querys
+from Models.IntranetGraphTokenModel import IntranetGraphTokenModel as TokenModel
+
+from Utils.constants import (
+    MICROSOFT_CLIENT_ID, MICROSOFT_CLIENT_SECRET, MICROSOFT_TENANT_ID,
+    MICROSOFT_API_SCOPE, MICROSOFT_URL, GRAPH_TOKEN_MARGEN_REFRESCO
+)
+
+# Margen mínimo de vigencia para entregar un token a una petición
+MARGEN_USO = timedelta(seconds=60)
+# Espera entre reintentos del hilo de refresco cuando Microsoft no entrega token
+ESPERA_REINTENTO = 30
+# Vigencia (segundos) que se asume si la respuesta del token no trae expires_in
+VIGENCIA_TOKEN_DEFECTO = 3599
+
+
+class GraphTokenProvider:
+    """
+    Proveedor del token de acceso de Microsoft Graph compartido por todo el proceso.
+    - El token vive en memoria: las peticiones no consultan intranet_graph_token
+    - La tabla solo se lee en el arranque en frío, para reutilizar un token vigente
+    - Un hilo en segundo plano lo renueva antes de que expire
+    - La renovación es single-flight: un lock garantiza que peticiones concurrentes
+      no generen tokens duplicados
+    """
+
+    def __init__(self, margen_refresco=300):
+        self.margen_refresco = timedelta(seconds=margen_refresco)
+        self._token = None
+        self._token_id = None
+        self._vencimiento = None
+        self._arranque_frio = True
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # Función para obtener el token vigente
+    def obtener_token(self):
+        """Retorna el token en memoria; solo lo carga o renueva si no es utilizable"""
+        if self._utilizable():
+            return self._token
+
+        with self._lock:
+            # Otra petición pudo haberlo renovado mientras se esperaba el lock
+            if not self._utilizable():
+                self._cargar_o_renovar()
+            return self._token
+
+    # Función para iniciar el hilo de refresco proactivo
+    def iniciar(self):
+        """Inicia el hilo que renueva el token antes de su vencimiento"""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo_refresco, name="graph-token-refresh", daemon=True)
+        self._hilo.start()
+
+    # Función para detener el hilo de refresco
+    def detener(self):
+        """Detiene el hilo de refresco (al apagar la aplicación)"""
+        self._detener.set()
+
+    def _ciclo_refresco(self):
+        while True:
+            try:
+                with self._lock:
+                    if self._requiere_refresco():
+                        self._cargar_o_renovar()
+            except Exception as e:
+                print(f"Error refrescando token de Graph: {e}")
+
+            if self._detener.wait(self._segundos_hasta_refresco()):
+                break
+
+    def _utilizable(self):
+        return bool(self._token) and datetime.now() < self._vencimiento - MARGEN_USO
+
+    def _requiere_refresco(self):
+        return not self._token or datetime.now() >= self._vencimiento - self.margen_refresco
+
+    def _segundos_hasta_refresco(self):
+        if not self._token:
+            return ESPERA_REINTENTO
+        restante = (self._vencimiento - self.margen_refresco - datetime.now()).total_seconds()
+        return max(restante, ESPERA_REINTENTO)
+
+    # Se llama siempre con el lock tomado
+    def _cargar_o_renovar(self):
+        db = session_maker()
+        try:
+            querys = Querys(db)
+
+            # Arranque en frío: reutilizar el último token vigente guardado en BD
+            if self._arranque_frio:
+                self._arranque_frio = False
+                registro = querys.get_token()
+                if registro and registro.get('fecha_vencimiento'):
+                    vencimiento = datetime.fromisoformat(registro['fecha_vencimiento'])
+                    if datetime.now() < vencimiento - self.margen_refresco:
+                        self._token = registro['token']
+                        self._token_id = registro.get('id')
+                        self._vencimiento = vencimiento
+                        return
+                    if registro.get('id'):
+                        querys.desactivar_token(registro['id'])
+
+            self._crear_nuevo_token(querys)
+        finally:
+            db.close()
+
+    def _crear_nuevo_token(self, querys):
+        """Crea un nuevo token desde Microsoft Graph API y lo registra en BD"""
+        url = f"{MICROSOFT_URL}{MICROSOFT_TENANT_ID}/oauth2/v2.0/token"
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        data = {
+            'client_id': MICROSOFT_CLIENT_ID,
+            'scope': ' '.join(MICROSOFT_API_SCOPE),
+            'client_secret': MICROSOFT_CLIENT_SECRET,
+            'grant_type': 'client_credentials'
+        }
+        response = graph_session.post(url, headers=headers, data=data)
+        if response.status_code != 200:
+            print(f"Error obteniendo el token: {response.status_code} - {response.text}")
+            return
+
+        respuesta = response.json()
+        token = respuesta.get('access_token')
+        if not token:
+            print(f"Respuesta de token sin access_token: {response.text}")
+            return
+
+        try:
+            expires_in = int(respuesta.get('expires_in'))
+        except (TypeError, ValueError):
+            print(f"Respuesta de token sin expires_in válido, se asumen {VIGENCIA_TOKEN_DEFECTO} s")
+            expires_in = VIGENCIA_TOKEN_DEFECTO
+        vencimiento = datetime.now() + timedelta(seconds=expires_in)
+
+        nuevo = querys.insertar_datos(TokenModel, {"token": token, "fecha_vencimiento": vencimiento})
+
+        # El token anterior deja de estar activo para que la tabla conserve uno solo vigente
+        if self._token_id:
+            querys.desactivar_token(self._token_id)
+
+        self._token = token
+        self._token_id = nuevo.id if nuevo else None
+        self._vencimiento = vencimiento
+
+
+graph_token_provider = GraphTokenProvider(GRAPH_TOKEN_MARGEN_REFRESCO)
@@ -0,0 +1,78 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from Utils.cache import TTLCache
+from Utils.constants import MAPA_CONVERSACIONES_TTL, MAPA_CONVERSACIONES_MAX, MAPA_CONVERSACIONES_DIAS
+
+
+class MapaConversaciones:
+    """
+    Mapa en memoria conversation_id -> ticket_id para detectar respuestas a hilos existentes.
+    - Acotado con TTLCache: cada entrada vive MAPA_CONVERSACIONES_TTL segundos y el mapa guarda
+      como máximo MAPA_CONVERSACIONES_MAX conversaciones. El TTL también limita cuánto dura un
+      cambio de otro proceso (que solo invalida su propio mapa)
+    - Se calienta al iniciar la sincronización (una sola consulta) con las conversaciones de los
+      últimos MAPA_CONVERSACIONES_DIAS días, y se vuelve a calentar cuando vence
+    - Las conversaciones que no están en el mapa se resuelven por página con una consulta
+      sobre idx_conversation_id y se agregan al mapa
+    - Solo guarda aciertos: una conversación sin ticket puede tenerlo en la próxima página
+    - actualizar_correo olvida la conversación si cambia estado, ticket o activo de un correo
+    """
+
+    def __init__(self):
+        self._tickets = TTLCache(ttl=MAPA_CONVERSACIONES_TTL, max_entradas=MAPA_CONVERSACIONES_MAX)
+        self._calentado_en = None
+        self._lock = threading.Lock()
+
+    # Función para cargar el mapa desde BD si no se cargó o ya venció
+    def calentar(self, querys):
+        if not self._requiere_calentar():
+            return
+        with self._lock:
+            if not self._requiere_calentar():
+                return
+            tickets = querys.obtener_tickets_por_conversation_ids(
+                desde=datetime.now() - timedelta(days=MAPA_CONVERSACIONES_DIAS),
+                limite=MAPA_CONVERSACIONES_MAX
+            )
+            if tickets is None:
+                return
+            self._tickets.limpiar()
+            self.registrar(tickets)
+            self._calentado_en = time.monotonic()
+
+    def _requiere_calentar(self):
+        return self._calentado_en is None or time.monotonic() - self._calentado_en >= MAPA_CONVERSACIONES_TTL
+
+    # Función para resolver los tickets de varias conversaciones (cero o una consulta)
+    def resolver(self, querys, conversation_ids):
+        """Retorna {conversation_id: ticket_id} de las conversaciones que tienen ticket"""
+        encontrados = {}
+        faltantes = set()
+        for conversation_id in {conversation_id for conversation_id in conversation_ids if conversation_id}:
+            ticket_id = self._tickets.obtener(conversation_id)
+            if ticket_id is None:
+                faltantes.add(conversation_id)
+            else:
+                encontrados[conversation_id] = ticket_id
+
+        if faltantes:
+            nuevos = querys.obtener_tickets_por_conversation_ids(faltantes) or {}
+            self.registrar(nuevos)
+            encontrados.update(nuevos)
+        return encontrados
+
+    # Función para agregar conversaciones al mapa
+    def registrar(self, tickets):
+        for conversation_id, ticket_id in tickets.items():
+            # Se conserva el ticket raíz (el primero de la conversación)
+            if self._tickets.obtener(conversation_id) is None:
+                self._tickets.guardar(conversation_id, ticket_id)
+
+    # Función para quitar una conversación (al cambiar estado, ticket o activo de un correo)
+    def olvidar(self, conversation_id):
+        if conversation_id:
+            self._tickets.invalidar(conversation_id)
+
+
+mapa_conversaciones = MapaConversaciones()
@@ -0,0 +1,25 @@
+"""
+Completa la columna subject_normalizado de intranet_correos_microsoft en los correos
+guardados antes de que existiera.
+
+Uso:
+    python -m Utils.normalizar_subjects
+
+Los correos nuevos la reciben al sincronizar; este comando es solo para la carga inicial.
+"""
+from Config.db import session_maker
+from Utils.querys import Querys
+
+
+def main():
+    db = session_maker()
+    try:
+        total = Querys(db).normalizar_subjects_pendientes()
+    finally:
+        db.close()
+
+    print(f"subject_normalizado completado en {total} correo(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from Utils.tools import Tools, CustomException
-from sqlalchemy import text, func, case, extract, and_, or_, Date, cast
-from datetime import datetime, date
+from sqlalchemy import text, func, extract, and_, or_, insert, bindparam
+from sqlalchemy.orm import defer
+from datetime import datetime, date, timedelta
 from Models.IntranetGraphTokenModel import IntranetGraphTokenModel as TokenModel
 from Models.IntranetCorreosMicrosoftModel import IntranetCorreosMicrosoftModel as CorreosMicrosoftModel
 from Models.IntranetSyncLogModel import IntranetSyncLogModel as SyncLogModel
@@ -15,8 +16,51 @@ from Models.IntranetObservacionesInformeGestionModel import IntranetObservacione
 from Models.IntranetCausasInformeGestionModel import IntranetCausasInformeGestion
 from Models.IntranetAniosInformeGestionModel import IntranetAniosInformeGestion
 from Models.IntranetOrigenEstrategicoModel import IntranetOrigenEstrategicoModel
-
+from Models.IntranetIndicadoresMensualesModel import IntranetIndicadoresMensualesModel
+from Models.IntranetHiloMensajesModel import IntranetHiloMensajesModel as HiloMensajesModel
+
+from Utils.cache import TTLCache
+from Utils.catalogos import catalogo_cache
+from Utils.mapa_conversaciones import mapa_conversaciones
+from Utils.subjects import normalizar_subject
+from Utils.constants import TICKETS_TOTAL_CACHE_TTL, TICKETS_FULLTEXT_ENABLED, DASHBOARD_CACHE_TTL, EMAIL_USER, HILOS_CACHE_TTL
 import hashlib
+import threading
+from contextlib import contextmanager
+
+# Máximo de valores por cláusula IN (SQL Server admite hasta 2100 parámetros por sentencia)
+TAMANO_BLOQUE_IN = 1000
+
+# Totales de /filtrar_tickets por conjunto de filtros, para las páginas siguientes (cursor)
+_cache_total_tickets = TTLCache(ttl=TICKETS_TOTAL_CACHE_TTL, max_entradas=512)
+
+# Métricas del dashboard por rango de fechas (el dashboard se consulta en polling)
+_cache_metricas_dashboard = TTLCache(ttl=DASHBOARD_CACHE_TTL, max_entradas=64)
+
+# Nombres de los meses para los indicadores
+MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+         'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+# Contadores de la tabla resumen de indicadores mensuales
+CAMPOS_INDICADORES = ('completados', 'oportunos', 'no_oportunos', 'sin_fecha_vencimiento', 'pendientes', 'ingresados')
+# Contadores que el reporte de gestión suma sobre todos los tipos de ticket (no solo tipo 1)
+CAMPOS_INDICADORES_TODOS_LOS_TIPOS = ('pendientes', 'ingresados')
+TIPO_TICKET_GESTION = 1
+# Campos de un ticket que cambian los indicadores mensuales al actualizarse
+CAMPOS_TICKET_INDICADORES = {
+    'ticket', 'activo', 'estado', 'tipo_ticket', 'origen_estrategico',
+    'fecha_cierre', 'fecha_vencimiento', 'received_date'
+}
+# Campos de un correo que deciden si es raíz de su conversación (_filtro_raiz_conversacion)
+CAMPOS_RAIZ_CONVERSACION = {'estado', 'ticket', 'activo'}
+# Fila (mes 0, sin contadores) que marca un año ya construido en la tabla resumen,
+# también cuando el año no tiene tickets
+MES_ANIO_CONSTRUIDO = 0
+# Serializa las reescrituras de la tabla resumen dentro del proceso
+_lock_indicadores = threading.Lock()
+
+# Existencia del índice full-text de tickets (se consulta una vez por proceso)
+_fulltext_tickets = None
 
 class Querys:
 
@@ -177,12 +221,35 @@ class Querys:
             print(f"Error obteniendo correo por message_id: {e}")
             return None
 
+    # Query para obtener solo el conversation_id guardado de un correo
+    def obtener_conversation_id_por_message_id(self, message_id):
+        """Retorna el conversation_id registrado en BD para el message_id (None si no existe)"""
+        try:
+            return self.db.query(CorreosMicrosoftModel.conversation_id).filter(
+                CorreosMicrosoftModel.message_id == message_id
+            ).scalar()
+
+        except Exception as e:
+            print(f"Error obteniendo conversation_id por message_id: {e}")
+            return None
+
     # Query para obtener correos desde la base de datos con filtros y paginación
     def obtener_correos_bd(self, limite=100, offset=0, estado=None):
         """Obtiene correos desde la base de datos con filtros y paginación"""
+        return self.obtener_pagina_correos_bd(limite, offset, estado)['emails']
+
+    # Query para obtener una página de correos con paginación keyset sobre (received_date, id)
+    def obtener_pagina_correos_bd(self, limite=100, offset=0, estado=None, cursor=None):
+        """
+        Obtiene una página de correos de la bandeja.
+        Con cursor la página se ubica por (received_date, id) y su costo no depende
+        de la profundidad; offset se mantiene solo por compatibilidad.
+        """
         try:
-            # Filtrar correos activos y no descartados (estado != 0)
-            query = self.db.query(CorreosMicrosoftModel).filter(
+            # Filtrar correos activos y no descartados (estado != 0); el body no se lee en listados
+            query = self.db.query(CorreosMicrosoftModel).options(
+                defer(CorreosMicrosoftModel.body_content)
+            ).filter(
                 CorreosMicrosoftModel.ticket == 0,
                 CorreosMicrosoftModel.activo == 1,
                 CorreosMicrosoftModel.estado != 0  # Excluir correos descartados
@@ -191,19 +258,59 @@ class Querys:
             # Filtro por estado específico si se especifica
             if estado:
                 query = query.filter(CorreosMicrosoftModel.estado == estado)
+
+            if cursor:
+                query = query.filter(self._filtro_cursor(
+                    CorreosMicrosoftModel.received_date, CorreosMicrosoftModel.id, cursor
+                ))
+            
+            # Ordenar por fecha recibida (más recientes primero); el id desempata
+            query = query.order_by(CorreosMicrosoftModel.received_date.desc(), CorreosMicrosoftModel.id.desc())
             
-            # Ordenar por fecha recibida (más recientes primero)
-            query = query.order_by(CorreosMicrosoftModel.received_date.desc())
+            # Paginación: se pide un registro extra para saber si hay página siguiente
+            if not cursor and offset:
+                query = query.offset(offset)
+            correos = query.limit(int(limite) + 1).all()
             
-            # Paginación
-            correos = query.offset(offset).limit(limite).all()
+            correos, next_cursor = self._cortar_pagina(correos, limite, 'received_date')
             
             # Convertir a formato frontend
-            return [correo.to_frontend_format() for correo in correos]
+            return {
+                'emails': [correo.to_frontend_format(incluir_body=False) for correo in correos],
+                'next_cursor': next_cursor
+            }
             
+        except CustomException:
+            raise
         except Exception as e:
             print(f"Error obteniendo correos de BD: {e}")
-            return []
+            return {'emails': [], 'next_cursor': None}
+
+    # Helper para construir la condición keyset (fecha, id) en orden descendente
+    def _filtro_cursor(self, columna_fecha, columna_id, cursor):
+        """
+        Condición para continuar después del último registro de la página anterior.
+        Los NULL de la fecha quedan al final del orden descendente en SQL Server.
+        """
+        fecha, id_registro = self.tools.decodificar_cursor(cursor)
+        if fecha is None:
+            return and_(columna_fecha.is_(None), columna_id < id_registro)
+        return or_(
+            columna_fecha < fecha,
+            and_(columna_fecha == fecha, columna_id < id_registro),
+            columna_fecha.is_(None)
+        )
+
+    # Helper para recortar el registro extra de la página y generar el siguiente cursor
+    def _cortar_pagina(self, registros, limite, campo_fecha, obtener_registro=None):
+        """Retorna (registros_pagina, next_cursor); next_cursor es None en la última página"""
+        limite = int(limite)
+        if len(registros) <= limite:
+            return registros, None
+
+        registros = registros[:limite]
+        ultimo = obtener_registro(registros[-1]) if obtener_registro else registros[-1]
+        return registros, self.tools.codificar_cursor(getattr(ultimo, campo_fecha), ultimo.id)
 
     # Query para insertar un nuevo correo
     def insertar_correo(self, correo_data):
@@ -238,14 +345,31 @@ class Querys:
             ).first()
             
             if correo:
+                # Meses de los indicadores donde contaba el ticket antes del cambio
+                afecta_indicadores = bool(CAMPOS_TICKET_INDICADORES & set(datos_actualizacion)) and (
+                    correo.ticket == 1 or datos_actualizacion.get('ticket') == 1
+                )
+                periodos = self._periodos_indicadores(correo) if afecta_indicadores else set()
+
                 # Actualizar campos
                 for campo, valor in datos_actualizacion.items():
                     if hasattr(correo, campo):
                         setattr(correo, campo, valor)
-                
+                if 'subject' in datos_actualizacion:
+                    correo.subject_normalizado = normalizar_subject(correo.subject)
+
                 correo.updated_at = datetime.now()
                 self.db.commit()
-                return correo.to_dict()
+                resultado = correo.to_dict()
+
+                # La raíz puede dejar de cumplir _filtro_raiz_conversacion: el mapa vuelve a resolverla
+                if CAMPOS_RAIZ_CONVERSACION & set(datos_actualizacion):
+                    mapa_conversaciones.olvidar(correo.conversation_id)
+
+                if afecta_indicadores:
+                    self.recalcular_indicadores_meses(periodos | self._periodos_indicadores(correo))
+
+                return resultado
             
             return None
             
@@ -254,16 +378,366 @@ class Querys:
             print(f"Error actualizando correo: {e}")
             return None
     
-    # Query para obtener todos los message_ids existentes en BD
-    def obtener_message_ids_existentes(self):
-        """Obtiene todos los message_ids existentes en BD"""
+    # Query para guardar en lote los correos de una página de sincronización
+    def guardar_correos_lote(self, nuevos, actualizados, respuestas=None):
+        """
+        Guarda en una sola transacción los correos de una página de Graph:
+        - nuevos: se insertan con un único INSERT ejecutado en lote (executemany)
+        - actualizados: un único UPDATE por message_id ejecutado en lote
+        - respuestas: respuestas entrantes a tickets existentes (filas [RESPUESTA])
+          más un UPDATE de la última actividad de los tickets afectados
+        - los mensajes nuevos y las respuestas se agregan también al hilo (intranet_hilo_mensajes)
+        Si el lote falla se reintenta correo por correo para no perder la página completa.
+        """
+        respuestas = respuestas or []
+        resultado = {'nuevos': 0, 'actualizados': 0, 'respuestas': 0}
+
+        if not (nuevos or actualizados or respuestas):
+            return resultado
+
+        try:
+            with self._transaccion_explicita():
+                self._escribir_lote_correos(nuevos, actualizados, respuestas)
+
+            resultado['nuevos'] = len(nuevos)
+            resultado['actualizados'] = len(actualizados)
+            resultado['respuestas'] = len(respuestas)
+            return resultado
+
+        except Exception as e:
+            print(f"Error guardando lote de correos, reintentando correo por correo: {e}")
+
+        # Fallback: procesar de a un correo para aislar el que falla. Se omiten los
+        # message_ids que ya existen por si parte del lote alcanzó a quedar guardado.
+        existentes = self.obtener_hashes_por_message_ids(
+            [correo.get('message_id') for correo in nuevos + respuestas]
+        )
+        for correo in nuevos:
+            if correo.get('message_id') in existentes:
+                continue
+            insertado = self.insertar_correo(correo)
+            if insertado:
+                self.registrar_mensajes_hilo([self._fila_mensaje_hilo(correo, insertado.get('id'))])
+                resultado['nuevos'] += 1
+        self._resolver_raices_pagina(respuestas)
+        for correo in actualizados:
+            # Mismas columnas que el UPDATE del lote: estado y demás campos del ticket no se tocan
+            if self.actualizar_correo(correo.get('message_id'), self._campos_contenido_correo(correo)):
+                resultado['actualizados'] += 1
+        for respuesta in respuestas:
+            if respuesta.get('message_id') in existentes:
+                continue
+            if self.registrar_respuesta_entrante_ticket(respuesta):
+                self.registrar_mensajes_hilo([self._fila_mensaje_hilo(respuesta, respuesta.get('ticket_id'))])
+                self.actualizar_ultima_actividad_ticket(respuesta.get('ticket_id'))
+                resultado['respuestas'] += 1
+
+        return resultado
+
+    # Helper para asignar el ticket de las respuestas cuya raíz llegó en la misma página
+    def _resolver_raices_pagina(self, respuestas):
+        """Busca el id de las raíces ya insertadas por su message_id (raiz_message_id)"""
+        pendientes = [respuesta for respuesta in respuestas if not respuesta.get('ticket_id') and respuesta.get('raiz_message_id')]
+        if not pendientes:
+            return
+        ids = dict(self.db.query(CorreosMicrosoftModel.message_id, CorreosMicrosoftModel.id).filter(
+            CorreosMicrosoftModel.message_id.in_({respuesta['raiz_message_id'] for respuesta in pendientes})
+        ).all())
+        for respuesta in pendientes:
+            respuesta['ticket_id'] = ids.get(respuesta['raiz_message_id'])
+
+    # Transacción real para escrituras de varias sentencias
+    @contextmanager
+    def _transaccion_explicita(self):
+        """
+        El engine abre las conexiones pyodbc con autocommit, por lo que commit/rollback
+        de la sesión no agrupan sentencias. Mientras dura el bloque se desactiva el
+        autocommit de la conexión de la sesión: todo se confirma o se deshace junto.
+        """
+        conexion = self.db.connection().connection.dbapi_connection
+        conexion.autocommit = False
         try:
-            result = self.db.query(CorreosMicrosoftModel.message_id).all()
-            return {row[0] for row in result}  # Set para búsqueda rápida
+            yield
+            conexion.commit()
+        except Exception:
+            conexion.rollback()
+            raise
+        finally:
+            conexion.autocommit = True
+            # Cierra la transacción de la sesión (ya sin efecto en la conexión)
+            self.db.rollback()
+
+    # Sentencias del lote de una página de sincronización (sin commit)
+    def _escribir_lote_correos(self, nuevos, actualizados, respuestas):
+        filas_insercion = [self._fila_insercion_correo(correo) for correo in nuevos]
+        filas_insercion += [
+            self._fila_insercion_correo(self._preparar_respuesta_entrante(respuesta))
+            for respuesta in respuestas
+        ]
+
+        if filas_insercion:
+            self.db.execute(insert(CorreosMicrosoftModel), filas_insercion)
+        self._resolver_raices_pagina(respuestas)
+
+        # Cada correo nuevo abre su hilo; las respuestas se enlazan al ticket existente
+        self._insertar_hilo_desde_correos([correo.get('message_id') for correo in nuevos])
+        if respuestas:
+            self.db.execute(insert(HiloMensajesModel), [
+                self._fila_mensaje_hilo(respuesta, respuesta.get('ticket_id')) for respuesta in respuestas
+            ])
+
+        if actualizados:
+            ahora = datetime.now()
+            filas_actualizacion = [{
+                'b_message_id': correo.get('message_id'),
+                **self._campos_contenido_correo(correo),
+                'subject_normalizado': normalizar_subject(correo.get('subject', '')),
+                'updated_at': ahora
+            } for correo in actualizados]
+
+            # Sin .values(): el SET se arma con las columnas presentes en cada fila
+            sql_update = CorreosMicrosoftModel.__table__.update().where(
+                CorreosMicrosoftModel.__table__.c.message_id == bindparam('b_message_id')
+            )
+            self.db.execute(sql_update, filas_actualizacion)
+
+            # Mismo subject en el hilo (el body se lee del correo por message_id)
+            sql_update_hilo = HiloMensajesModel.__table__.update().where(
+                HiloMensajesModel.__table__.c.message_id == bindparam('b_message_id')
+            )
+            self.db.execute(sql_update_hilo, [{
+                'b_message_id': fila['b_message_id'],
+                'subject': fila['subject']
+            } for fila in filas_actualizacion])
+
+        tickets_ids = {respuesta.get('ticket_id') for respuesta in respuestas if respuesta.get('ticket_id')}
+        if tickets_ids:
+            self.db.query(CorreosMicrosoftModel).filter(
+                CorreosMicrosoftModel.id.in_(tickets_ids)
+            ).update({CorreosMicrosoftModel.updated_at: datetime.now()}, synchronize_session=False)
+
+    # Helper con las columnas de contenido que la sincronización actualiza en un correo existente
+    def _campos_contenido_correo(self, correo_data):
+        return {
+            'conversation_id': correo_data.get('conversation_id'),
+            'subject': correo_data.get('subject', ''),
+            'from_email': correo_data.get('from_email', ''),
+            'from_name': correo_data.get('from_name', ''),
+            'received_date': correo_data.get('received_date'),
+            'body_preview': correo_data.get('body_preview', ''),
+            'body_content': correo_data.get('body_content', ''),
+            'hash_contenido': correo_data.get('hash_contenido', ''),
+            'attachments_count': correo_data.get('attachments_count', 0),
+            'has_attachments': correo_data.get('has_attachments', 0)
+        }
+
+    # Helper para construir la fila de inserción en lote de un correo
+    def _fila_insercion_correo(self, correo_data):
+        """
+        Construye la fila para el INSERT en lote con los mismos valores por defecto
+        que aplica el constructor de CorreosMicrosoftModel
+        """
+        ahora = datetime.now()
+        hash_contenido = correo_data.get('hash_contenido') or self.generar_hash_contenido(
+            correo_data.get('subject', ''),
+            correo_data.get('body_preview', ''),
+            correo_data.get('from_email', '')
+        )
+        return {
+            'message_id': correo_data.get('message_id'),
+            'conversation_id': correo_data.get('conversation_id'),
+            'subject': correo_data.get('subject', ''),
+            'subject_normalizado': normalizar_subject(correo_data.get('subject', '')),
+            'from_email': correo_data.get('from_email', ''),
+            'from_name': correo_data.get('from_name', ''),
+            'received_date': correo_data.get('received_date'),
+            'body_preview': correo_data.get('body_preview', ''),
+            'body_content': correo_data.get('body_content', ''),
+            'estado': correo_data.get('estado', 1),
+            'ticket': correo_data.get('ticket', 0),
+            'asignado': correo_data.get('asignado'),
+            'hash_contenido': hash_contenido,
+            'attachments_count': correo_data.get('attachments_count', 0),
+            'has_attachments': correo_data.get('has_attachments', 0),
+            'prioridad': correo_data.get('prioridad'),
+            'tipo_soporte': correo_data.get('tipo_soporte'),
+            'tipo_ticket': correo_data.get('tipo_ticket'),
+            'origen_estrategico': correo_data.get('origen_estrategico'),
+            'macroproceso': correo_data.get('macroproceso'),
+            'fecha_vencimiento': correo_data.get('fecha_vencimiento'),
+            'sla': correo_data.get('sla'),
+            'nivel_id': correo_data.get('nivel_id'),
+            'fecha_cierre': correo_data.get('fecha_cierre'),
+            'activo': 1,
+            'created_at': ahora,
+            'updated_at': ahora
+        }
+
+    # Helper para construir la fila de un mensaje del hilo
+    def _fila_mensaje_hilo(self, correo_data, ticket_id, direccion='entrante', con_body=False):
+        """
+        con_body solo para mensajes sin fila en intranet_correos_microsoft: los demás
+        toman el body del correo al leer el hilo
+        """
+        return {
+            'ticket_id': ticket_id,
+            'conversation_id': correo_data.get('conversation_id'),
+            'message_id': correo_data.get('message_id'),
+            'direccion': direccion,
+            'subject': correo_data.get('subject', ''),
+            'from_email': correo_data.get('from_email', ''),
+            'from_name': correo_data.get('from_name', ''),
+            'fecha': correo_data.get('received_date'),
+            'body_content': correo_data.get('body_content', '') if con_body else None,
+            'created_at': datetime.now()
+        }
+
+    # Query para abrir el hilo de los correos recién insertados (sin commit, dentro del lote)
+    def _insertar_hilo_desde_correos(self, message_ids):
+        """
+        Copia los correos indicados como primer mensaje de su hilo con INSERT ... SELECT,
+        así ticket_id toma el id generado. El body queda solo en el correo.
+        """
+        message_ids = [message_id for message_id in dict.fromkeys(message_ids) if message_id]
+        sql = text("""
+            INSERT INTO intranet_hilo_mensajes
+                (ticket_id, conversation_id, message_id, direccion, subject, from_email, from_name, fecha, created_at)
+            SELECT id, conversation_id, message_id, 'entrante', subject, from_email, from_name, received_date, GETDATE()
+            FROM intranet_correos_microsoft
+            WHERE message_id IN :message_ids AND conversation_id IS NOT NULL
+        """).bindparams(bindparam('message_ids', expanding=True))
+
+        for inicio in range(0, len(message_ids), TAMANO_BLOQUE_IN):
+            self.db.execute(sql, {'message_ids': message_ids[inicio:inicio + TAMANO_BLOQUE_IN]})
+
+    # Query para registrar mensajes en el hilo
+    def registrar_mensajes_hilo(self, filas):
+        """Inserta los mensajes (filas de _fila_mensaje_hilo) que tengan conversation_id"""
+        filas = [fila for fila in filas if fila.get('conversation_id')]
+        if not filas:
+            return True
+        try:
+            self.db.execute(insert(HiloMensajesModel), filas)
+            self.db.commit()
+            return True
+
+        except Exception as e:
+            self.db.rollback()
+            print(f"Error registrando mensajes del hilo: {e}")
+            return False
+
+    # Query para obtener los mensajes de un hilo desde la BD
+    def obtener_mensajes_hilo(self, conversation_id, ticket_id=None):
+        """
+        Retorna (mensajes, vigente): los mensajes del hilo, el más reciente primero, y si el
+        hilo local puede servirse sin consultar Graph.
+        - Incluye los mensajes enlazados al ticket por ticket_id (respuestas detectadas por
+          subject o remitente, que llegan con otro conversation_id)
+        - vigente es False si hay respuestas enviadas aún sin message_id o si el mensaje más
+          reciente se guardó hace más de HILOS_CACHE_TTL (respuestas enviadas desde Outlook
+          u otras carpetas solo se conocen consultando Graph)
+        """
+        try:
+            condicion = HiloMensajesModel.conversation_id == conversation_id
+            if ticket_id:
+                condicion = or_(HiloMensajesModel.ticket_id == ticket_id, condicion)
+
+            # El body de los mensajes sincronizados vive en el correo (idx_message_id)
+            filas = self.db.query(HiloMensajesModel, CorreosMicrosoftModel.body_content).outerjoin(
+                CorreosMicrosoftModel,
+                and_(HiloMensajesModel.body_content.is_(None), CorreosMicrosoftModel.message_id == HiloMensajesModel.message_id)
+            ).filter(condicion).order_by(
+                HiloMensajesModel.fecha.desc(), HiloMensajesModel.id.desc()
+            ).all()
+            if not filas:
+                return [], False
+
+            ultimo_guardado = max(mensaje.created_at or datetime.min for mensaje, _ in filas)
+            vigente = (
+                all(mensaje.message_id for mensaje, _ in filas)
+                and datetime.now() - ultimo_guardado < timedelta(seconds=HILOS_CACHE_TTL)
+            )
+            return [mensaje.to_hilo_format(body_correo) for mensaje, body_correo in filas], vigente
+
+        except Exception as e:
+            print(f"Error obteniendo mensajes del hilo {conversation_id}: {e}")
+            return [], False
+
+    # Query para completar un hilo con los mensajes obtenidos desde Graph
+    def completar_hilo_desde_graph(self, conversation_id, mensajes_graph, ticket_id=None):
+        """
+        Guarda los mensajes de Graph que aún no están en el hilo. Las respuestas enviadas
+        sin message_id se reemplazan por su copia de Graph, que sí lo trae.
+        """
+        try:
+            existentes = {
+                fila.message_id for fila in self.db.query(HiloMensajesModel.message_id).filter(
+                    HiloMensajesModel.conversation_id == conversation_id,
+                    HiloMensajesModel.message_id.isnot(None)
+                ).all()
+            }
+            if ticket_id is None:
+                ticket_id = self.db.query(func.min(HiloMensajesModel.ticket_id)).filter(
+                    HiloMensajesModel.conversation_id == conversation_id
+                ).scalar()
+
+            nuevos = [mensaje for mensaje in mensajes_graph if mensaje.get('id') not in existentes]
+            # Los mensajes que ya están como correo no vuelven a guardar su body
+            en_correos = set(self.obtener_hashes_por_message_ids([mensaje.get('id') for mensaje in nuevos]))
+
+            filas = [self._fila_mensaje_hilo({
+                'conversation_id': conversation_id,
+                'message_id': mensaje.get('id'),
+                'subject': mensaje.get('subject'),
+                'from_email': mensaje.get('from_email'),
+                'from_name': mensaje.get('from_name'),
+                'received_date': self._a_fecha_graph(mensaje.get('receivedDateTime')),
+                'body_content': mensaje.get('body')
+            }, ticket_id, 'saliente' if (mensaje.get('from_email') or '').lower() == (EMAIL_USER or '').lower() else 'entrante',
+                con_body=mensaje.get('id') not in en_correos)
+                for mensaje in nuevos]
+
+            with self._transaccion_explicita():
+                self.db.query(HiloMensajesModel).filter(
+                    HiloMensajesModel.conversation_id == conversation_id,
+                    HiloMensajesModel.message_id.is_(None)
+                ).delete(synchronize_session=False)
+                if filas:
+                    self.db.execute(insert(HiloMensajesModel), filas)
+            return True
+
+        except Exception as e:
+            print(f"Error completando hilo {conversation_id} desde Graph: {e}")
+            return False
+
+    def _a_fecha_graph(self, valor):
+        # Graph entrega '2024-05-01T10:00:00Z'; se guarda sin zona, como received_date
+        if not valor:
+            return None
+        return datetime.fromisoformat(valor.replace('Z', '+00:00')).replace(tzinfo=None)
+
+    # Query para obtener el hash de contenido de los message_ids indicados (solo los que existen)
+    def obtener_hashes_por_message_ids(self, message_ids):
+        """
+        Retorna {message_id: hash_contenido} para los message_ids que ya existen en BD.
+        Consulta solo los IDs de la página en curso, con IN por bloques de
+        TAMANO_BLOQUE_IN (límite de parámetros de SQL Server).
+        """
+        hashes = {}
+        message_ids = [message_id for message_id in dict.fromkeys(message_ids) if message_id]
+        try:
+            for inicio in range(0, len(message_ids), TAMANO_BLOQUE_IN):
+                bloque = message_ids[inicio:inicio + TAMANO_BLOQUE_IN]
+                filas = self.db.query(
+                    CorreosMicrosoftModel.message_id,
+                    CorreosMicrosoftModel.hash_contenido
+                ).filter(CorreosMicrosoftModel.message_id.in_(bloque)).all()
+                hashes.update({fila.message_id: fila.hash_contenido for fila in filas})
+            return hashes
             
         except Exception as e:
-            print(f"Error obteniendo message_ids existentes: {e}")
-            return set()
+            print(f"Error obteniendo hashes por message_id: {e}")
+            raise
     
     # Query para marcar un correo como procesado o cambiar su estado
     def marcar_correo_procesado(self, message_id, nuevo_estado='procesado'):
@@ -289,6 +763,61 @@ class Querys:
             print(f"Error obteniendo ticket por ID {ticket_id}: {e}")
             return None
 
+    # Query para obtener el detalle completo (con body) de un ticket o correo
+    def obtener_ticket_detalle(self, ticket_id=None, message_id=None):
+        """
+        Obtiene un ticket/correo por id o message_id, incluyendo body_content
+        y los nombres de sus catálogos
+        """
+        try:
+            query = self.db.query(
+                CorreosMicrosoftModel,
+                IntranetEstadosTickets.nombre.label('estado_nombre'),
+                IntranetUsuariosGestionTicModel.nombre.label('tecnico_nombre'),
+                IntranetTipoPrioridadModel.nombre.label('prioridad_nombre'),
+                IntranetTipoSoporteModel.nombre.label('tipo_soporte_nombre'),
+                IntranetTipoTicketModel.nombre.label('tipo_ticket_nombre'),
+                IntranetPerfilesMacroprocesoModel.nombre.label('macroproceso_nombre')
+            ).outerjoin(
+                IntranetEstadosTickets, CorreosMicrosoftModel.estado == IntranetEstadosTickets.id
+            ).outerjoin(
+                IntranetUsuariosGestionTicModel, CorreosMicrosoftModel.asignado == IntranetUsuariosGestionTicModel.id
+            ).outerjoin(
+                IntranetTipoPrioridadModel, CorreosMicrosoftModel.prioridad == IntranetTipoPrioridadModel.id
+            ).outerjoin(
+                IntranetTipoSoporteModel, CorreosMicrosoftModel.tipo_soporte == IntranetTipoSoporteModel.id
+            ).outerjoin(
+                IntranetTipoTicketModel, CorreosMicrosoftModel.tipo_ticket == IntranetTipoTicketModel.id
+            ).outerjoin(
+                IntranetPerfilesMacroprocesoModel, CorreosMicrosoftModel.macroproceso == IntranetPerfilesMacroprocesoModel.id
+            )
+
+            if ticket_id:
+                query = query.filter(CorreosMicrosoftModel.id == ticket_id)
+            else:
+                query = query.filter(CorreosMicrosoftModel.message_id == message_id)
+
+            resultado = query.first()
+            if not resultado:
+                return None
+
+            correo, estado_nombre, tecnico_nombre, prioridad_nombre, tipo_soporte_nombre, tipo_ticket_nombre, macroproceso_nombre = resultado
+            detalle = correo.to_frontend_format()
+            detalle['conversation_id'] = correo.conversation_id
+            detalle['estado_nombre'] = estado_nombre or '-'
+            detalle['estadoTicket'] = estado_nombre or '-'
+            detalle['tecnico_nombre'] = tecnico_nombre or '-'
+            detalle['asignadoNombre'] = tecnico_nombre or '-'
+            detalle['prioridad_nombre'] = prioridad_nombre or '-'
+            detalle['tipo_soporte_nombre'] = tipo_soporte_nombre or '-'
+            detalle['tipo_ticket_nombre'] = tipo_ticket_nombre or '-'
+            detalle['macroproceso_nombre'] = macroproceso_nombre or '-'
+            return detalle
+            
+        except Exception as e:
+            print(f"Error obteniendo detalle del ticket {ticket_id or message_id}: {e}")
+            return None
+
     # Query para obtener un correo por su message_id
     def obtener_correo_por_message_id(self, message_id):
         """
@@ -309,12 +838,30 @@ class Querys:
             return None
 
     # Query para registrar una respuesta enviada a un correo
-    def registrar_respuesta_correo(self, message_id, respuesta, ticket_id=None):
+    def registrar_respuesta_correo(self, message_id, respuesta, ticket_id=None, contenido_html=None):
         """
-        Registra una respuesta enviada a un correo en la base de datos
+        Registra una respuesta enviada a un correo en la base de datos:
+        la agrega al hilo como mensaje saliente y actualiza el timestamp del correo
         """
         try:
-            # Por ahora solo actualizar el timestamp para indicar que se respondió
+            original = self.db.query(
+                CorreosMicrosoftModel.id,
+                CorreosMicrosoftModel.conversation_id,
+                CorreosMicrosoftModel.subject
+            ).filter(CorreosMicrosoftModel.message_id == message_id).first()
+
+            if original and original.conversation_id:
+                subject = original.subject or ''
+                # Sin message_id: /reply no lo retorna (ver completar_hilo_desde_graph)
+                self.db.add(HiloMensajesModel(self._fila_mensaje_hilo({
+                    'conversation_id': original.conversation_id,
+                    'subject': subject if subject.lower().startswith('re:') else f"RE: {subject}",
+                    'from_email': EMAIL_USER,
+                    'received_date': datetime.now(),
+                    'body_content': contenido_html or respuesta
+                }, ticket_id or original.id, 'saliente', con_body=True)))
+
+            # actualizar_correo confirma también el mensaje del hilo
             datos_actualizacion = {
                 'updated_at': datetime.now()
             }
@@ -375,11 +922,12 @@ class Querys:
             return None
     
     # Query para obtener correos convertidos en tickets con filtrado optimizado por vista
-    def obtener_tickets_correos(self, vista=None, limite=100, offset=0, tecnico_id=None):
+    def obtener_tickets_correos(self, vista=None, limite=100, offset=0, tecnico_id=None, cursor=None):
         """
         Obtiene correos convertidos en tickets desde la base de datos
         Filtrado optimizado por vista para máximo rendimiento
         Incluye JOIN con IntranetEstadosTickets para obtener el nombre del estado
+        Paginación keyset sobre (received_date, id) cuando se envía cursor
         """
         try:
             # Query base con JOINs: correos activos convertidos a tickets + información completa
@@ -391,6 +939,8 @@ class Querys:
                 IntranetTipoSoporteModel.nombre.label('tipo_soporte_nombre'),
                 IntranetTipoTicketModel.nombre.label('tipo_ticket_nombre'),
                 IntranetPerfilesMacroprocesoModel.nombre.label('macroproceso_nombre')
+            ).options(
+                defer(CorreosMicrosoftModel.body_content)
             ).outerjoin(
                 IntranetEstadosTickets, 
                 CorreosMicrosoftModel.estado == IntranetEstadosTickets.id
@@ -446,8 +996,8 @@ class Querys:
             if tecnico_id:
                 query = query.filter(CorreosMicrosoftModel.asignado == tecnico_id)
             
-            # Ordenar por fecha recibida (más recientes primero)
-            query = query.order_by(CorreosMicrosoftModel.received_date.desc())
+            # Ordenar por fecha recibida (más recientes primero); el id desempata
+            query = query.order_by(CorreosMicrosoftModel.received_date.desc(), CorreosMicrosoftModel.id.desc())
             
             # Obtener total para paginación (sin JOIN para mejor performance en count)
             count_query = self.db.query(CorreosMicrosoftModel).filter(
@@ -477,15 +1027,41 @@ class Querys:
             if tecnico_id:
                 count_query = count_query.filter(CorreosMicrosoftModel.asignado == tecnico_id)
             
-            total = count_query.count()
-            
-            # Aplicar paginación y obtener resultados
-            resultados = query.offset(offset).limit(limite).all()
+            # Total: en la primera página sale de la misma sentencia (COUNT(*) OVER());
+            # en las páginas con cursor se toma de la caché de conteos por vista
+            clave_total = ('obtener_tickets_correos', vista or '', str(tecnico_id or ''))
+            contar_en_pagina = not cursor
+            if contar_en_pagina:
+                query = query.add_columns(func.count().over().label('total_filtrado'))
+            
+            # Aplicar paginación (keyset con cursor, offset solo por compatibilidad)
+            if cursor:
+                query = query.filter(self._filtro_cursor(
+                    CorreosMicrosoftModel.received_date, CorreosMicrosoftModel.id, cursor
+                ))
+            elif offset:
+                query = query.offset(offset)
+            resultados = query.limit(int(limite) + 1).all()
+
+            if contar_en_pagina:
+                # Página vacía (offset fuera de rango): el total no viaja en las filas
+                total = resultados[0].total_filtrado if resultados else (count_query.count() if offset else 0)
+                _cache_total_tickets.guardar(clave_total, total)
+            else:
+                total = _cache_total_tickets.obtener(clave_total)
+                if total is None:
+                    total = count_query.count()
+                    _cache_total_tickets.guardar(clave_total, total)
+
+            resultados, next_cursor = self._cortar_pagina(
+                resultados, limite, 'received_date', obtener_registro=lambda fila: fila[0]
+            )
             
             # Convertir a formato frontend con información adicional de todos los JOINs
             tickets = []
-            for correo, estado_nombre, tecnico_nombre, prioridad_nombre, tipo_soporte_nombre, tipo_ticket_nombre, macroproceso_nombre in resultados:
-                ticket_data = correo.to_frontend_format()
+            for fila in resultados:
+                correo, estado_nombre, tecnico_nombre, prioridad_nombre, tipo_soporte_nombre, tipo_ticket_nombre, macroproceso_nombre = fila[:7]
+                ticket_data = correo.to_frontend_format(incluir_body=False)
                 # Agregar información del estado
                 ticket_data['estado_nombre'] = estado_nombre or '-'
                 ticket_data['estadoTicket'] = estado_nombre or '-'  # Para compatibilidad
@@ -507,9 +1083,12 @@ class Querys:
                 'total': total,
                 'limite': limite,
                 'offset': offset,
+                'next_cursor': next_cursor,
                 'vista': vista
             }
             
+        except CustomException:
+            raise
         except Exception as e:
             print(f"Error obteniendo tickets de correos: {e}")
             return {
@@ -517,6 +1096,7 @@ class Querys:
                 'total': 0,
                 'limite': limite,
                 'offset': offset,
+                'next_cursor': None,
                 'vista': vista
             }
     
@@ -526,11 +1106,8 @@ class Querys:
         Obtiene todos los estados de tickets disponibles desde IntranetEstadosTickets
         """
         try:
-            estados = self.db.query(IntranetEstadosTickets).filter(
-                IntranetEstadosTickets.estado == 1
-            ).all()
-            
-            return [{'id': estado.id, 'nombre': estado.nombre} for estado in estados]
+            # Catálogo en memoria (ver Utils/catalogos.py)
+            return catalogo_cache.activos(self.db, 'estados')
             
         except Exception as e:
             print(f"Error obteniendo estados de tickets: {e}")
@@ -542,11 +1119,8 @@ class Querys:
         Obtiene todos los técnicos disponibles desde IntranetUsuariosGestionTicModel
         """
         try:
-            tecnicos = self.db.query(IntranetUsuariosGestionTicModel).filter(
-                IntranetUsuariosGestionTicModel.estado == 1
-            ).all()
-            
-            return [{'id': tecnico.id, 'nombre': tecnico.nombre} for tecnico in tecnicos]
+            # Catálogo en memoria (ver Utils/catalogos.py)
+            return catalogo_cache.activos(self.db, 'tecnicos')
             
         except Exception as e:
             print(f"Error obteniendo técnicos de gestión TIC: {e}")
@@ -557,14 +1131,41 @@ class Querys:
         """Obtiene información del último sync exitoso"""
         try:
             ultimo_sync = self.db.query(SyncLogModel).filter(
-                SyncLogModel.estado == 'exitoso'
+                SyncLogModel.estado == 1,
+                SyncLogModel.fecha_fin.isnot(None)
             ).order_by(SyncLogModel.fecha_fin.desc()).first()
             
-            return ultimo_sync.to_dict() if ultimo_sync else None
+            if not ultimo_sync:
+                return None
+
+            # El deltaLink es interno de la sincronización, no se expone al frontend
+            ultimo_sync = ultimo_sync.to_dict()
+            ultimo_sync.pop('delta_link', None)
+            return ultimo_sync
             
         except Exception as e:
             print(f"Error obteniendo último sync: {e}")
             return None
+
+    # Query para saber si hay una sincronización en curso (iniciada y sin finalizar)
+    def obtener_sync_en_curso(self, minutos_maximos=30):
+        """
+        Indica si existe un sync sin fecha_fin iniciado en los últimos `minutos_maximos`.
+        Los registros más antiguos sin finalizar se consideran abandonados.
+        """
+        try:
+            limite = datetime.now() - timedelta(minutes=minutos_maximos)
+            en_curso = self.db.query(SyncLogModel.id).filter(
+                SyncLogModel.estado == 1,
+                SyncLogModel.fecha_fin.is_(None),
+                SyncLogModel.fecha_inicio >= limite
+            ).first()
+            
+            return en_curso is not None
+            
+        except Exception as e:
+            print(f"Error consultando sync en curso: {e}")
+            return False
     
     # Query para crear un nuevo log de sincronización
     def crear_log_sync(self, tipo_sync='incremental'):
@@ -590,8 +1191,8 @@ class Querys:
     
     # Query para finalizar un log de sincronización
     def finalizar_log_sync(self, log_id, correos_nuevos=0, correos_actualizados=0, 
-                          correos_eliminados=0, estado=1, mensaje_error=None):
-        """Finaliza un log de sincronización"""
+                          correos_eliminados=0, estado=1, mensaje_error=None, delta_link=None, tipo_sync=None):
+        """Finaliza un log de sincronización (tipo_sync corrige el tipo si la ejecución cambió de modo)"""
         try:
             log_sync = self.db.query(SyncLogModel).filter(
                 SyncLogModel.id == log_id
@@ -604,6 +1205,9 @@ class Querys:
                 log_sync.correos_eliminados = correos_eliminados
                 log_sync.estado = estado
                 log_sync.mensaje_error = mensaje_error
+                log_sync.delta_link = delta_link
+                if tipo_sync:
+                    log_sync.tipo_sync = tipo_sync
                 
                 self.db.commit()
                 return log_sync.to_dict()
@@ -615,17 +1219,33 @@ class Querys:
             print(f"Error finalizando log de sync: {e}")
             return None
 
+    # Query para obtener el deltaLink del último sync finalizado correctamente
+    def obtener_ultimo_delta_link(self):
+        """
+        Obtiene el deltaLink guardado por el último sync exitoso.
+        Permite que la sincronización incremental pida a Graph solo los cambios desde esa ejecución.
+        """
+        try:
+            ultimo = self.db.query(SyncLogModel.delta_link).filter(
+                SyncLogModel.estado == 1,
+                SyncLogModel.fecha_fin.isnot(None),
+                SyncLogModel.delta_link.isnot(None)
+            ).order_by(SyncLogModel.fecha_fin.desc()).first()
+            
+            return ultimo[0] if ultimo else None
+            
+        except Exception as e:
+            print(f"Error obteniendo último deltaLink: {e}")
+            return None
+
     # Querys para obtener listas de prioridades, tipos de soporte, tipos de ticket y macroprocesos
     def obtener_prioridades(self):
         """
         Obtiene todas las prioridades disponibles desde IntranetPrioridades
         """
         try:
-            prioridades = self.db.query(IntranetTipoPrioridadModel).filter(
-                IntranetTipoPrioridadModel.estado == 1
-            ).all()
-            
-            return [{'id': prioridad.id, 'nombre': prioridad.nombre} for prioridad in prioridades]
+            # Catálogo en memoria (ver Utils/catalogos.py)
+            return catalogo_cache.activos(self.db, 'prioridades')
             
         except Exception as e:
             print(f"Error obteniendo prioridades: {e}")
@@ -637,11 +1257,8 @@ class Querys:
         Obtiene todos los tipos de soporte disponibles desde IntranetTipoSoporte
         """
         try:
-            tipos_soporte = self.db.query(IntranetTipoSoporteModel).filter(
-                IntranetTipoSoporteModel.estado == 1
-            ).all()
-            
-            return [{'id': tipo.id, 'nombre': tipo.nombre} for tipo in tipos_soporte]
+            # Catálogo en memoria (ver Utils/catalogos.py)
+            return catalogo_cache.activos(self.db, 'tipos_soporte')
             
         except Exception as e:
             print(f"Error obteniendo tipos de soporte: {e}")
@@ -653,11 +1270,9 @@ class Querys:
         Obtiene todos los tipos de ticket disponibles desde IntranetTipoTicket
         """
         try:
-            tipos_ticket = self.db.query(IntranetTipoTicketModel).filter(
-                IntranetTipoTicketModel.estado == 1
-            ).all()
+            # Catálogo en memoria (ver Utils/catalogos.py)
+            return catalogo_cache.activos(self.db, 'tipos_ticket')
             
-            return [{'id': tipo.id, 'nombre': tipo.nombre} for tipo in tipos_ticket]
         except Exception as e:
             print(f"Error obteniendo tipos de ticket: {e}")
             return []
@@ -665,18 +1280,15 @@ class Querys:
     # Query para obtener macroprocesos
     def obtener_macroprocesos(self):
         """
-        Obtiene todos los macroprocesos disponibles (valores estáticos por ahora)
+        Obtiene todos los macroprocesos disponibles desde IntranetPerfilesMacroproceso
         """
         try:
-            # Valores estáticos por ahora
-            macroprocesos = self.db.query(IntranetPerfilesMacroprocesoModel).filter(
-                IntranetPerfilesMacroprocesoModel.estado == 1
-            ).all()
-            return [{'id': macro.id, 'nombre': macro.nombre} for macro in macroprocesos]
-
+            # Catálogo en memoria (ver Utils/catalogos.py)
+            return catalogo_cache.activos(self.db, 'macroprocesos')
+            
         except Exception as e:
             print(f"Error obteniendo macroprocesos: {e}")
-            return self.tools.output(500, "Error obteniendo macroprocesos.", {})
+            return []
 
     # Query para obtener tipos de nivel
     def obtener_tipo_nivel(self):
@@ -684,11 +1296,8 @@ class Querys:
         Obtiene todos los tipos de nivel disponibles desde IntranetTipoNivel
         """
         try:
-            tipos_nivel = self.db.query(IntranetTipoNivelModel).filter(
-                IntranetTipoNivelModel.estado == 1
-            ).all()
-            
-            return [{'id': tipo.id, 'nombre': tipo.nombre} for tipo in tipos_nivel]
+            # Catálogo en memoria (ver Utils/catalogos.py)
+            return catalogo_cache.activos(self.db, 'tipos_nivel')
             
         except Exception as e:
             print(f"Error obteniendo tipos de nivel: {e}")
@@ -700,16 +1309,23 @@ class Querys:
         Obtiene todos los orígenes estratégicos disponibles
         """
         try:
-            origenes = self.db.query(IntranetOrigenEstrategicoModel).filter(
-                IntranetOrigenEstrategicoModel.estado == 1
-            ).all()
-            
-            return [{'id': origen.id, 'nombre': origen.nombre} for origen in origenes]
+            # Catálogo en memoria (ver Utils/catalogos.py)
+            return catalogo_cache.activos(self.db, 'origenes_estrategicos')
             
         except Exception as e:
             print(f"Error obteniendo orígenes estratégicos: {e}")
             return []
 
+    # Query para obtener todos los catálogos de tickets en una sola llamada
+    def obtener_catalogos(self):
+        """Retorna ({catalogo: [{id, nombre}]}, version_combinada) desde la caché de catálogos"""
+        return catalogo_cache.todos(self.db)
+
+    # Query para obtener la versión (hash) de un catálogo en memoria
+    def obtener_version_catalogo(self, catalogo):
+        """Retorna el hash del contenido actual del catálogo; sirve como ETag"""
+        return catalogo_cache.version(self.db, catalogo)
+
     # Query para filtrar tickets con optimización usando IDs exactos
     def filtrar_tickets_optimizado(self, filtros: dict):
         """
@@ -726,15 +1342,15 @@ class Querys:
         - estado (ID numérico del estado)
         """
         try:
-            # Query base con JOINs para obtener nombres
-            base_query = """
-            SELECT DISTINCT
+            # Columnas y JOINs para obtener nombres (los JOIN son por id de catálogo: no duplican filas)
+            select_query = """
+            SELECT
                 icm.id,
                 icm.message_id,
                 icm.subject,
                 icm.from_name,
                 icm.from_email,
-                icm.body_content,
+                icm.body_preview,
                 icm.received_date,
                 icm.created_at,
                 icm.updated_at,
@@ -766,6 +1382,7 @@ class Querys:
                     WHEN icm.estado = 4 THEN 'Cerrado'
                     ELSE 'Abierto'
                 END as estado_nombre
+                {columna_total}
 
             FROM intranet_correos_microsoft icm
             
@@ -776,6 +1393,10 @@ class Querys:
             LEFT JOIN intranet_perfiles_macroproceso ipm ON icm.macroproceso = ipm.id AND ipm.estado = 1
             LEFT JOIN intranet_usuarios_gestion_tic iugt ON icm.asignado = iugt.id AND iugt.estado = 1
             LEFT JOIN intranet_origen_estrategico ioe ON icm.origen_estrategico = ioe.id AND ioe.estado = 1             
+            """
+
+            # Condiciones de filtro: solo usan columnas de icm, así el conteo no necesita JOINs
+            where_query = """
             WHERE icm.activo = 1 
             AND icm.ticket = 1
             """
@@ -785,80 +1406,98 @@ class Querys:
             # 1. Filtro de vista base
             vista = filtros.get('vista', 'todos')
             if vista == 'sin':
-                base_query += " AND icm.asignado IS NULL"
+                where_query += " AND icm.asignado IS NULL"
             elif vista == 'abiertos':
-                base_query += " AND icm.estado = 1"
+                where_query += " AND icm.estado = 1"
             elif vista == 'proceso':
-                base_query += " AND icm.estado = 2"
+                where_query += " AND icm.estado = 2"
             elif vista == 'comp':
-                base_query += " AND icm.estado = 3"
+                where_query += " AND icm.estado = 3"
             elif vista.startswith('tecnico_'):
                 tecnico_id = int(vista.replace('tecnico_', ''))
-                base_query += " AND icm.asignado = :tecnico_id"
+                where_query += " AND icm.asignado = :tecnico_id"
                 params['tecnico_id'] = tecnico_id
             
             # 2. Filtros específicos usando campos reales
             if filtros.get('q'):
-                search_term = f"%{filtros['q']}%"
-                base_query += """ AND (
-                    CAST(icm.id AS NVARCHAR) LIKE :search_term OR
-                    icm.subject LIKE :search_term OR  
-                    icm.from_name LIKE :search_term OR
-                    icm.from_email LIKE :search_term
-                )"""
-                params['search_term'] = search_term
+                where_query += self._condicion_busqueda_tickets(filtros['q'], params)
                 
             if filtros.get('estado'):
-                base_query += " AND icm.estado = :estado_filtro"
+                where_query += " AND icm.estado = :estado_filtro"
                 params['estado_filtro'] = filtros['estado']
                 
             if filtros.get('asignado'):
-                base_query += " AND icm.asignado = :asignado_filtro"
+                where_query += " AND icm.asignado = :asignado_filtro"
                 params['asignado_filtro'] = filtros['asignado']
                 
             if filtros.get('tipo_soporte'):
-                base_query += " AND icm.tipo_soporte = :tipo_soporte_filtro"
+                where_query += " AND icm.tipo_soporte = :tipo_soporte_filtro"
                 params['tipo_soporte_filtro'] = filtros['tipo_soporte']
                 
             if filtros.get('macroproceso'):
-                base_query += " AND icm.macroproceso = :macroproceso_filtro"
+                where_query += " AND icm.macroproceso = :macroproceso_filtro"
                 params['macroproceso_filtro'] = filtros['macroproceso']
                 
             if filtros.get('tipo_ticket'):
-                base_query += " AND icm.tipo_ticket = :tipo_ticket_filtro"
+                where_query += " AND icm.tipo_ticket = :tipo_ticket_filtro"
                 params['tipo_ticket_filtro'] = filtros['tipo_ticket']
             
-            # 3. Contar total (antes de paginación)
-            # Extraer solo la parte WHERE y filtros de la query base
-            where_clause = ""
-            if 'WHERE' in base_query:
-                where_clause = "WHERE" + base_query.split('WHERE', 1)[1]
-            
-            count_query = f"""
-            SELECT COUNT(DISTINCT icm.id) as total
-            FROM intranet_correos_microsoft icm
-            LEFT JOIN intranet_usuarios_gestion_tic iugt ON icm.asignado = iugt.id AND iugt.estado = 1
-            {where_clause}
-            """
-            
-            total_result = self.db.execute(text(count_query), params).fetchone()
-            total = total_result[0] if total_result else 0
-            
-            # 4. Agregar ordenación y paginación (SQL Server syntax)
-            limite = filtros.get('limite', 100)
-            offset = filtros.get('offset', 0)
-            
-            base_query += f"""
-            ORDER BY icm.created_at DESC
+            # 3. Total: en la primera página sale de la misma sentencia (COUNT(*) OVER());
+            # en las páginas con cursor se toma de la caché de conteos por filtros
+            incluir_total = filtros.get('incluir_total', True)
+            clave_total = self._clave_filtros_tickets(filtros)
+            total = None
+            
+            # 4. Agregar ordenación y paginación keyset sobre (created_at, id) (SQL Server syntax)
+            limite = int(filtros.get('limite', 100))
+            offset = int(filtros.get('offset', 0))
+            cursor = filtros.get('cursor')
+            
+            contar_en_pagina = incluir_total and not cursor
+            if incluir_total and cursor:
+                total = _cache_total_tickets.obtener(clave_total)
+                if total is None:
+                    total = self._contar_tickets_filtrados(where_query, params)
+                    _cache_total_tickets.guardar(clave_total, total)
+            
+            if cursor:
+                cursor_fecha, cursor_id = self.tools.decodificar_cursor(cursor)
+                if cursor_fecha is None:
+                    where_query += " AND icm.created_at IS NULL AND icm.id < :cursor_id"
+                else:
+                    where_query += """ AND (
+                    icm.created_at < :cursor_fecha OR
+                    (icm.created_at = :cursor_fecha AND icm.id < :cursor_id) OR
+                    icm.created_at IS NULL
+                )"""
+                    params['cursor_fecha'] = cursor_fecha
+                params['cursor_id'] = cursor_id
+                # Con cursor el offset no aplica
+                offset = 0
+            
+            # Se pide un registro extra para saber si hay página siguiente
+            columna_total = ", COUNT(*) OVER() AS total_filtrado" if contar_en_pagina else ""
+            page_query = select_query.format(columna_total=columna_total) + where_query + f"""
+            ORDER BY icm.created_at DESC, icm.id DESC
             OFFSET {offset} ROWS
-            FETCH NEXT {limite} ROWS ONLY
+            FETCH NEXT {limite + 1} ROWS ONLY
             """
             
             # 5. Ejecutar query principal
-            result = self.db.execute(text(base_query), params)
+            filas = self.db.execute(text(page_query), params).fetchall()
+            
+            if contar_en_pagina:
+                if filas:
+                    total = filas[0].total_filtrado
+                else:
+                    # Página vacía (offset fuera de rango): el total no viaja en las filas
+                    total = self._contar_tickets_filtrados(where_query, params) if offset else 0
+                _cache_total_tickets.guardar(clave_total, total)
+            
+            filas, next_cursor = self._cortar_pagina(filas, limite, 'created_at')
             tickets = []
             
-            for row in result:
+            for row in filas:
                 # Convertir row a diccionario usando nombres de columnas
                 row_dict = dict(row._mapping)
                 
@@ -868,7 +1507,7 @@ class Querys:
                     'subject': row_dict.get('subject'),
                     'from_name': row_dict.get('from_name'),
                     'from_email': row_dict.get('from_email'),
-                    'body': row_dict.get('body_content'),
+                    'preview': row_dict.get('body_preview'),
                     'received_at': row_dict.get('received_date').strftime('%Y-%m-%d %H:%M:%S') if row_dict.get('received_date') else None,
                     'created_at': row_dict.get('created_at').strftime('%Y-%m-%d') if row_dict.get('created_at') else None,
                     'updated_at': row_dict.get('updated_at').strftime('%Y-%m-%d %H:%M:%S') if row_dict.get('updated_at') else None,
@@ -902,51 +1541,134 @@ class Querys:
                 'total': total,
                 'limite': filtros.get('limite', 100),
                 'offset': filtros.get('offset', 0),
+                'next_cursor': next_cursor,
                 'filtros_aplicados': {k: v for k, v in filtros.items() 
-                                   if k not in ['limite', 'offset'] and v is not None}
+                                   if k not in ['limite', 'offset', 'cursor', 'incluir_total'] and v is not None}
             }
             
         except Exception as e:
             print(f"Error en filtrar_tickets_optimizado: {e}")
             raise e
 
+    # Helper para construir la condición del filtro de texto libre (q)
+    def _condicion_busqueda_tickets(self, q, params):
+        """
+        Con TICKETS_FULLTEXT_ENABLED y el índice full-text creado usa CONTAINS:
+        cada palabra es un término de prefijo ("palabra*") y todas deben aparecer,
+        en asunto, remitente o cuerpo. Un número busca además el id del ticket.
+        Sin índice (o sin términos válidos) conserva la búsqueda LIKE.
+        """
+        terminos = self._terminos_fulltext(q)
+        if terminos and self._fulltext_disponible():
+            params['fts_query'] = ' AND '.join(f'"{termino}*"' for termino in terminos)
+            condicion = "CONTAINS((icm.subject, icm.from_name, icm.from_email, icm.body_content), :fts_query)"
+            if q.strip().isdigit():
+                params['q_id'] = int(q.strip())
+                condicion = f"icm.id = :q_id OR {condicion}"
+            return f" AND ({condicion})"
+
+        params['search_term'] = f"%{q}%"
+        return """ AND (
+                    CAST(icm.id AS NVARCHAR) LIKE :search_term OR
+                    icm.subject LIKE :search_term OR  
+                    icm.from_name LIKE :search_term OR
+                    icm.from_email LIKE :search_term
+                )"""
+
+    # Helper para separar el texto de búsqueda en términos seguros para CONTAINS
+    def _terminos_fulltext(self, q):
+        """Deja solo letras, dígitos y los separadores de correos; descarta comillas y operadores"""
+        terminos = []
+        for palabra in q.split():
+            limpio = ''.join(c for c in palabra if c.isalnum() or c in '@.-_')
+            limpio = limpio.strip('.-_')
+            if limpio:
+                terminos.append(limpio)
+        return terminos
+
+    # Query para verificar (una vez por proceso) que el índice full-text de tickets existe
+    def _fulltext_disponible(self):
+        global _fulltext_tickets
+        if not TICKETS_FULLTEXT_ENABLED:
+            return False
+        if _fulltext_tickets is None:
+            try:
+                existe = self.db.execute(text(
+                    "SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('dbo.intranet_correos_microsoft')"
+                )).fetchone()
+                _fulltext_tickets = existe is not None
+                if not _fulltext_tickets:
+                    print("TICKETS_FULLTEXT_ENABLED activo pero no existe el índice full-text; se usa LIKE.")
+            except Exception as e:
+                print(f"Error verificando índice full-text: {e}")
+                _fulltext_tickets = False
+        return _fulltext_tickets
+
+    # Helper para construir la clave de caché del total a partir de los filtros normalizados
+    def _clave_filtros_tickets(self, filtros: dict):
+        """Ignora paginación y valores vacíos; normaliza el texto de búsqueda"""
+        excluir = ('limite', 'offset', 'cursor', 'incluir_total')
+        clave = []
+        for campo, valor in sorted(filtros.items()):
+            if campo in excluir or valor in (None, ''):
+                continue
+            if campo == 'q':
+                valor = ' '.join(str(valor).lower().split())
+            clave.append((campo, str(valor)))
+        return tuple(clave)
+
+    # Query para contar los tickets que cumplen las condiciones de filtro
+    def _contar_tickets_filtrados(self, where_query, params):
+        """Conteo sin JOINs: las condiciones de filtro solo usan columnas de icm"""
+        count_query = f"""
+        SELECT COUNT(*) as total
+        FROM intranet_correos_microsoft icm
+        {where_query}
+        """
+        total_result = self.db.execute(text(count_query), params).fetchone()
+        return total_result[0] if total_result else 0
+
     # ===== FUNCIONES PARA MANEJO DE RESPUESTAS EN HILOS =====
     
-    # Query para obtener un ticket por su conversation_id
-    def obtener_ticket_por_conversation_id(self, conversation_id):
+    # Condición del correo raíz de una conversación: ticket (cualquier estado) o correo abierto en la bandeja
+    def _filtro_raiz_conversacion(self):
+        return and_(
+            CorreosMicrosoftModel.activo == 1,
+            or_(CorreosMicrosoftModel.ticket == 1, CorreosMicrosoftModel.estado == 1)
+        )
+
+    # Query para obtener el ticket raíz de varias conversaciones
+    def obtener_tickets_por_conversation_ids(self, conversation_ids=None, desde=None, limite=None):
         """
-        Busca un ticket existente basado en el conversation_id
-        Returns: dict con datos del ticket o None si no existe
+        Retorna {conversation_id: ticket_id} de las conversaciones indicadas, con IN por bloques
+        de TAMANO_BLOQUE_IN. Retorna None si la consulta falla.
+        Sin conversation_ids retorna las conversaciones cuya raíz se creó desde `desde`,
+        las más recientes primero y como máximo `limite`.
         """
+        consulta = self.db.query(
+            CorreosMicrosoftModel.conversation_id,
+            func.min(CorreosMicrosoftModel.id)
+        ).filter(
+            CorreosMicrosoftModel.conversation_id.isnot(None),
+            self._filtro_raiz_conversacion()
+        ).group_by(CorreosMicrosoftModel.conversation_id)
+
         try:
-            if not conversation_id:
-                return None
-                
-            # Por ahora buscaremos por similitud de asunto, ya que no tenemos conversation_id en BD
-            # En el futuro se puede agregar la columna conversation_id
-            print(f"🔍 Buscando ticket por conversation_id: {conversation_id}")
-            
-            # Buscaremos cualquier ticket existente (temporalmente deshabilitado)
-            # TODO: Agregar columna conversation_id a la tabla
-            return None
-            
-            result = self.db.execute(sql, {"conversation_id": conversation_id}).fetchone()
-            
-            if result:
-                return {
-                    'id': result[0],
-                    'message_id': result[1],
-                    'subject': result[2],
-                    'from_email': result[3],
-                    'from_name': result[4],
-                    'conversation_id': result[5],
-                    'created_at': result[6]
-                }
-                
-            return None
-            
+            if conversation_ids is None:
+                consulta = consulta.having(func.min(CorreosMicrosoftModel.created_at) >= desde).order_by(
+                    func.min(CorreosMicrosoftModel.id).desc()
+                )
+                return dict(consulta.limit(limite).all())
+
+            tickets = {}
+            conversation_ids = [conversation_id for conversation_id in dict.fromkeys(conversation_ids) if conversation_id]
+            for inicio in range(0, len(conversation_ids), TAMANO_BLOQUE_IN):
+                bloque = conversation_ids[inicio:inicio + TAMANO_BLOQUE_IN]
+                tickets.update(consulta.filter(CorreosMicrosoftModel.conversation_id.in_(bloque)).all())
+            return tickets
+
         except Exception as e:
-            print(f"Error en obtener_ticket_por_conversation_id: {e}")
+            print(f"Error obteniendo tickets por conversation_id: {e}")
             return None
 
     # Query para registrar una respuesta entrante en el historial del ticket
@@ -955,22 +1677,8 @@ class Querys:
         Registra una respuesta entrante en el historial del ticket
         """
         try:
-            # Por ahora, vamos a insertarlo como un correo normal pero marcado como respuesta
-            # En el futuro se puede crear una tabla específica para respuestas
-            
             # Crear entrada usando el constructor correcto del modelo
-            correo_data = {
-                'message_id': respuesta_data.get('message_id'),
-                'subject': f"[RESPUESTA] {respuesta_data.get('subject', '')}",
-                'from_email': respuesta_data.get('from_email'),
-                'from_name': respuesta_data.get('from_name'),
-                'received_date': respuesta_data.get('received_date'),
-                'body_preview': respuesta_data.get('subject', '')[:100],
-                'body_content': respuesta_data.get('body_content'),
-                'estado': 2  # Estado 2 = Respuesta procesada (no aparece en buzón)
-            }
-            
-            correo_respuesta = CorreosMicrosoftModel(correo_data)
+            correo_respuesta = CorreosMicrosoftModel(self._preparar_respuesta_entrante(respuesta_data))
             
             self.db.add(correo_respuesta)
             self.db.commit()
@@ -983,6 +1691,25 @@ class Querys:
             self.db.rollback()
             return False
 
+    # Helper para convertir una respuesta entrante en una fila de correo
+    def _preparar_respuesta_entrante(self, respuesta_data):
+        """
+        Por ahora la respuesta se guarda como un correo normal pero marcado como respuesta.
+        En el futuro se puede crear una tabla específica para respuestas.
+        """
+        return {
+            'message_id': respuesta_data.get('message_id'),
+            'conversation_id': respuesta_data.get('conversation_id'),
+            'subject': f"[RESPUESTA] {respuesta_data.get('subject', '')}",
+            'from_email': respuesta_data.get('from_email'),
+            'from_name': respuesta_data.get('from_name'),
+            'received_date': respuesta_data.get('received_date'),
+            'body_preview': (respuesta_data.get('subject') or '')[:100],
+            'body_content': respuesta_data.get('body_content'),
+            'hash_contenido': respuesta_data.get('hash_contenido', ''),
+            'estado': 2  # Estado 2 = Respuesta procesada (no aparece en buzón)
+        }
+
     # Query para actualizar la fecha de última actividad de un ticket
     def actualizar_ultima_actividad_ticket(self, ticket_id):
         """
@@ -991,7 +1718,7 @@ class Querys:
         try:
             sql = text("""
                 UPDATE intranet_correos_microsoft 
-                SET updated_at = NOW()
+                SET updated_at = GETDATE()
                 WHERE id = :ticket_id
             """)
             
@@ -1005,80 +1732,72 @@ class Querys:
             self.db.rollback()
             return False
 
-    # Query para buscar tickets con subject similar
-    def buscar_ticket_por_subject_similar(self, subject_limpio, from_email):
-        """
-        Busca tickets con subject similar al proporcionado
-        Útil para detectar hilos cuando conversation_id no coincide
-        """
-        try:
-            sql = text("""
-                SELECT TOP 1 id, subject, from_email, conversation_id, created_at
-                FROM intranet_correos_microsoft 
-                WHERE subject LIKE :subject_pattern
-                AND from_email = :from_email
-                AND estado = 1
-                AND created_at >= DATEADD(day, -7, GETDATE())
-                ORDER BY created_at DESC
-            """)
-            
-            # Buscar con patrón LIKE para subjects similares
-            subject_pattern = f"%{subject_limpio}%"
-            
-            result = self.db.execute(sql, {
-                "subject_pattern": subject_pattern,
-                "from_email": from_email
-            }).fetchone()
-            
-            if result:
-                return {
-                    'id': result[0],
-                    'subject': result[1],
-                    'from_email': result[2],
-                    'conversation_id': result[3],
-                    'created_at': result[4]
-                }
-                
-            return None
-            
-        except Exception as e:
-            print(f"Error buscando ticket por subject similar: {e}")
-            return None
+    # Query para completar subject_normalizado en los correos anteriores a la columna
+    def normalizar_subjects_pendientes(self, tamano_lote=TAMANO_BLOQUE_IN):
+        """Recorre por lotes los correos sin subject_normalizado; retorna cuántos se actualizaron"""
+        total = 0
+        sql_update = CorreosMicrosoftModel.__table__.update().where(
+            CorreosMicrosoftModel.__table__.c.id == bindparam('b_id')
+        ).values(subject_normalizado=bindparam('b_subject_normalizado'))
+
+        while True:
+            filas = self.db.query(CorreosMicrosoftModel.id, CorreosMicrosoftModel.subject).filter(
+                CorreosMicrosoftModel.subject_normalizado.is_(None),
+                CorreosMicrosoftModel.subject.isnot(None)
+            ).limit(tamano_lote).all()
+            if not filas:
+                return total
+
+            self.db.execute(sql_update, [
+                {'b_id': fila.id, 'b_subject_normalizado': normalizar_subject(fila.subject)} for fila in filas
+            ])
+            self.db.commit()
+            total += len(filas)
 
-    # Query para buscar el ticket más reciente de un remitente específico
-    def buscar_ticket_reciente_por_email(self, from_email, days=7):
+    # Query para obtener los tickets recientes de varios remitentes
+    def obtener_tickets_recientes_por_emails(self, from_emails, days=7):
         """
-        Busca el ticket más reciente de un remitente específico
+        Retorna {from_email en minúsculas: [tickets]} con los tickets abiertos (estado 1) de los
+        últimos `days` días de cada remitente, el más reciente primero, en una consulta
+        por página (IN por bloques de TAMANO_BLOQUE_IN).
         """
+        tickets = {}
+        from_emails = list({from_email.lower() for from_email in from_emails if from_email})
+        if not from_emails:
+            return tickets
+
+        desde = datetime.now() - timedelta(days=days)
         try:
-            sql = text("""
-                SELECT TOP 1 id, subject, from_email, conversation_id, created_at
-                FROM intranet_correos_microsoft 
-                WHERE from_email = :from_email
-                AND estado = 1
-                AND created_at >= DATEADD(day, :days_back, GETDATE())
-                ORDER BY created_at DESC
-            """)
-            
-            result = self.db.execute(sql, {
-                "from_email": from_email,
-                "days_back": -days
-            }).fetchone()
-            
-            if result:
-                return {
-                    'id': result[0],
-                    'subject': result[1],
-                    'from_email': result[2],
-                    'conversation_id': result[3],
-                    'created_at': result[4]
-                }
-                
-            return None
-            
+            for inicio in range(0, len(from_emails), TAMANO_BLOQUE_IN):
+                bloque = from_emails[inicio:inicio + TAMANO_BLOQUE_IN]
+                filas = self.db.query(
+                    CorreosMicrosoftModel.id,
+                    CorreosMicrosoftModel.subject,
+                    CorreosMicrosoftModel.subject_normalizado,
+                    CorreosMicrosoftModel.from_email,
+                    CorreosMicrosoftModel.conversation_id,
+                    CorreosMicrosoftModel.created_at
+                ).filter(
+                    CorreosMicrosoftModel.from_email.in_(bloque),
+                    CorreosMicrosoftModel.estado == 1,
+                    CorreosMicrosoftModel.created_at >= desde
+                ).order_by(CorreosMicrosoftModel.created_at.desc()).all()
+
+                for fila in filas:
+                    tickets.setdefault((fila.from_email or '').lower(), []).append({
+                        'id': fila.id,
+                        'subject': fila.subject,
+                        # Filas anteriores a la columna: se normaliza en memoria
+                        'subject_normalizado': fila.subject_normalizado or normalizar_subject(fila.subject),
+                        'from_email': fila.from_email,
+                        'conversation_id': fila.conversation_id,
+                        'created_at': fila.created_at
+                    })
+            return tickets
+
         except Exception as e:
-            print(f"Error buscando ticket reciente por email: {e}")
-            return None
+            print(f"Error obteniendo tickets recientes por email: {e}")
+            return {}
 
     # Query para obtener métricas del dashboard
     def obtener_metricas_dashboard(self, fecha_inicio=None, fecha_fin=None):
@@ -1093,255 +1812,326 @@ class Querys:
         - Top 3 macroprocesos más frecuentes
         - Top 3 prioridades más frecuentes
         - Top 3 asignados más frecuentes
-        - Distribución por tipo de ticket (Gestión y Estratégico)
+        Todo sale de una sola consulta agrupada que se agrega en Python; el resultado
+        se guarda unos segundos en caché por rango de fechas.
         """
+        clave = (str(fecha_inicio or ''), str(fecha_fin or ''))
+        metricas = _cache_metricas_dashboard.obtener(clave)
+        if metricas is not None:
+            return metricas
+
         try:
-            # Opción 1: SQLAlchemy ORM (más legible, orientado a objetos)
-            
-            # Query base con filtros
+            # Una fila por combinación de dimensiones con su cantidad de tickets
             query = self.db.query(
-                func.count().label('total_tickets'),
-                func.sum(case((CorreosMicrosoftModel.tipo_ticket == 1, 1), else_=0)).label('gestion'),
-                func.sum(case((CorreosMicrosoftModel.tipo_ticket == 2, 1), else_=0)).label('estrategicos'),
-                func.sum(case((CorreosMicrosoftModel.prioridad == 3, 1), else_=0)).label('prioridad_alta'),
-                func.sum(case((CorreosMicrosoftModel.estado == 1, 1), else_=0)).label('abiertos'),
-                func.sum(case((CorreosMicrosoftModel.estado == 2, 1), else_=0)).label('en_proceso'),
-                func.sum(case((CorreosMicrosoftModel.estado == 3, 1), else_=0)).label('completados')
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1
-            )
-            
-            # Agregar filtros de fecha si se proporcionan
-            if fecha_inicio:
-                query = query.filter(func.date(CorreosMicrosoftModel.received_date_time) >= fecha_inicio)
-            
-            if fecha_fin:
-                query = query.filter(func.date(CorreosMicrosoftModel.received_date_time) <= fecha_fin)
-            
-            # Ejecutar query
-            result = query.one()
-            
-            # Query para obtener los 3 tipos de soporte más frecuentes
-            query_tipos_soporte = self.db.query(
+                CorreosMicrosoftModel.tipo_ticket,
+                CorreosMicrosoftModel.prioridad,
+                CorreosMicrosoftModel.estado,
                 CorreosMicrosoftModel.tipo_soporte,
-                IntranetTipoSoporteModel.nombre.label('nombre_tipo_soporte'),
-                func.count(CorreosMicrosoftModel.tipo_soporte).label('cantidad')
-            ).join(
-                IntranetTipoSoporteModel,
-                CorreosMicrosoftModel.tipo_soporte == IntranetTipoSoporteModel.id
+                CorreosMicrosoftModel.macroproceso,
+                CorreosMicrosoftModel.asignado,
+                func.count().label('cantidad')
             ).filter(
                 CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.tipo_soporte.isnot(None),
-                CorreosMicrosoftModel.tipo_soporte != 0
+                CorreosMicrosoftModel.ticket == 1
             )
             
-            # Agregar filtros de fecha para tipos de soporte
+            # Filtros de fecha como rango semiabierto [inicio, fin + 1 día) sobre received_date
             if fecha_inicio:
-                query_tipos_soporte = query_tipos_soporte.filter(
-                    func.date(CorreosMicrosoftModel.received_date_time) >= fecha_inicio
-                )
+                query = query.filter(CorreosMicrosoftModel.received_date >= self._a_fecha(fecha_inicio))
             
             if fecha_fin:
-                query_tipos_soporte = query_tipos_soporte.filter(
-                    func.date(CorreosMicrosoftModel.received_date_time) <= fecha_fin
-                )
+                query = query.filter(CorreosMicrosoftModel.received_date < self._a_fecha(fecha_fin) + timedelta(days=1))
             
-            # Agrupar, ordenar y limitar a los 3 primeros
-            tipos_soporte_result = query_tipos_soporte.group_by(
+            filas = query.group_by(
+                CorreosMicrosoftModel.tipo_ticket,
+                CorreosMicrosoftModel.prioridad,
+                CorreosMicrosoftModel.estado,
                 CorreosMicrosoftModel.tipo_soporte,
-                IntranetTipoSoporteModel.nombre
-            ).order_by(
-                func.count(CorreosMicrosoftModel.tipo_soporte).desc()
-            ).limit(3).all()
-            
-            # Formatear tipos de soporte
-            tipos_soporte = []
-            for tipo in tipos_soporte_result:
-                tipos_soporte.append({
-                    'id': tipo[0],
-                    'nombre': tipo[1],
-                    'cantidad': int(tipo[2])
-                })
-            
-            # Query para obtener los 3 macroprocesos más frecuentes
-            query_macroprocesos = self.db.query(
                 CorreosMicrosoftModel.macroproceso,
-                IntranetPerfilesMacroprocesoModel.nombre.label('nombre_macroproceso'),
-                func.count(CorreosMicrosoftModel.macroproceso).label('cantidad')
-            ).join(
-                IntranetPerfilesMacroprocesoModel,
-                CorreosMicrosoftModel.macroproceso == IntranetPerfilesMacroprocesoModel.id
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.macroproceso.isnot(None),
-                CorreosMicrosoftModel.macroproceso != 0
-            )
-            
-            # Agregar filtros de fecha para macroprocesos
-            if fecha_inicio:
-                query_macroprocesos = query_macroprocesos.filter(
-                    func.date(CorreosMicrosoftModel.received_date_time) >= fecha_inicio
-                )
+                CorreosMicrosoftModel.asignado
+            ).all()
             
-            if fecha_fin:
-                query_macroprocesos = query_macroprocesos.filter(
-                    func.date(CorreosMicrosoftModel.received_date_time) <= fecha_fin
-                )
+            totals = {'total': 0, 'gestion': 0, 'estrategicos': 0, 'prioridad_alta': 0}
+            estados = {'abiertos': 0, 'en_proceso': 0, 'completados': 0}
+            conteos = {'tipo_soporte': {}, 'macroproceso': {}, 'prioridad': {}, 'asignado': {}}
+            
+            for fila in filas:
+                cantidad = int(fila.cantidad or 0)
+                totals['total'] += cantidad
+                if fila.tipo_ticket == 1:
+                    totals['gestion'] += cantidad
+                elif fila.tipo_ticket == 2:
+                    totals['estrategicos'] += cantidad
+                if fila.prioridad == 3:
+                    totals['prioridad_alta'] += cantidad
+                if fila.estado == 1:
+                    estados['abiertos'] += cantidad
+                elif fila.estado == 2:
+                    estados['en_proceso'] += cantidad
+                elif fila.estado == 3:
+                    estados['completados'] += cantidad
+                for campo, conteo in conteos.items():
+                    valor = getattr(fila, campo)
+                    if valor:
+                        conteo[valor] = conteo.get(valor, 0) + cantidad
+            
+            metricas = {
+                'totals': totals,
+                'estados': estados,
+                'tipos_soporte': self._top_catalogo(conteos['tipo_soporte'], 'tipos_soporte'),
+                'macroprocesos': self._top_catalogo(conteos['macroproceso'], 'macroprocesos'),
+                'prioridades': self._top_catalogo(conteos['prioridad'], 'prioridades'),
+                'asignados': self._top_catalogo(conteos['asignado'], 'tecnicos')
+            }
             
-            # Agrupar, ordenar y limitar a los 3 primeros
-            macroprocesos_result = query_macroprocesos.group_by(
-                CorreosMicrosoftModel.macroproceso,
-                IntranetPerfilesMacroprocesoModel.nombre
-            ).order_by(
-                func.count(CorreosMicrosoftModel.macroproceso).desc()
-            ).limit(3).all()
-            
-            # Formatear macroprocesos
-            macroprocesos = []
-            for macro in macroprocesos_result:
-                macroprocesos.append({
-                    'id': macro[0],
-                    'nombre': macro[1],
-                    'cantidad': int(macro[2])
-                })
+            _cache_metricas_dashboard.guardar(clave, metricas)
+            return metricas
             
-            # Query para obtener las 3 prioridades más frecuentes
-            query_prioridades = self.db.query(
-                CorreosMicrosoftModel.prioridad,
-                IntranetTipoPrioridadModel.nombre.label('nombre_prioridad'),
-                func.count(CorreosMicrosoftModel.prioridad).label('cantidad')
-            ).join(
-                IntranetTipoPrioridadModel,
-                CorreosMicrosoftModel.prioridad == IntranetTipoPrioridadModel.id
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.prioridad.isnot(None),
-                CorreosMicrosoftModel.prioridad != 0
+        except Exception as e:
+            print(f"Error obteniendo métricas del dashboard: {e}")
+            raise CustomException(f"Error obteniendo métricas: {str(e)}")
+
+    # Helpers para construir rangos de fechas semiabiertos [inicio, fin)
+    def _rango_anio(self, anio):
+        anio = int(anio)
+        return date(anio, 1, 1), date(anio + 1, 1, 1)
+
+    def _rango_mes(self, anio, mes):
+        anio, mes = int(anio), int(mes)
+        inicio = date(anio, mes, 1)
+        fin = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+        return inicio, fin
+
+    def _a_fecha(self, valor):
+        """Convierte 'YYYY-MM-DD' (o un datetime/date) en date"""
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        return date.fromisoformat(str(valor)[:10])
+
+    # Helper para obtener los más frecuentes de una dimensión con el nombre de su catálogo
+    def _top_catalogo(self, conteo, catalogo, limite=3):
+        """Solo cuenta ids existentes en el catálogo (equivalente al JOIN con la tabla)"""
+        nombres = catalogo_cache.nombres(self.db, catalogo)
+        frecuentes = sorted(
+            ((id_registro, cantidad) for id_registro, cantidad in conteo.items() if id_registro in nombres),
+            key=lambda item: (-item[1], item[0])
+        )[:limite]
+        return [{'id': id_registro, 'nombre': nombres[id_registro], 'cantidad': cantidad} for id_registro, cantidad in frecuentes]
+
+    # Helper para obtener los meses (anio, mes) en que cuenta un ticket en los indicadores
+    def _periodos_indicadores(self, correo):
+        fechas = (correo.received_date, correo.fecha_cierre, correo.fecha_vencimiento)
+        return {(fecha.year, fecha.month) for fecha in fechas if isinstance(fecha, (date, datetime))}
+
+    # Query para calcular los indicadores mensuales de un rango de fechas desde los tickets
+    def _calcular_indicadores_mensuales(self, inicio, fin, tipo_ticket=None):
+        """
+        Agrega los tickets del rango [inicio, fin) por (anio, mes, tipo_ticket, origen_estrategico)
+        en una sola pasada: CROSS APPLY despliega cada ticket en sus tres series, cada una con su fecha
+        - C: completado (estado 3) en el mes de fecha_cierre
+        - P: pendiente (estado 1-2) en el mes de fecha_vencimiento
+        - I: ingresado en el mes de received_date
+        y la agregación condicional produce todos los contadores a la vez.
+        tipo_ticket limita el cálculo a un tipo (None = todos).
+        Retorna {(anio, mes, tipo_ticket, origen_estrategico): {contador: valor}}
+        """
+        params = {'inicio': inicio, 'fin': fin}
+        filtro_tipo = ""
+        if tipo_ticket is not None:
+            filtro_tipo = "AND icm.tipo_ticket = :tipo_ticket"
+            params['tipo_ticket'] = tipo_ticket
+
+        sql = text(f"""
+            SELECT
+                YEAR(serie.fecha) AS anio,
+                MONTH(serie.fecha) AS mes,
+                ISNULL(icm.tipo_ticket, 0) AS tipo_ticket,
+                ISNULL(icm.origen_estrategico, 0) AS origen_estrategico,
+                SUM(CASE WHEN serie.tipo = 'C' THEN 1 ELSE 0 END) AS completados,
+                SUM(CASE WHEN serie.tipo = 'C' AND icm.fecha_vencimiento IS NOT NULL
+                         AND CAST(icm.fecha_cierre AS DATE) <= icm.fecha_vencimiento THEN 1 ELSE 0 END) AS oportunos,
+                SUM(CASE WHEN serie.tipo = 'C' AND icm.fecha_vencimiento IS NOT NULL
+                         AND CAST(icm.fecha_cierre AS DATE) > icm.fecha_vencimiento THEN 1 ELSE 0 END) AS no_oportunos,
+                SUM(CASE WHEN serie.tipo = 'C' AND icm.fecha_vencimiento IS NULL THEN 1 ELSE 0 END) AS sin_fecha_vencimiento,
+                SUM(CASE WHEN serie.tipo = 'P' THEN 1 ELSE 0 END) AS pendientes,
+                SUM(CASE WHEN serie.tipo = 'I' THEN 1 ELSE 0 END) AS ingresados
+            FROM intranet_correos_microsoft icm
+            CROSS APPLY (VALUES
+                ('C', CASE WHEN icm.estado = 3 THEN icm.fecha_cierre END),
+                ('P', CASE WHEN icm.estado IN (1, 2) THEN CAST(icm.fecha_vencimiento AS DATETIME) END),
+                ('I', icm.received_date)
+            ) AS serie(tipo, fecha)
+            WHERE icm.activo = 1
+            AND icm.ticket = 1
+            {filtro_tipo}
+            AND (
+                (icm.fecha_cierre >= :inicio AND icm.fecha_cierre < :fin)
+                OR (icm.fecha_vencimiento >= :inicio AND icm.fecha_vencimiento < :fin)
+                OR (icm.received_date >= :inicio AND icm.received_date < :fin)
             )
-            
-            # Agregar filtros de fecha para prioridades
-            if fecha_inicio:
-                query_prioridades = query_prioridades.filter(
-                    func.date(CorreosMicrosoftModel.received_date_time) >= fecha_inicio
-                )
-            
-            if fecha_fin:
-                query_prioridades = query_prioridades.filter(
-                    func.date(CorreosMicrosoftModel.received_date_time) <= fecha_fin
-                )
-            
-            # Agrupar, ordenar y limitar a los 3 primeros
-            prioridades_result = query_prioridades.group_by(
-                CorreosMicrosoftModel.prioridad,
-                IntranetTipoPrioridadModel.nombre
-            ).order_by(
-                func.count(CorreosMicrosoftModel.prioridad).desc()
-            ).limit(3).all()
-            
-            # Formatear prioridades
-            prioridades = []
-            for prio in prioridades_result:
-                prioridades.append({
-                    'id': prio[0],
-                    'nombre': prio[1],
-                    'cantidad': int(prio[2])
+            AND serie.fecha >= :inicio
+            AND serie.fecha < :fin
+            GROUP BY YEAR(serie.fecha), MONTH(serie.fecha), ISNULL(icm.tipo_ticket, 0), ISNULL(icm.origen_estrategico, 0)
+        """)
+
+        filas = {}
+        for row in self.db.execute(sql, params).fetchall():
+            fila = row._mapping
+            clave = (int(fila['anio']), int(fila['mes']), int(fila['tipo_ticket']), int(fila['origen_estrategico']))
+            filas[clave] = {campo: int(fila[campo] or 0) for campo in CAMPOS_INDICADORES}
+        return filas
+
+    # Query para reemplazar las filas de la tabla resumen que cubre un filtro
+    def _reemplazar_indicadores_mensuales(self, filtro_borrado, filas):
+        self.db.query(IntranetIndicadoresMensualesModel).filter(*filtro_borrado).delete(synchronize_session=False)
+        if filas:
+            ahora = datetime.now()
+            self.db.execute(insert(IntranetIndicadoresMensualesModel), [{
+                'anio': anio,
+                'mes': mes,
+                'tipo_ticket': tipo_ticket,
+                'origen_estrategico': origen_estrategico,
+                **contadores,
+                'updated_at': ahora
+            } for (anio, mes, tipo_ticket, origen_estrategico), contadores in filas.items()])
+
+    # Query para recalcular los indicadores precalculados de un año completo
+    def reconstruir_indicadores_anio(self, anio):
+        """Reescribe las filas del año en intranet_indicadores_mensuales. Retorna las filas generadas."""
+        with _lock_indicadores:
+            return self._reconstruir_indicadores_anio(int(anio))
+
+    def _reconstruir_indicadores_anio(self, anio):
+        # Se llama con _lock_indicadores tomado. Borrado e inserción van en una transacción:
+        # un lector concurrente nunca ve el año vacío.
+        inicio_anio, fin_anio = self._rango_anio(anio)
+        try:
+            filas = self._calcular_indicadores_mensuales(inicio_anio, fin_anio)
+            with self._transaccion_explicita():
+                self._reemplazar_indicadores_mensuales((IntranetIndicadoresMensualesModel.anio == anio,), {
+                    **filas,
+                    (anio, MES_ANIO_CONSTRUIDO, 0, 0): dict.fromkeys(CAMPOS_INDICADORES, 0)
                 })
-            
-            # Query para obtener los 3 asignados más frecuentes
-            query_asignados = self.db.query(
-                CorreosMicrosoftModel.asignado,
-                IntranetUsuariosGestionTicModel.nombre.label('nombre_asignado'),
-                func.count(CorreosMicrosoftModel.asignado).label('cantidad')
-            ).join(
-                IntranetUsuariosGestionTicModel,
-                CorreosMicrosoftModel.asignado == IntranetUsuariosGestionTicModel.id
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.asignado.isnot(None),
-                CorreosMicrosoftModel.asignado != 0
+            return len(filas)
+        except Exception as e:
+            print(f"Error reconstruyendo indicadores del año {anio}: {e}")
+            raise CustomException(f"Error reconstruyendo indicadores del año {anio}: {str(e)}")
+
+    # Query para obtener cuáles de los años indicados ya están construidos en la tabla resumen
+    def _anios_indicadores_construidos(self, anios):
+        return {
+            row.anio for row in self.db.query(IntranetIndicadoresMensualesModel.anio).filter(
+                IntranetIndicadoresMensualesModel.anio.in_(anios),
+                IntranetIndicadoresMensualesModel.mes == MES_ANIO_CONSTRUIDO
+            ).all()
+        }
+
+    # Query para recalcular los indicadores precalculados de meses puntuales
+    def recalcular_indicadores_meses(self, periodos):
+        """
+        Recalcula los meses (anio, mes) afectados por el cambio de un ticket.
+        Un error aquí no debe tumbar la actualización del ticket: se registra y la tabla
+        puede corregirse con la reconstrucción (python -m Utils.reconstruir_indicadores).
+        """
+        if not periodos:
+            return
+        with _lock_indicadores:
+            try:
+                with self._transaccion_explicita():
+                    for anio, mes in sorted(periodos):
+                        inicio_mes, fin_mes = self._rango_mes(anio, mes)
+                        self._reemplazar_indicadores_mensuales((
+                            IntranetIndicadoresMensualesModel.anio == anio,
+                            IntranetIndicadoresMensualesModel.mes == mes
+                        ), self._calcular_indicadores_mensuales(inicio_mes, fin_mes))
+            except Exception as e:
+                print(f"Error recalculando indicadores mensuales {sorted(periodos)}: {e}")
+
+    # Query para obtener los años que tienen tickets (para la reconstrucción completa)
+    def obtener_anios_con_tickets(self):
+        anios = set()
+        for columna in (CorreosMicrosoftModel.received_date, CorreosMicrosoftModel.fecha_cierre, CorreosMicrosoftModel.fecha_vencimiento):
+            anio_col = extract('year', columna)
+            anios.update(
+                int(row.anio) for row in self.db.query(anio_col.label('anio')).filter(
+                    CorreosMicrosoftModel.activo == 1,
+                    CorreosMicrosoftModel.ticket == 1,
+                    columna != None
+                ).group_by(anio_col).all()
             )
-            
-            # Agregar filtros de fecha para asignados
-            if fecha_inicio:
-                query_asignados = query_asignados.filter(
-                    func.date(CorreosMicrosoftModel.received_date_time) >= fecha_inicio
-                )
-            
-            if fecha_fin:
-                query_asignados = query_asignados.filter(
-                    func.date(CorreosMicrosoftModel.received_date_time) <= fecha_fin
-                )
-            
-            # Agrupar, ordenar y limitar a los 3 primeros
-            asignados_result = query_asignados.group_by(
-                CorreosMicrosoftModel.asignado,
-                IntranetUsuariosGestionTicModel.nombre
-            ).order_by(
-                func.count(CorreosMicrosoftModel.asignado).desc()
-            ).limit(3).all()
-            
-            # Formatear asignados
-            asignados = []
-            for asig in asignados_result:
-                asignados.append({
-                    'id': asig[0],
-                    'nombre': asig[1],
-                    'cantidad': int(asig[2])
-                })
-            
-            if result:
-                metricas = {
-                    'totals': {
-                        'total': int(result[0] or 0),
-                        'gestion': int(result[1] or 0),
-                        'estrategicos': int(result[2] or 0),
-                        'prioridad_alta': int(result[3] or 0)
-                    },
-                    'estados': {
-                        'abiertos': int(result[4] or 0),
-                        'en_proceso': int(result[5] or 0),
-                        'completados': int(result[6] or 0)
-                    },
-                    'tipos_soporte': tipos_soporte,
-                    'macroprocesos': macroprocesos,
-                    'prioridades': prioridades,
-                    'asignados': asignados
-                }
-                
-                return metricas
-            
-            # Si no hay resultados, devolver métricas vacías
-            return {
-                'totals': {
-                    'total': 0,
-                    'gestion': 0,
-                    'estrategicos': 0,
-                    'prioridad_alta': 0
-                },
-                'estados': {
-                    'abiertos': 0,
-                    'en_proceso': 0,
-                    'completados': 0
-                },
-                'tipos_soporte': [],
-                'macroprocesos': [],
-                'prioridades': [],
-                'asignados': []
-            }
-            
+        return sorted(anios)
+
+    # Query para reconstruir la tabla resumen de indicadores (uno, varios o todos los años)
+    def reconstruir_indicadores(self, anios=None):
+        """Retorna {anio: filas_generadas}"""
+        anios = [int(anio) for anio in anios] if anios else self.obtener_anios_con_tickets()
+        return {anio: self.reconstruir_indicadores_anio(anio) for anio in anios}
+
+    # Query para leer los indicadores precalculados de uno o varios años y un tipo de ticket
+    def obtener_indicadores_mensuales(self, anios, tipo_ticket):
+        """
+        Lee en una sola consulta las filas (anio, mes, origen) de intranet_indicadores_mensuales.
+        Los años sin la marca de construido se construyen en el momento (primera consulta);
+        la marca se vuelve a revisar dentro del lock para no reconstruir dos veces.
+        tipo_ticket None lee las filas de todos los tipos.
+        """
+        anios = sorted({int(anio) for anio in anios})
+
+        faltantes = set(anios) - self._anios_indicadores_construidos(anios)
+        if faltantes:
+            with _lock_indicadores:
+                for anio in sorted(faltantes - self._anios_indicadores_construidos(sorted(faltantes))):
+                    self._reconstruir_indicadores_anio(anio)
+
+        consulta = self.db.query(IntranetIndicadoresMensualesModel).filter(
+            IntranetIndicadoresMensualesModel.anio.in_(anios),
+            IntranetIndicadoresMensualesModel.mes != MES_ANIO_CONSTRUIDO
+        )
+        if tipo_ticket is not None:
+            consulta = consulta.filter(IntranetIndicadoresMensualesModel.tipo_ticket == tipo_ticket)
+        return consulta.all()
+
+    # Query para obtener las series mensuales de un tipo de ticket desde la tabla resumen
+    def _series_indicadores(self, anios, tipo_ticket):
+        """
+        Retorna {anio: {mes: {contadores del mes, 'origenes': {origen: contadores}}}} solo para los meses con datos.
+        Los pendientes del mes son también los tickets abiertos/en proceso (mismo criterio).
+        Gestión (tipo 1) toma los cerrados solo del tipo 1, pero pendientes e ingresados de
+        todos los tipos, incluidos los tickets sin tipo (fila tipo 0), como el reporte original.
+        """
+        tipo_ticket = int(tipo_ticket)
+        todos_los_tipos = tipo_ticket == TIPO_TICKET_GESTION
+        series = {}
+        for fila in self.obtener_indicadores_mensuales(anios, None if todos_los_tipos else tipo_ticket):
+            campos = CAMPOS_INDICADORES if fila.tipo_ticket == tipo_ticket else CAMPOS_INDICADORES_TODOS_LOS_TIPOS
+            mes = series.setdefault(fila.anio, {}).setdefault(
+                fila.mes, {**dict.fromkeys(CAMPOS_INDICADORES, 0), 'origenes': {}}
+            )
+            origen = mes['origenes'].setdefault(fila.origen_estrategico, dict.fromkeys(CAMPOS_INDICADORES, 0))
+            for campo in campos:
+                valor = getattr(fila, campo) or 0
+                mes[campo] += valor
+                origen[campo] += valor
+        return series
+
+    # Query para obtener el porcentaje meta de cumplimiento (dbo.consecutivos, tipo='META')
+    def _obtener_porcentaje_meta(self):
+        try:
+            sql_meta = "SELECT siguiente FROM dbo.consecutivos WHERE tipo = 'META';"
+            result_meta = self.db.execute(text(sql_meta)).fetchone()
+            if result_meta and result_meta[0] is not None:
+                return float(result_meta[0])
+            return 0
         except Exception as e:
-            print(f"Error obteniendo métricas del dashboard: {e}")
-            raise CustomException(f"Error obteniendo métricas: {str(e)}")
+            print(f"Error obteniendo porcentaje_meta: {e}")
+            return None
 
     # query para obtener indicadores de gestión mensual
     def obtener_indicadores_gestion(self, anio):
         """
-        Obtiene indicadores de gestión mensual optimizado con SQLAlchemy ORM.
+        Obtiene indicadores de gestión mensual desde la tabla resumen intranet_indicadores_mensuales.
         - Total de tickets completados por mes
         - Tickets cerrados oportunamente (fecha_cierre <= fecha_vencimiento)
         - Tickets cerrados no oportunamente (fecha_cierre > fecha_vencimiento)
@@ -1353,165 +2143,14 @@ class Querys:
             anio: Año para el cual obtener los indicadores
         """
         try:
-            # CorreosMicrosoftModel ya está importado a nivel de módulo
-            meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                     'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-
-            # 1. Tickets completados por mes
-            completados_q = self.db.query(
-                extract('month', CorreosMicrosoftModel.fecha_cierre).label('mes'),
-                func.count().label('total_completados'),
-                func.sum(case(
-                    (and_(CorreosMicrosoftModel.fecha_vencimiento != None, cast(CorreosMicrosoftModel.fecha_cierre, Date) <= cast(CorreosMicrosoftModel.fecha_vencimiento, Date)), 1),
-                    else_=0)).label('oportunos'),
-                func.sum(case(
-                    (and_(CorreosMicrosoftModel.fecha_vencimiento != None, cast(CorreosMicrosoftModel.fecha_cierre, Date) > cast(CorreosMicrosoftModel.fecha_vencimiento, Date)), 1),
-                    else_=0)).label('no_oportunos'),
-                func.sum(case(
-                    (CorreosMicrosoftModel.fecha_vencimiento == None, 1),
-                    else_=0)).label('sin_fecha_vencimiento')
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.estado == 3,
-                CorreosMicrosoftModel.tipo_ticket == 1,
-                CorreosMicrosoftModel.fecha_cierre != None,
-                func.extract('year', CorreosMicrosoftModel.fecha_cierre) == anio
-            ).group_by(extract('month', CorreosMicrosoftModel.fecha_cierre))
-
-            completados = {int(row.mes): {
-                'total_completados': row.total_completados,
-                'oportunos': row.oportunos,
-                'no_oportunos': row.no_oportunos,
-                'sin_fecha_vencimiento': row.sin_fecha_vencimiento
-            } for row in completados_q.all()}
-
-            # 2. Tickets pendientes (abiertos/en proceso) por mes (fecha_vencimiento)
-            pendientes_q = self.db.query(
-                extract('month', CorreosMicrosoftModel.fecha_vencimiento).label('mes'),
-                func.count().label('total_pendientes')
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.estado.in_([1, 2]),
-                CorreosMicrosoftModel.fecha_vencimiento != None,
-                func.extract('year', CorreosMicrosoftModel.fecha_vencimiento) == anio
-            ).group_by(extract('month', CorreosMicrosoftModel.fecha_vencimiento))
-
-            pendientes = {int(row.mes): row.total_pendientes for row in pendientes_q.all()}
-
-            # 3. Tickets ingresados por mes (received_date)
-            ingresados_q = self.db.query(
-                extract('month', CorreosMicrosoftModel.received_date).label('mes'),
-                func.count().label('total_ingresados')
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.received_date != None,
-                func.extract('year', CorreosMicrosoftModel.received_date) == anio
-            ).group_by(extract('month', CorreosMicrosoftModel.received_date))
-
-            ingresados = {int(row.mes): row.total_ingresados for row in ingresados_q.all()}
-
-            # 4. Tickets abiertos/en proceso al final del mes (fecha_vencimiento)
-            abiertos_q = self.db.query(
-                extract('month', CorreosMicrosoftModel.fecha_vencimiento).label('mes'),
-                func.count().label('total_abiertos')
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.estado.in_([1, 2]),
-                CorreosMicrosoftModel.fecha_vencimiento != None,
-                func.extract('year', CorreosMicrosoftModel.fecha_vencimiento) == anio
-            ).group_by(extract('month', CorreosMicrosoftModel.fecha_vencimiento))
+            # 1. Series mensuales del tipo Gestión en una sola lectura
+            series = self._series_indicadores([anio], tipo_ticket=1).get(int(anio), {})
 
-            abiertos = {int(row.mes): row.total_abiertos for row in abiertos_q.all()}
-
-            # 5. Obtener porcentaje_meta desde dbo.consecutivos (tipo='META')
-            porcentaje_meta = 0
-            try:
-                sql_meta = "SELECT siguiente FROM dbo.consecutivos WHERE tipo = 'META';"
-                result_meta = self.db.execute(text(sql_meta)).fetchone()
-                if result_meta and result_meta[0] is not None:
-                    porcentaje_meta = float(result_meta[0])
-            except Exception as e:
-                print(f"Error obteniendo porcentaje_meta: {e}")
-                porcentaje_meta = None
-
-            # 6. Procesamiento y armado de indicadores
-            indicadores = []
-            total_oportunos_acumulado = 0
-            total_completados_acumulado = 0
-            total_no_oportunos_acumulado = 0
-            total_sin_respuesta_acumulado = 0
-            total_pendientes_acumulado = 0
-            total_a_vencer_acumulado = 0
-            total_ingresados_acumulado = 0
-
-            for i in range(1, 13):
-                datos = completados.get(i)
-                pendientes_mes = pendientes.get(i, 0)
-                ingresados_mes = ingresados.get(i, 0)
-                abiertos_mes = abiertos.get(i, 0)
-
-                if datos:
-                    total_completados_acumulado += datos['total_completados']
-                    total_oportunos_acumulado += datos['oportunos']
-                    total_no_oportunos_acumulado += datos['no_oportunos']
-                    total_pendientes_acumulado += pendientes_mes
-                    total_ingresados_acumulado += ingresados_mes
-                    total_a_vencer_mes = datos['total_completados'] + pendientes_mes
-                    total_a_vencer_acumulado += total_a_vencer_mes
-                    sin_respuesta = datos['total_completados'] - datos['oportunos'] - datos['no_oportunos'] + pendientes_mes
-                    total_sin_respuesta_acumulado += sin_respuesta
-                    porcentaje = round((datos['oportunos'] / datos['total_completados'] * 100), 2) if datos['total_completados'] > 0 else 0
-                    porcentaje_acumulado = round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0
-                    indicadores.append({
-                        'mes': meses[i-1],
-                        'mes_numero': i,
-                        'total_completados': total_a_vencer_mes,
-                        'oportunos': datos['oportunos'],
-                        'no_oportunos': datos['no_oportunos'],
-                        'sin_respuesta': sin_respuesta,
-                        'total_ingresados': ingresados_mes,
-                        'tickets_abiertos': abiertos_mes,
-                        'porcentaje': porcentaje,
-                        'porcentaje_acumulado': porcentaje_acumulado,
-                        'porcentaje_meta': porcentaje_meta
-                    })
-                else:
-                    total_pendientes_acumulado += pendientes_mes
-                    total_ingresados_acumulado += ingresados_mes
-                    total_a_vencer_acumulado += pendientes_mes
-                    if pendientes_mes > 0:
-                        total_sin_respuesta_acumulado += pendientes_mes
-                    porcentaje_acumulado = round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0
-                    indicadores.append({
-                        'mes': meses[i-1],
-                        'mes_numero': i,
-                        'total_completados': pendientes_mes,
-                        'oportunos': 0,
-                        'no_oportunos': 0,
-                        'sin_respuesta': pendientes_mes,
-                        'total_ingresados': ingresados_mes,
-                        'tickets_abiertos': abiertos_mes,
-                        'porcentaje': 0,
-                        'porcentaje_acumulado': porcentaje_acumulado,
-                        'porcentaje_meta': porcentaje_meta
-                    })
+            # 2. Obtener porcentaje_meta desde dbo.consecutivos (tipo='META')
+            porcentaje_meta = self._obtener_porcentaje_meta()
 
-            return {
-                'anio': anio,
-                'indicadores': indicadores,
-                'totales': {
-                    'total_completados': total_a_vencer_acumulado,
-                    'oportunos': total_oportunos_acumulado,
-                    'no_oportunos': total_no_oportunos_acumulado,
-                    'sin_respuesta': total_sin_respuesta_acumulado,
-                    'total_ingresados': total_ingresados_acumulado,
-                    'porcentaje_global': round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0
-                }
-            }
+            # 3. Procesamiento y armado de indicadores
+            return self._armar_indicadores_gestion(anio, series, porcentaje_meta)
         except Exception as e:
             print(f"Error obteniendo indicadores de gestión: {e}")
             raise CustomException(f"Error obteniendo indicadores de gestión: {str(e)}")
@@ -1524,226 +2163,238 @@ class Querys:
         Cuenta tickets por origen_estrategico: 1=Proyectos, 2=ACPM, 3=Actividades informe gestión
         """
         try:
-            meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                    'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+            # 1. Series mensuales del tipo Estratégico (con desglose por origen) en una sola lectura
+            series = self._series_indicadores([anio], tipo_ticket=2).get(int(anio), {})
 
-            # 1. Tickets completados por mes y origen (fecha_cierre)
-            completados_q = self.db.query(
-                extract('month', CorreosMicrosoftModel.fecha_cierre).label('mes'),
-                CorreosMicrosoftModel.origen_estrategico,
-                func.count().label('total_completados'),
-                func.sum(case(
-                    (and_(CorreosMicrosoftModel.fecha_vencimiento != None, cast(CorreosMicrosoftModel.fecha_cierre, Date) <= cast(CorreosMicrosoftModel.fecha_vencimiento, Date)), 1),
-                    else_=0)).label('oportunos'),
-                func.sum(case(
-                    (and_(CorreosMicrosoftModel.fecha_vencimiento != None, cast(CorreosMicrosoftModel.fecha_cierre, Date) > cast(CorreosMicrosoftModel.fecha_vencimiento, Date)), 1),
-                    else_=0)).label('no_oportunos')
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.estado == 3,
-                CorreosMicrosoftModel.tipo_ticket == 2,
-                CorreosMicrosoftModel.fecha_cierre != None,
-                func.extract('year', CorreosMicrosoftModel.fecha_cierre) == anio
-            ).group_by(
-                extract('month', CorreosMicrosoftModel.fecha_cierre),
-                CorreosMicrosoftModel.origen_estrategico
-            )
+            # 2. Obtener porcentaje_meta
+            porcentaje_meta = self._obtener_porcentaje_meta()
 
-            # Organizar completados por mes
-            completados_data = {}
-            for row in completados_q.all():
-                mes = int(row.mes)
-                if mes not in completados_data:
-                    completados_data[mes] = []
-                completados_data[mes].append({
-                    'origen': row.origen_estrategico,
-                    'total': row.total_completados,
-                    'oportunos': row.oportunos,
-                    'no_oportunos': row.no_oportunos
-                })
-
-            # 2. Tickets pendientes por mes y origen (fecha_vencimiento)
-            pendientes_q = self.db.query(
-                extract('month', CorreosMicrosoftModel.fecha_vencimiento).label('mes'),
-                CorreosMicrosoftModel.origen_estrategico,
-                func.count().label('total_pendientes')
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.estado.in_([1, 2]),
-                CorreosMicrosoftModel.tipo_ticket == 2,
-                CorreosMicrosoftModel.fecha_vencimiento != None,
-                func.extract('year', CorreosMicrosoftModel.fecha_vencimiento) == anio
-            ).group_by(
-                extract('month', CorreosMicrosoftModel.fecha_vencimiento),
-                CorreosMicrosoftModel.origen_estrategico
-            )
+            # 3. Procesamiento y armado de indicadores
+            return self._armar_indicadores_estrategicos(anio, series, porcentaje_meta)
+        except Exception as e:
+            print(f"Error obteniendo indicadores estratégicos: {e}")
+            raise CustomException(f"Error obteniendo indicadores estratégicos: {str(e)}")
 
-            # Organizar pendientes por mes
-            pendientes_data = {}
-            for row in pendientes_q.all():
-                mes = int(row.mes)
-                if mes not in pendientes_data:
-                    pendientes_data[mes] = []
-                pendientes_data[mes].append({
-                    'origen': row.origen_estrategico,
-                    'total': row.total_pendientes
-                })
+    # Query para comparar los indicadores de varios años (una sola lectura de la tabla resumen)
+    def obtener_indicadores_comparativo(self, anios, tipo_ticket=1):
+        """
+        Retorna las series mensuales de cada año con la misma estructura de
+        obtener_indicadores_gestion (tipo 1) u obtener_indicadores_estrategicos (tipo 2).
+        Args:
+            anios: Lista de años a comparar
+            tipo_ticket: 1 = Gestión, 2 = Estratégico
+        """
+        try:
+            anios = sorted({int(anio) for anio in anios})
+            armar = self._armar_indicadores_estrategicos if int(tipo_ticket) == 2 else self._armar_indicadores_gestion
 
-            # 3. Tickets ingresados por mes
-            ingresados_q = self.db.query(
-                extract('month', CorreosMicrosoftModel.received_date).label('mes'),
-                func.count().label('total_ingresados')
-            ).filter(
-                CorreosMicrosoftModel.activo == 1,
-                CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.tipo_ticket == 2,
-                CorreosMicrosoftModel.received_date != None,
-                func.extract('year', CorreosMicrosoftModel.received_date) == anio
-            ).group_by(extract('month', CorreosMicrosoftModel.received_date))
+            series = self._series_indicadores(anios, tipo_ticket=int(tipo_ticket))
+            porcentaje_meta = self._obtener_porcentaje_meta()
 
-            ingresados = {int(row.mes): row.total_ingresados for row in ingresados_q.all()}
+            return {
+                'tipo_ticket': int(tipo_ticket),
+                'porcentaje_meta': porcentaje_meta,
+                'anios': [armar(anio, series.get(anio, {}), porcentaje_meta) for anio in anios]
+            }
+        except Exception as e:
+            print(f"Error obteniendo indicadores comparativos: {e}")
+            raise CustomException(f"Error obteniendo indicadores comparativos: {str(e)}")
 
-            # 4. Tickets abiertos/en proceso al final del mes
-            abiertos_q = self.db.query(
-                extract('month', CorreosMicrosoftModel.fecha_vencimiento).label('mes'),
-                func.count().label('total_abiertos')
+    # Query para obtener la proyección de tickets que usan los indicadores en un rango de fechas
+    def obtener_tickets_analitica(self, inicio, fin, tipo_ticket=None):
+        """
+        Retorna (id, tipo_ticket, origen_estrategico, estado, received_date, fecha_cierre, fecha_vencimiento)
+        de los tickets con alguna de sus fechas en [inicio, fin), para Utils.analitica
+        """
+        try:
+            consulta = self.db.query(
+                CorreosMicrosoftModel.id,
+                CorreosMicrosoftModel.tipo_ticket,
+                CorreosMicrosoftModel.origen_estrategico,
+                CorreosMicrosoftModel.estado,
+                CorreosMicrosoftModel.received_date,
+                CorreosMicrosoftModel.fecha_cierre,
+                CorreosMicrosoftModel.fecha_vencimiento
             ).filter(
                 CorreosMicrosoftModel.activo == 1,
                 CorreosMicrosoftModel.ticket == 1,
-                CorreosMicrosoftModel.estado.in_([1, 2]),
-                CorreosMicrosoftModel.tipo_ticket == 2,
-                CorreosMicrosoftModel.fecha_vencimiento != None,
-                func.extract('year', CorreosMicrosoftModel.fecha_vencimiento) == anio
-            ).group_by(extract('month', CorreosMicrosoftModel.fecha_vencimiento))
-
-            abiertos = {int(row.mes): row.total_abiertos for row in abiertos_q.all()}
-
-            # 5. Obtener porcentaje_meta
-            porcentaje_meta = 0
-            try:
-                sql_meta = "SELECT siguiente FROM dbo.consecutivos WHERE tipo = 'META';"
-                result_meta = self.db.execute(text(sql_meta)).fetchone()
-                if result_meta and result_meta[0] is not None:
-                    porcentaje_meta = float(result_meta[0])
-            except Exception as e:
-                print(f"Error obteniendo porcentaje_meta: {e}")
-                porcentaje_meta = None
-
-            # 6. Procesamiento y armado de indicadores
-            indicadores = []
-            total_oportunos_acumulado = 0
-            total_completados_acumulado = 0
-            total_no_oportunos_acumulado = 0
-            total_sin_respuesta_acumulado = 0
-            total_pendientes_acumulado = 0
-            total_a_vencer_acumulado = 0
-            total_ingresados_acumulado = 0
-
-            for i in range(1, 13):
-                # Datos del mes
-                lista_completados = completados_data.get(i, [])
-                lista_pendientes = pendientes_data.get(i, [])
-                
-                ingresados_mes = ingresados.get(i, 0)
-                abiertos_mes = abiertos.get(i, 0)
-
-                # Inicializar contadores del mes
-                mes_proyectos = 0
-                mes_acpm = 0
-                mes_actividades = 0
-                
-                mes_total_completados = 0
-                mes_oportunos = 0
-                mes_no_oportunos = 0
-                
-                mes_pendientes = 0
+                or_(
+                    and_(CorreosMicrosoftModel.fecha_cierre >= inicio, CorreosMicrosoftModel.fecha_cierre < fin),
+                    and_(CorreosMicrosoftModel.fecha_vencimiento >= inicio, CorreosMicrosoftModel.fecha_vencimiento < fin),
+                    and_(CorreosMicrosoftModel.received_date >= inicio, CorreosMicrosoftModel.received_date < fin)
+                )
+            )
+            if tipo_ticket is not None:
+                consulta = consulta.filter(CorreosMicrosoftModel.tipo_ticket == tipo_ticket)
 
-                # Procesar completados
-                for item in lista_completados:
-                    origen = item['origen']
-                    total = item['total']
-                    
-                    mes_total_completados += total
-                    mes_oportunos += item['oportunos']
-                    mes_no_oportunos += item['no_oportunos']
-                    
-                    if origen == 1:
-                        mes_proyectos += total
-                    elif origen == 2:
-                        mes_acpm += total
-                    elif origen == 3:
-                        mes_actividades += total
-
-                # Procesar pendientes
-                for item in lista_pendientes:
-                    origen = item['origen']
-                    total = item['total']
-                    
-                    mes_pendientes += total
-                    
-                    if origen == 1:
-                        mes_proyectos += total
-                    elif origen == 2:
-                        mes_acpm += total
-                    elif origen == 3:
-                        mes_actividades += total
-
-                # Cálculos totales del mes
-                total_a_vencer_mes = mes_total_completados + mes_pendientes
-                sin_respuesta_mes = mes_total_completados - mes_oportunos - mes_no_oportunos + mes_pendientes
-                
-                # Acumulados
-                total_completados_acumulado += mes_total_completados
-                total_oportunos_acumulado += mes_oportunos
-                total_no_oportunos_acumulado += mes_no_oportunos
-                total_pendientes_acumulado += mes_pendientes
+            return [tuple(row) for row in consulta.all()]
+        except Exception as e:
+            print(f"Error obteniendo tickets para analítica: {e}")
+            raise CustomException(f"Error obteniendo tickets para analítica: {str(e)}")
+
+    # Helper para armar los indicadores mensuales y acumulados de un año de gestión
+    def _armar_indicadores_gestion(self, anio, series, porcentaje_meta):
+        """series: {mes: contadores} de _series_indicadores para el año"""
+        indicadores = []
+        total_oportunos_acumulado = 0
+        total_completados_acumulado = 0
+        total_no_oportunos_acumulado = 0
+        total_sin_respuesta_acumulado = 0
+        total_pendientes_acumulado = 0
+        total_a_vencer_acumulado = 0
+        total_ingresados_acumulado = 0
+
+        for i in range(1, 13):
+            serie = series.get(i, {})
+            datos = serie if serie.get('completados') else None
+            pendientes_mes = serie.get('pendientes', 0)
+            ingresados_mes = serie.get('ingresados', 0)
+            # Abiertos/en proceso: mismo criterio que pendientes (estado 1-2 por mes de vencimiento)
+            abiertos_mes = pendientes_mes
+
+            if datos:
+                total_completados_acumulado += datos['completados']
+                total_oportunos_acumulado += datos['oportunos']
+                total_no_oportunos_acumulado += datos['no_oportunos']
+                total_pendientes_acumulado += pendientes_mes
                 total_ingresados_acumulado += ingresados_mes
+                total_a_vencer_mes = datos['completados'] + pendientes_mes
                 total_a_vencer_acumulado += total_a_vencer_mes
-                total_sin_respuesta_acumulado += sin_respuesta_mes
-
-                # Porcentajes
-                porcentaje = round((mes_oportunos / total_a_vencer_mes * 100), 2) if total_a_vencer_mes > 0 else 0
+                sin_respuesta = datos['completados'] - datos['oportunos'] - datos['no_oportunos'] + pendientes_mes
+                total_sin_respuesta_acumulado += sin_respuesta
+                porcentaje = round((datos['oportunos'] / datos['completados'] * 100), 2) if datos['completados'] > 0 else 0
                 porcentaje_acumulado = round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0
-
                 indicadores.append({
-                    'mes': meses[i-1],
+                    'mes': MESES[i-1],
                     'mes_numero': i,
                     'total_completados': total_a_vencer_mes,
-                    'oportunos': mes_oportunos,
-                    'no_oportunos': mes_no_oportunos,
-                    'sin_respuesta': sin_respuesta_mes,
+                    'oportunos': datos['oportunos'],
+                    'no_oportunos': datos['no_oportunos'],
+                    'sin_respuesta': sin_respuesta,
                     'total_ingresados': ingresados_mes,
                     'tickets_abiertos': abiertos_mes,
                     'porcentaje': porcentaje,
                     'porcentaje_acumulado': porcentaje_acumulado,
-                    'porcentaje_meta': porcentaje_meta,
-                    # Desglose por origen (Closed + Pending)
-                    'proyectos': mes_proyectos,
-                    'acpm': mes_acpm,
-                    'actividades_informe': mes_actividades
+                    'porcentaje_meta': porcentaje_meta
+                })
+            else:
+                total_pendientes_acumulado += pendientes_mes
+                total_ingresados_acumulado += ingresados_mes
+                total_a_vencer_acumulado += pendientes_mes
+                if pendientes_mes > 0:
+                    total_sin_respuesta_acumulado += pendientes_mes
+                porcentaje_acumulado = round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0
+                indicadores.append({
+                    'mes': MESES[i-1],
+                    'mes_numero': i,
+                    'total_completados': pendientes_mes,
+                    'oportunos': 0,
+                    'no_oportunos': 0,
+                    'sin_respuesta': pendientes_mes,
+                    'total_ingresados': ingresados_mes,
+                    'tickets_abiertos': abiertos_mes,
+                    'porcentaje': 0,
+                    'porcentaje_acumulado': porcentaje_acumulado,
+                    'porcentaje_meta': porcentaje_meta
                 })
 
-            return {
-                'anio': anio,
-                'indicadores': indicadores,
-                'totales': {
-                    'total_completados': total_a_vencer_acumulado,
-                    'oportunos': total_oportunos_acumulado,
-                    'no_oportunos': total_no_oportunos_acumulado,
-                    'sin_respuesta': total_sin_respuesta_acumulado,
-                    'total_ingresados': total_ingresados_acumulado,
-                    'porcentaje_global': round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0,
-                    # Totales por origen
-                    'proyectos': sum(i['proyectos'] for i in indicadores),
-                    'acpm': sum(i['acpm'] for i in indicadores),
-                    'actividades_informe': sum(i['actividades_informe'] for i in indicadores)
-                }
+        return {
+            'anio': anio,
+            'indicadores': indicadores,
+            'totales': {
+                'total_completados': total_a_vencer_acumulado,
+                'oportunos': total_oportunos_acumulado,
+                'no_oportunos': total_no_oportunos_acumulado,
+                'sin_respuesta': total_sin_respuesta_acumulado,
+                'total_ingresados': total_ingresados_acumulado,
+                'porcentaje_global': round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0
             }
-        except Exception as e:
-            print(f"Error obteniendo indicadores estratégicos: {e}")
-            raise CustomException(f"Error obteniendo indicadores estratégicos: {str(e)}")
+        }
+
+    # Helper para armar los indicadores mensuales y acumulados de un año estratégico (con desglose por origen)
+    def _armar_indicadores_estrategicos(self, anio, series, porcentaje_meta):
+        """series: {mes: contadores} de _series_indicadores para el año"""
+        indicadores = []
+        total_oportunos_acumulado = 0
+        total_completados_acumulado = 0
+        total_no_oportunos_acumulado = 0
+        total_sin_respuesta_acumulado = 0
+        total_pendientes_acumulado = 0
+        total_a_vencer_acumulado = 0
+        total_ingresados_acumulado = 0
+
+        for i in range(1, 13):
+            serie = series.get(i, {})
+            origenes = serie.get('origenes', {})
+
+            mes_total_completados = serie.get('completados', 0)
+            mes_oportunos = serie.get('oportunos', 0)
+            mes_no_oportunos = serie.get('no_oportunos', 0)
+            mes_pendientes = serie.get('pendientes', 0)
+            ingresados_mes = serie.get('ingresados', 0)
+            # Abiertos/en proceso: mismo criterio que pendientes (estado 1-2 por mes de vencimiento)
+            abiertos_mes = mes_pendientes
+
+            # Desglose por origen (cerrados + pendientes)
+            por_origen = {
+                origen: contadores['completados'] + contadores['pendientes']
+                for origen, contadores in origenes.items()
+            }
+            mes_proyectos = por_origen.get(1, 0)
+            mes_acpm = por_origen.get(2, 0)
+            mes_actividades = por_origen.get(3, 0)
+
+            # Cálculos totales del mes
+            total_a_vencer_mes = mes_total_completados + mes_pendientes
+            sin_respuesta_mes = mes_total_completados - mes_oportunos - mes_no_oportunos + mes_pendientes
+
+            # Acumulados
+            total_completados_acumulado += mes_total_completados
+            total_oportunos_acumulado += mes_oportunos
+            total_no_oportunos_acumulado += mes_no_oportunos
+            total_pendientes_acumulado += mes_pendientes
+            total_ingresados_acumulado += ingresados_mes
+            total_a_vencer_acumulado += total_a_vencer_mes
+            total_sin_respuesta_acumulado += sin_respuesta_mes
+
+            # Porcentajes
+            porcentaje = round((mes_oportunos / total_a_vencer_mes * 100), 2) if total_a_vencer_mes > 0 else 0
+            porcentaje_acumulado = round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0
+
+            indicadores.append({
+                'mes': MESES[i-1],
+                'mes_numero': i,
+                'total_completados': total_a_vencer_mes,
+                'oportunos': mes_oportunos,
+                'no_oportunos': mes_no_oportunos,
+                'sin_respuesta': sin_respuesta_mes,
+                'total_ingresados': ingresados_mes,
+                'tickets_abiertos': abiertos_mes,
+                'porcentaje': porcentaje,
+                'porcentaje_acumulado': porcentaje_acumulado,
+                'porcentaje_meta': porcentaje_meta,
+                # Desglose por origen (Closed + Pending)
+                'proyectos': mes_proyectos,
+                'acpm': mes_acpm,
+                'actividades_informe': mes_actividades
+            })
+
+        return {
+            'anio': anio,
+            'indicadores': indicadores,
+            'totales': {
+                'total_completados': total_a_vencer_acumulado,
+                'oportunos': total_oportunos_acumulado,
+                'no_oportunos': total_no_oportunos_acumulado,
+                'sin_respuesta': total_sin_respuesta_acumulado,
+                'total_ingresados': total_ingresados_acumulado,
+                'porcentaje_global': round((total_oportunos_acumulado / total_a_vencer_acumulado * 100), 2) if total_a_vencer_acumulado > 0 else 0,
+                # Totales por origen
+                'proyectos': sum(i['proyectos'] for i in indicadores),
+                'acpm': sum(i['acpm'] for i in indicadores),
+                'actividades_informe': sum(i['actividades_informe'] for i in indicadores)
+            }
+        }
 
     # Query para obtener tickets del periodo (filtrado por mes y tipo gestión)
     def obtener_tickets_periodo(self, anio, mes, tipo_ticket=1, page=1, limit=5):
@@ -1757,14 +2408,18 @@ class Querys:
         """
         try:
             offset = (page - 1) * limit
+            # Rango semiabierto del mes [inicio, fin) para que los filtros usen el índice de received_date
+            inicio_mes, fin_mes = self._rango_mes(anio, mes)
 
             # Base query
-            base_query = self.db.query(CorreosMicrosoftModel).filter(
+            base_query = self.db.query(CorreosMicrosoftModel).options(
+                defer(CorreosMicrosoftModel.body_content)
+            ).filter(
                 CorreosMicrosoftModel.activo == 1,
                 CorreosMicrosoftModel.ticket == 1,
                 CorreosMicrosoftModel.tipo_ticket == tipo_ticket,
-                func.extract('year', CorreosMicrosoftModel.received_date) == anio,
-                func.extract('month', CorreosMicrosoftModel.received_date) == mes
+                CorreosMicrosoftModel.received_date >= inicio_mes,
+                CorreosMicrosoftModel.received_date < fin_mes
             )
 
             # Total count for pagination
@@ -1777,22 +2432,15 @@ class Querys:
 
             tickets = []
             if tickets_query:
-                # Obtener IDs para consultas masivas
-                prioridad_ids = {t.prioridad for t in tickets_query if t.prioridad}
-                estado_ids = {t.estado for t in tickets_query if t.estado}
-                asignado_ids = {t.asignado for t in tickets_query if t.asignado}
-                tipo_soporte_ids = {t.tipo_soporte for t in tickets_query if t.tipo_soporte}
-                macroproceso_ids = {t.macroproceso for t in tickets_query if t.macroproceso}
-
-                # Consultas auxiliares
-                prioridades = {p.id: p.nombre for p in self.db.query(IntranetTipoPrioridadModel).filter(IntranetTipoPrioridadModel.id.in_(prioridad_ids)).all()}
-                estados = {e.id: e.nombre for e in self.db.query(IntranetEstadosTickets).filter(IntranetEstadosTickets.id.in_(estado_ids)).all()}
-                usuarios = {u.id: u.nombre for u in self.db.query(IntranetUsuariosGestionTicModel).filter(IntranetUsuariosGestionTicModel.id.in_(asignado_ids)).all()}
-                tipos_soporte = {ts.id: ts.nombre for ts in self.db.query(IntranetTipoSoporteModel).filter(IntranetTipoSoporteModel.id.in_(tipo_soporte_ids)).all()}
-                macroprocesos = {m.id: m.nombre for m in self.db.query(IntranetPerfilesMacroprocesoModel).filter(IntranetPerfilesMacroprocesoModel.id.in_(macroproceso_ids)).all()}
+                # Nombres desde el catálogo en memoria (sin consultas adicionales por página)
+                prioridades = catalogo_cache.nombres(self.db, 'prioridades')
+                estados = catalogo_cache.nombres(self.db, 'estados')
+                usuarios = catalogo_cache.nombres(self.db, 'tecnicos')
+                tipos_soporte = catalogo_cache.nombres(self.db, 'tipos_soporte')
+                macroprocesos = catalogo_cache.nombres(self.db, 'macroprocesos')
 
                 for t in tickets_query:
-                    ticket_dict = t.to_frontend_format()
+                    ticket_dict = t.to_frontend_format(incluir_body=False)
                     ticket_dict['prioridad_nombre'] = prioridades.get(t.prioridad, '')
                     ticket_dict['estado_nombre'] = estados.get(t.estado, '')
                     ticket_dict['responsable_nombre'] = usuarios.get(t.asignado, 'Sin asignar')
@@ -1811,8 +2459,8 @@ class Querys:
                 CorreosMicrosoftModel.activo == 1,
                 CorreosMicrosoftModel.ticket == 1,
                 CorreosMicrosoftModel.tipo_ticket == tipo_ticket,
-                func.extract('year', CorreosMicrosoftModel.received_date) == anio,
-                func.extract('month', CorreosMicrosoftModel.received_date) == mes
+                CorreosMicrosoftModel.received_date >= inicio_mes,
+                CorreosMicrosoftModel.received_date < fin_mes
             ).group_by(CorreosMicrosoftModel.estado).all()
 
             resumen_dict = {estado: count for estado, count in resumen_query}
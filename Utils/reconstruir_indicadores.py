@@ -0,0 +1,34 @@
+"""
+Reconstruye la tabla resumen intranet_indicadores_mensuales a partir de los tickets.
+
+Uso:
+    python -m Utils.reconstruir_indicadores            # todos los años con tickets
+    python -m Utils.reconstruir_indicadores 2024 2025  # años puntuales
+
+La tabla se mantiene sola cuando los tickets cambian por la API; este comando sirve
+para la carga inicial y para corregirla tras cambios hechos directamente en la BD.
+"""
+import sys
+from Config.db import BASE, engine, session_maker
+from Models.IntranetIndicadoresMensualesModel import IntranetIndicadoresMensualesModel
+from Utils.querys import Querys
+
+
+def main(argumentos):
+    anios = [int(anio) for anio in argumentos]
+    BASE.metadata.create_all(bind=engine, tables=[IntranetIndicadoresMensualesModel.__table__])
+
+    db = session_maker()
+    try:
+        resultado = Querys(db).reconstruir_indicadores(anios or None)
+    finally:
+        db.close()
+
+    for anio, filas in resultado.items():
+        print(f"Indicadores {anio}: {filas} fila(s) generada(s)")
+    if not resultado:
+        print("No hay tickets para reconstruir indicadores")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
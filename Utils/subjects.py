@@ -0,0 +1,21 @@
+import re
+
+# Prefijos de respuesta y reenvío en varios idiomas (RE/RES, FW/FWD/RV, AW, SV) y la marca [SPAM],
+# encadenados en cualquier orden y cantidad ("RE: RE: FW: ...")
+_PATRON_PREFIJOS = re.compile(r'^\s*(?:(?:RES|RE|FWD|FW|RV|AW|SV):\s*|\[SPAM\]\s*)+', re.IGNORECASE)
+_PATRON_ESPACIOS = re.compile(r'\s+')
+
+# Largo de la columna subject_normalizado
+LONGITUD_SUBJECT_NORMALIZADO = 255
+
+
+# Función para quitar los prefijos de respuesta/reenvío de un subject
+def limpiar_subject(subject):
+    return _PATRON_PREFIJOS.sub('', subject or '').strip()
+
+
+# Función para obtener la forma normalizada del subject (sin prefijos, minúsculas, espacios simples)
+def normalizar_subject(subject):
+    """Valor de la columna subject_normalizado; permite buscar con igualdad o prefijo"""
+    normalizado = _PATRON_ESPACIOS.sub(' ', limpiar_subject(subject)).lower()
+    return normalizado[:LONGITUD_SUBJECT_NORMALIZADO]
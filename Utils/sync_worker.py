@@ -0,0 +1,99 @@
+import threading
+from Config.db import session_maker
+from Utils.querys import Querys
+from Utils.constants import SYNC_ENABLED, SYNC_INTERVAL_SECONDS
+
+# Un sync sin fecha_fin más antiguo que esto se considera abandonado (proceso caído)
+MINUTOS_SYNC_ABANDONADO = 30
+
+
+class SyncWorker:
+    """
+    Servicio de sincronización de correos en segundo plano.
+    - Arranca con la aplicación y ejecuta Graph.ejecutar_sincronizacion cada `intervalo` segundos
+    - Cada ejecución queda registrada en intranet_sync_log
+    - Nunca corren dos sincronizaciones a la vez: lock en el proceso y, entre procesos,
+      se omite la ejecución si intranet_sync_log tiene un sync en curso
+    - disparar() permite lanzar una sincronización sin esperar su resultado
+    """
+
+    def __init__(self, intervalo=120, habilitado=True):
+        self.intervalo = intervalo
+        self.habilitado = habilitado
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._despertar = threading.Event()
+        self._forzar_pendiente = False
+        self._hilo = None
+
+    # Función para iniciar el ciclo de sincronización periódica
+    def iniciar(self):
+        """Inicia el hilo de sincronización periódica"""
+        if not self.habilitado or (self._hilo and self._hilo.is_alive()):
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name="sync-correos", daemon=True)
+        self._hilo.start()
+
+    # Función para detener el ciclo de sincronización
+    def detener(self):
+        """Detiene el hilo de sincronización (al apagar la aplicación)"""
+        self._detener.set()
+        self._despertar.set()
+
+    # Función para saber si hay una sincronización corriendo en este proceso
+    def en_ejecucion(self):
+        return self._lock.locked()
+
+    # Función para disparar una sincronización sin esperarla
+    def disparar(self, forzar_sync=False):
+        """
+        Lanza una sincronización en segundo plano y retorna de inmediato.
+        Retorna False si ya hay una en curso (la petición no se encola).
+        """
+        if self.en_ejecucion():
+            return False
+
+        if self._hilo and self._hilo.is_alive():
+            # Despertar al ciclo periódico en lugar de crear otro hilo
+            self._forzar_pendiente = self._forzar_pendiente or forzar_sync
+            self._despertar.set()
+        else:
+            threading.Thread(target=self.ejecutar, args=(forzar_sync,), name="sync-correos-manual", daemon=True).start()
+        return True
+
+    # Función para ejecutar una sincronización en el hilo actual
+    def ejecutar(self, forzar_sync=False):
+        """
+        Ejecuta una sincronización completa del buzón con su propia sesión de BD.
+        Retorna las estadísticas o None si otra sincronización estaba en curso.
+        """
+        # Import diferido: Class.Graph importa este módulo
+        from Class.Graph import Graph
+
+        if not self._lock.acquire(blocking=False):
+            return None
+
+        db = session_maker()
+        try:
+            if Querys(db).obtener_sync_en_curso(MINUTOS_SYNC_ABANDONADO):
+                print("Sincronización omitida: otro proceso tiene un sync en curso.")
+                return None
+            return Graph(db).ejecutar_sincronizacion(forzar_sync)
+        except Exception as e:
+            print(f"Error en el worker de sincronización: {e}")
+            return None
+        finally:
+            db.close()
+            self._lock.release()
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            forzar_sync, self._forzar_pendiente = self._forzar_pendiente, False
+            self.ejecutar(forzar_sync)
+
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+
+sync_worker = SyncWorker(SYNC_INTERVAL_SECONDS, SYNC_ENABLED)
@@ -1,4 +1,4 @@
-# import base64
+import base64
 # from Utils.constants import BASE_PATH_TEMPLATE
 from fastapi.responses import JSONResponse, Response
 from fastapi.encoders import jsonable_encoder
@@ -7,7 +7,7 @@ from dotenv import load_dotenv
 # from email.mime.text import MIMEText
 # from email.mime.base import MIMEBase
 # from email import encoders
-# import json
+import json
 import os
 import smtplib
 from email.mime.multipart import MIMEMultipart
@@ -61,6 +61,21 @@ class Tools:
         )
         return response
 
+    """ Esta funcion da formato a la respuesta de un catálogo con ETag/Cache-Control y responde 304 si no cambió """
+    def output_catalogo(self, message, data, version, if_none_match=None):
+        etag = f'"{version}"'
+        # no-cache: el navegador guarda la respuesta pero la revalida siempre (304 si la versión no cambió)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if if_none_match:
+            etiquetas = [etiqueta.strip().removeprefix('W/') for etiqueta in if_none_match.split(',')]
+            if etag in etiquetas or '*' in etiquetas:
+                return Response(status_code=304, headers=headers)
+
+        response = self.output(200, message, data)
+        response.headers.update(headers)
+        return response
+
     # """ Esta funcion permite obtener el template """
     # def get_content_template(self, template_name: str):
     #     template = f"{BASE_PATH_TEMPLATE}/{template_name}"
@@ -108,6 +123,36 @@ class Tools:
         valor_decimal = Decimal(value)
         return valor_decimal
 
+    # Función para codificar el cursor de paginación keyset (fecha, id)
+    def codificar_cursor(self, fecha, id_registro):
+        """Genera un cursor opaco a partir de la fecha y el id del último registro de la página"""
+        valores = [fecha.isoformat() if fecha else None, id_registro]
+        return base64.urlsafe_b64encode(json.dumps(valores).encode('utf-8')).decode('ascii')
+
+    # Función para decodificar el cursor de paginación keyset
+    def decodificar_cursor(self, cursor):
+        """Retorna la tupla (fecha, id) contenida en el cursor; lanza CustomException si es inválido"""
+        try:
+            fecha, id_registro = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return (datetime.fromisoformat(fecha) if fecha else None), int(id_registro)
+        except Exception:
+            raise CustomException("El cursor de paginación no es válido.", 400)
+
+    # Función para proyectar los campos solicitados (fields=) en los registros de un listado
+    def proyectar_campos(self, registros, fields):
+        """
+        Deja en cada registro solo los campos pedidos. fields acepta lista o texto
+        separado por comas; vacío retorna los registros sin cambios.
+        """
+        if not fields:
+            return registros
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        campos = {campo.strip() for campo in fields if campo and campo.strip()}
+        if not campos:
+            return registros
+        return [{campo: valor for campo, valor in registro.items() if campo in campos} for registro in registros]
+
     # Función para enviar correos electrónicos
     def send_email_individual(self, to_email, cc_emails, subject, body, logo_path=None, mail_sender=None):
         """Envía un correo electrónico a un destinatario con copia a otros y adjunta un logo si está disponible."""
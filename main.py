@@ -6,10 +6,25 @@ from Router.Graph import graph_router
 from Router.Tickets import tickets_router
 from Router.Dashboard import dashboard_router
 from Router.Indicadores import indicadores_router
+from Utils.graph_token import graph_token_provider
+from Utils.sync_worker import sync_worker
+from Utils.executor_bd import ejecutor_bd
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Renovación proactiva del token de Microsoft Graph en segundo plano
+    graph_token_provider.iniciar()
+    # Sincronización periódica del buzón, fuera del ciclo de las peticiones
+    sync_worker.iniciar()
+    yield
+    sync_worker.detener()
+    graph_token_provider.detener()
+    ejecutor_bd.detener()
+
 route = Path.cwd()
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.title = "Avántika Gestión TIC"
 app.version = "0.0.1"
 